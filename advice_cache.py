@@ -0,0 +1,231 @@
+"""Persistent advice cache keyed by a bucketed user profile"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from advisor import INCOME_BRACKETS, INCOME_MAP
+
+CACHE_PATH = os.environ.get('ADVICE_CACHE_PATH', os.path.join('.cache', 'advice_cache.sqlite3'))
+CACHE_TTL = float(os.environ.get('ADVICE_CACHE_TTL', str(7 * 24 * 3600)))
+# Part of every key: bump it whenever the advice prompt, its formatting or the profile's fields change,
+# so advice written for the old ones is never served again
+ADVICE_VERSION = 3
+
+# Band edges follow scheme age limits (APY up to 40, PMJJBY up to 50)
+AGE_BANDS = [(18, 25), (26, 35), (36, 40), (41, 50), (51, 60)]
+# Highest monthly income of each of the form's brackets but the last; PMJAY's ₹15,000 limit is one of them
+INCOME_EDGES = [5000, 10000, 15000, 25000, 50000]
+
+STATE_ALIASES = {
+    'andhra pradesh': 'Andhra Pradesh', 'ap': 'Andhra Pradesh',
+    'assam': 'Assam', 'bihar': 'Bihar', 'br': 'Bihar', 'बिहार': 'Bihar',
+    'chhattisgarh': 'Chhattisgarh', 'cg': 'Chhattisgarh',
+    'delhi': 'Delhi', 'new delhi': 'Delhi', 'dl': 'Delhi', 'दिल्ली': 'Delhi', 'नई दिल्ली': 'Delhi',
+    'goa': 'Goa', 'gujarat': 'Gujarat', 'gj': 'Gujarat', 'गुजरात': 'Gujarat',
+    'haryana': 'Haryana', 'hr': 'Haryana', 'हरियाणा': 'Haryana',
+    'himachal pradesh': 'Himachal Pradesh', 'hp': 'Himachal Pradesh',
+    'jharkhand': 'Jharkhand', 'jh': 'Jharkhand', 'झारखंड': 'Jharkhand',
+    'karnataka': 'Karnataka', 'ka': 'Karnataka', 'kerala': 'Kerala', 'kl': 'Kerala',
+    'madhya pradesh': 'Madhya Pradesh', 'mp': 'Madhya Pradesh', 'मध्य प्रदेश': 'Madhya Pradesh',
+    'maharashtra': 'Maharashtra', 'mh': 'Maharashtra', 'महाराष्ट्र': 'Maharashtra',
+    'odisha': 'Odisha', 'orissa': 'Odisha', 'od': 'Odisha',
+    'punjab': 'Punjab', 'pb': 'Punjab', 'पंजाब': 'Punjab',
+    'rajasthan': 'Rajasthan', 'rj': 'Rajasthan', 'राजस्थान': 'Rajasthan',
+    'tamil nadu': 'Tamil Nadu', 'tn': 'Tamil Nadu', 'telangana': 'Telangana', 'ts': 'Telangana',
+    'uttar pradesh': 'Uttar Pradesh', 'up': 'Uttar Pradesh', 'उत्तर प्रदेश': 'Uttar Pradesh',
+    'uttarakhand': 'Uttarakhand', 'uk': 'Uttarakhand', 'उत्तराखंड': 'Uttarakhand',
+    'west bengal': 'West Bengal', 'wb': 'West Bengal', 'पश्चिम बंगाल': 'West Bengal',
+    'jammu and kashmir': 'Jammu and Kashmir', 'j&k': 'Jammu and Kashmir',
+}
+
+CITY_STATES = {
+    'mumbai': 'Maharashtra', 'bombay': 'Maharashtra', 'pune': 'Maharashtra', 'nagpur': 'Maharashtra',
+    'nashik': 'Maharashtra', 'aurangabad': 'Maharashtra', 'thane': 'Maharashtra',
+    'मुंबई': 'Maharashtra', 'पुणे': 'Maharashtra', 'नागपुर': 'Maharashtra',
+    'gurgaon': 'Haryana', 'gurugram': 'Haryana', 'faridabad': 'Haryana',
+    'noida': 'Uttar Pradesh', 'lucknow': 'Uttar Pradesh', 'kanpur': 'Uttar Pradesh',
+    'varanasi': 'Uttar Pradesh', 'agra': 'Uttar Pradesh', 'prayagraj': 'Uttar Pradesh',
+    'allahabad': 'Uttar Pradesh', 'ghaziabad': 'Uttar Pradesh', 'meerut': 'Uttar Pradesh',
+    'लखनऊ': 'Uttar Pradesh', 'कानपुर': 'Uttar Pradesh', 'वाराणसी': 'Uttar Pradesh',
+    'patna': 'Bihar', 'gaya': 'Bihar', 'पटना': 'Bihar',
+    'jaipur': 'Rajasthan', 'jodhpur': 'Rajasthan', 'udaipur': 'Rajasthan', 'kota': 'Rajasthan',
+    'जयपुर': 'Rajasthan',
+    'bhopal': 'Madhya Pradesh', 'indore': 'Madhya Pradesh', 'gwalior': 'Madhya Pradesh',
+    'jabalpur': 'Madhya Pradesh', 'भोपाल': 'Madhya Pradesh', 'इंदौर': 'Madhya Pradesh',
+    'ahmedabad': 'Gujarat', 'surat': 'Gujarat', 'vadodara': 'Gujarat', 'rajkot': 'Gujarat',
+    'अहमदाबाद': 'Gujarat',
+    'kolkata': 'West Bengal', 'calcutta': 'West Bengal', 'howrah': 'West Bengal', 'कोलकाता': 'West Bengal',
+    'chennai': 'Tamil Nadu', 'madras': 'Tamil Nadu', 'coimbatore': 'Tamil Nadu', 'madurai': 'Tamil Nadu',
+    'bengaluru': 'Karnataka', 'bangalore': 'Karnataka', 'mysuru': 'Karnataka', 'mysore': 'Karnataka',
+    'hyderabad': 'Telangana', 'warangal': 'Telangana',
+    'visakhapatnam': 'Andhra Pradesh', 'vijayawada': 'Andhra Pradesh',
+    'kochi': 'Kerala', 'thiruvananthapuram': 'Kerala',
+    'bhubaneswar': 'Odisha', 'cuttack': 'Odisha',
+    'ranchi': 'Jharkhand', 'jamshedpur': 'Jharkhand', 'raipur': 'Chhattisgarh',
+    'chandigarh': 'Punjab', 'ludhiana': 'Punjab', 'amritsar': 'Punjab',
+    'dehradun': 'Uttarakhand', 'guwahati': 'Assam', 'shimla': 'Himachal Pradesh',
+    'srinagar': 'Jammu and Kashmir', 'jammu': 'Jammu and Kashmir', 'panaji': 'Goa',
+}
+
+
+def age_band(age):
+    """Age band label such as '26-35'"""
+    age = int(age)
+    for low, high in AGE_BANDS:
+        if age <= high:
+            return f"{low}-{high}"
+    return f"{AGE_BANDS[-1][1] + 1}+"
+
+
+def income_band(income):
+    """The form's value for the income bracket the income falls in, e.g. 12500 for ₹10,000-15,000"""
+    income = int(income)
+    for edge, bracket in zip(INCOME_EDGES, INCOME_BRACKETS):
+        if income <= edge:
+            return INCOME_MAP[bracket]
+    return INCOME_MAP[INCOME_BRACKETS[-1]]
+
+
+def normalize_location(location):
+    """State name when the city or state is recognised, else the cleaned place name"""
+    text = ' '.join(str(location).replace('.', ' ').split()).casefold()
+    parts = [part.strip() for part in text.split(',') if part.strip()]
+
+    for part in parts:
+        if part in STATE_ALIASES:
+            return STATE_ALIASES[part]
+        if part in CITY_STATES:
+            return CITY_STATES[part]
+
+    return parts[0].title() if parts else 'India'
+
+
+def canonical_profile(age, job, income, location, family_size, health_condition, financial_goal, lang):
+    """Bucketed profile that equivalent users share; option labels must be in English"""
+    return {
+        'age_band': age_band(age),
+        'job': job,
+        'income': income_band(income),
+        'location': normalize_location(location),
+        'family_size': family_size,
+        'health_condition': health_condition,
+        'financial_goal': financial_goal,
+        'lang': lang
+    }
+
+
+def profile_key(profile):
+    """Stable cache key: the advice version, then the profile's own JSON so it can be read back"""
+    return f"v{ADVICE_VERSION}:" + json.dumps(profile, sort_keys=True, ensure_ascii=False)
+
+
+def key_profile(key):
+    return json.loads(key.split(':', 1)[1])
+
+
+class AdviceCache:
+    """SQLite-backed advice cache shared by every worker process on the host"""
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS advice ("
+                "key TEXT PRIMARY KEY, advice TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS lookups ("
+                "key TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, "
+                "misses INTEGER NOT NULL DEFAULT 0, last_seen REAL NOT NULL)"
+            )
+            # Advice and traffic of earlier versions are never read again
+            current = f"v{ADVICE_VERSION}:%"
+            self._conn.execute("DELETE FROM advice WHERE key NOT LIKE ?", (current,))
+            self._conn.execute("DELETE FROM lookups WHERE key NOT LIKE ?", (current,))
+
+    def _record(self, key, hit):
+        column = 'hits' if hit else 'misses'
+        self._conn.execute(
+            f"INSERT INTO lookups (key, {column}, last_seen) VALUES (?, 1, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = {column} + 1, last_seen = excluded.last_seen",
+            (key, time.time())
+        )
+
+    def get(self, profile):
+        """Cached advice for the profile, or None on a miss or expired entry"""
+        key = profile_key(profile)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT advice, created_at FROM advice WHERE key = ?", (key,)
+            ).fetchone()
+            hit = row is not None and time.time() - row[1] <= self.ttl
+            self._record(key, hit)
+
+        if hit:
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def contains(self, profile):
+        """True when fresh advice is cached, without counting a lookup"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at FROM advice WHERE key = ?", (profile_key(profile),)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def top_profiles(self, limit):
+        """Most-requested profiles, busiest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM lookups ORDER BY hits + misses DESC, last_seen DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [key_profile(row[0]) for row in rows]
+
+    def put(self, profile, advice):
+        key = profile_key(profile)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO advice (key, advice, created_at) VALUES (?, ?, ?)",
+                (key, advice, time.time())
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM advice")
+
+    def stats(self):
+        """Hit/miss counts for this process and across every process sharing the file"""
+        with self._lock:
+            total_hits, total_misses, profiles = self._conn.execute(
+                "SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0), COUNT(*) FROM lookups"
+            ).fetchone()
+            entries = self._conn.execute("SELECT COUNT(*) FROM advice").fetchone()[0]
+
+        total = total_hits + total_misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': total_hits,
+            'total_misses': total_misses,
+            'hit_rate': total_hits / total if total else 0.0,
+            'distinct_profiles': profiles,
+            'entries': entries
+        }
+
+
+if __name__ == "__main__":
+    print(json.dumps(AdviceCache().stats(), indent=2))
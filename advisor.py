@@ -0,0 +1,336 @@
+"""Streamlit-free advisor core shared by the app and offline jobs"""
+from intents import get_classifier
+from retrieval import prompt_context
+from chat_context import CHAT_HISTORY_TOKENS, chat_messages
+from eligibility import assess, scheme_facts, eligibility_markdown, portfolio_markdown, action_plan_markdown
+
+TRANSLATED_OPTIONS = {
+    'en': {
+        'occupations': ["Farmer", "Driver", "Teacher", "Shopkeeper", "Labor Worker", "Government Employee", "Self Employed", "Private Employee", "Student", "Retired", "Other"],
+        'family_sizes': ["1", "2-3", "4-5", "6+"],
+        'health_status': ["Excellent", "Good", "Fair", "Have medical conditions", "Prefer not to say"],
+        'financial_goals': ["Basic Protection", "Family Security", "Health Coverage", "Retirement Planning", "Child Education", "Wealth Building"],
+        'risk_levels': ["Conservative", "Moderate", "Aggressive"]
+    },
+    'hi': {
+        'occupations': ["किसान", "ड्राइवर", "शिक्षक", "दुकानदार", "मजदूर", "सरकारी कर्मचारी", "स्व-नियोजित", "निजी कर्मचारी", "छात्र", "सेवानिवृत्त", "अन्य"],
+        'family_sizes': ["1", "2-3", "4-5", "6+"],
+        'health_status': ["उत्कृष्ट", "अच्छा", "ठीक", "चिकित्सा समस्याएं हैं", "नहीं बताना चाहते"],
+        'financial_goals': ["बुनियादी सुरक्षा", "पारिवारिक सुरक्षा", "स्वास्थ्य कवरेज", "सेवानिवृत्ति योजना", "बच्चों की शिक्षा", "धन निर्माण"],
+        'risk_levels': ["रूढ़िवादी", "मध्यम", "आक्रामक"]
+    }
+}
+
+INCOME_BRACKETS = [
+    "₹0-5,000", "₹5,000-10,000", "₹10,000-15,000",
+    "₹15,000-25,000", "₹25,000-50,000", "₹50,000+"
+]
+
+INCOME_MAP = {
+    "₹0-5,000": 2500,
+    "₹5,000-10,000": 7500,
+    "₹10,000-15,000": 12500,
+    "₹15,000-25,000": 20000,
+    "₹25,000-50,000": 37500,
+    "₹50,000+": 75000
+}
+
+CLAIM_TYPES = [
+    "Accident Claim (PMSBY)",
+    "Life Insurance Claim (PMJJBY)", 
+    "Health Insurance Claim (PMJAY)",
+    "Other Government Scheme"
+]
+
+CLAIM_HELP = {
+    "Accident Claim (PMSBY)": """
+        **PMSBY Claim Process:**
+        1. Contact bank immediately
+        2. Submit claim form within 30 days
+        3. Required: Death certificate/disability certificate
+        4. Timeline: 30-60 days
+        5. Helpline: 1800-180-1111
+        """,
+    "Life Insurance Claim (PMJJBY)": """
+        **PMJJBY Claim Process:**
+        1. Inform bank within 30 days
+        2. Submit death certificate + claim form
+        3. Bank will process within 30 days
+        4. Amount credited to nominee account
+        5. Helpline: Contact your bank
+        """,
+    "Health Insurance Claim (PMJAY)": """
+        **PMJAY Claim Help:**
+        1. Visit empaneled hospital
+        2. Show Ayushman card at admission
+        3. Cashless treatment for eligible procedures
+        4. For issues: Call 14555
+        5. Website: pmjay.gov.in
+    """
+}
+
+# The rule engine picks the schemes; the model only explains them in a few sentences
+ADVICE_OPTIONS = {
+    'temperature': 0.7,
+    'top_p': 0.9,
+    'max_tokens': 80,
+    'num_ctx': 1024,
+    'num_predict': 80
+}
+
+# Every phi3:mini call uses the same num_ctx: Ollama reloads the model whenever it changes
+CLAIM_OPTIONS = {
+    'temperature': 0.3,
+    'max_tokens': 150,
+    'num_ctx': 1024,
+    'num_predict': 150
+}
+
+CHAT_OPTIONS = {
+    'temperature': 0.3,
+    'max_tokens': 100,   # Very short for speed
+    'num_ctx': 1024,     # Room for the conversation so far; Ollama reuses its evaluated prefix
+    'num_predict': 100   # Fast prediction
+}
+
+CHAT_SYSTEM = "Insurance expert for India. Answer the user's insurance questions briefly and practically."
+
+PROFILE_FIELDS = ['age', 'job', 'income', 'location', 'family_size', 'health_condition', 'financial_goal']
+# Profile fields that must be one of the form's option labels, in any language
+OPTION_FIELDS = {'job': 'occupations', 'family_size': 'family_sizes', 'health_condition': 'health_status',
+                 'financial_goal': 'financial_goals'}
+
+
+def to_english_option(options_key, value, lang):
+    """Map a translated option label back to its English label"""
+    options = TRANSLATED_OPTIONS.get(lang, {}).get(options_key, [])
+    if value in options:
+        return TRANSLATED_OPTIONS['en'][options_key][options.index(value)]
+    return value
+
+
+def to_local_option(options_key, value, lang):
+    """Map an English option label to its label in the given language"""
+    options = TRANSLATED_OPTIONS['en'].get(options_key, [])
+    if value in options and lang in TRANSLATED_OPTIONS:
+        return TRANSLATED_OPTIONS[lang][options_key][options.index(value)]
+    return value
+
+
+def parse_profile(body):
+    """Form fields from a request body or applicant row, with the income bracket label resolved to a number"""
+    missing = [field for field in PROFILE_FIELDS if body.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    fields = {field: body[field] for field in PROFILE_FIELDS}
+    for field, options_key in OPTION_FIELDS.items():
+        if not any(fields[field] in options[options_key] for options in TRANSLATED_OPTIONS.values()):
+            raise ValueError(f"{field} must be one of: {', '.join(TRANSLATED_OPTIONS['en'][options_key])}")
+    if isinstance(fields['income'], str) and fields['income'] in INCOME_MAP:
+        fields['income'] = INCOME_MAP[fields['income']]
+    try:
+        fields['age'] = int(fields['age'])
+        fields['income'] = int(fields['income'])
+    except (TypeError, ValueError):
+        raise ValueError("age and income must be numbers or an income bracket label")
+    return fields
+
+
+def build_advice_prompt(age, job, income, location, family_size, health_condition, financial_goal, lang='en',
+                        facts=''):
+    """phi3:mini prompt asking for a short explanation of the schemes the rule engine picked"""
+    if lang == 'hi':
+        prompt = f"""भारत के लिए बीमा सलाहकार। हिंदी में सलाह चाहिए:
+
+प्रोफाइल: {age} साल, {job}, ₹{income}/महीना, {location}, परिवार: {family_size}
+लक्ष्य: {financial_goal}
+स्वास्थ्य: {health_condition}
+
+सुझाई गई योजनाएं:
+{facts}
+
+3 छोटे वाक्यों में बताएं कि ये योजनाएं क्यों उपयुक्त हैं और पहला कदम क्या है। दूसरी योजनाएं न जोड़ें।"""
+    else:
+        prompt = f"""Insurance advisor for India. Quick advice needed:
+
+Profile: {age}yr {job}, ₹{income}/month, {location}, family:{family_size}
+Goal: {financial_goal}
+Health: {health_condition}
+
+Recommended schemes:
+{facts}
+
+In 3 short sentences: why these suit this person and the first step. Do not add other schemes."""
+
+    return prompt
+
+
+def profile_advice_prompt(profile):
+    """Advice prompt for a bucketed profile from advice_cache.canonical_profile"""
+    lang = profile['lang']
+    return build_advice_prompt(
+        profile['age_band'],
+        to_local_option('occupations', profile['job'], lang),
+        profile['income'],
+        profile['location'],
+        profile['family_size'],
+        to_local_option('health_status', profile['health_condition'], lang),
+        to_local_option('financial_goals', profile['financial_goal'], lang),
+        lang,
+        facts=scheme_facts(assess(profile))
+    )
+
+
+def grounding(context):
+    """Prompt section with the retrieved scheme snippets, empty when nothing matched"""
+    return f"Facts:\n{context}\n\n" if context else ""
+
+
+def build_chat_prompt(question, history=(), summary=''):
+    """phi3:mini chat messages for a chatbot question, grounded in the best-matching scheme snippets.
+
+    history holds the earlier turns to send verbatim and summary the folded
+    older ones; the facts leave CHAT_HISTORY_TOKENS of the context for them.
+    """
+    facts = grounding(prompt_context(question, dict(CHAT_OPTIONS, num_ctx=CHAT_OPTIONS['num_ctx'] - CHAT_HISTORY_TOKENS)))
+    prompt = f"""{facts}Q: {question}
+
+Give brief, practical answer in 2-3 lines. Focus on actionable steps."""
+    budget = CHAT_OPTIONS['num_ctx'] - CHAT_OPTIONS['num_predict']
+    return chat_messages(CHAT_SYSTEM, prompt, history, summary, budget)
+
+
+def build_claim_prompt(claim_type, issue_description):
+    """phi3:mini prompt for the claim assistant, grounded in the best-matching scheme snippets"""
+    facts = grounding(prompt_context(f"{claim_type} {issue_description}", CLAIM_OPTIONS))
+    return f"""Insurance claim help for India:
+
+{facts}Type: {claim_type}
+Issue: {issue_description}
+
+Quick help needed:
+1. What to do now
+2. Documents needed
+3. Contact info
+4. Timeline
+
+Keep brief, actionable advice only."""
+
+
+def format_advice(ai_advice, profile=None):
+    """Wrap the model's explanation in the full advice report, with the rule engine's checks for the profile"""
+    if profile is not None:
+        assessment = assess(profile)
+        checks = f"""
+{eligibility_markdown(assessment)}
+
+---
+
+{portfolio_markdown(assessment)}
+
+---
+
+{action_plan_markdown(assessment)}
+"""
+    else:
+        checks = STANDARD_PORTFOLIO + STANDARD_ACTION_PLAN
+
+    return f"""
+## 🤖 AI Insurance Advisor Analysis (Powered by phi3:mini - Lightning Fast!)
+
+{ai_advice}
+
+---
+{checks}
+**Response time:** Under 10 seconds with phi3:mini!
+"""
+
+
+STANDARD_PORTFOLIO = """
+## 📊 Recommended Insurance Portfolio
+
+### 1. PMSBY - Accident Insurance ✅
+- **Premium:** ₹20 per year
+- **Coverage:** ₹2 lakh accident protection
+- **Best for:** Everyone (mandatory recommendation)
+- **Apply at:** Any bank branch with Aadhaar
+
+### 2. PMJJBY - Life Insurance ✅  
+- **Premium:** ₹436 per year
+- **Coverage:** ₹2 lakh life cover
+- **Best for:** Families with dependents
+- **Apply at:** Bank with auto-debit facility
+
+### 3. PMJAY - Ayushman Bharat Health Insurance ✅
+- **Premium:** FREE for eligible families
+- **Coverage:** ₹5 lakh per family per year
+- **Best for:** Families earning < ₹1.8L annually
+- **Check eligibility:** pmjay.gov.in
+
+### 4. Atal Pension Yojana (APY) 💰
+- **Premium:** ₹42-₹291 per month (age dependent)
+- **Coverage:** ₹1,000-₹5,000 monthly pension
+- **Best for:** Retirement planning
+- **Apply at:** Any bank
+
+---
+"""
+
+STANDARD_ACTION_PLAN = """
+## 💡 Your Personalized Action Plan:
+1. **This Week:** Visit bank for PMSBY (₹20) - Easiest to start
+2. **Next Week:** Apply for PMJJBY if you have family
+3. **Check online:** PMJAY eligibility on official website
+4. **Long-term:** Consider APY for retirement
+
+**Total Annual Investment:** ₹456-₹3,948 (based on your needs)
+"""
+
+
+def fallback_advice(age, job, income, location):
+    """Static recommendations used when phi3:mini is unavailable"""
+    return f"""
+## 🛡️ Smart Insurance Recommendations
+
+**Your Profile:** {age} years, {job}, ₹{income}/month, {location}
+
+### Essential Coverage Portfolio:
+
+**1. PMSBY - Accident Shield (₹20/year) 🚨**
+- India's cheapest accident insurance
+- ₹2 lakh coverage for workplace/travel accidents
+- Must-have for all working individuals
+
+**2. PMJJBY - Family Protection (₹436/year) 👨‍👩‍👧‍👦**
+- ₹2 lakh life insurance coverage
+- Automatic premium deduction
+- Ideal for families with children
+
+**3. PMJAY - Free Healthcare (₹0/year) 🏥**
+- Completely FREE for eligible families
+- ₹5 lakh hospitalization coverage
+- Covers 1,400+ procedures
+
+**4. State Health Insurance 🏥**
+- Check your state's specific schemes
+- Often provides additional coverage
+- May cover outpatient treatments
+
+### Quick Action Steps:
+1. **Today:** Check PMJAY eligibility online
+2. **This week:** Visit nearest bank with Aadhaar
+3. **Apply for:** PMSBY first (lowest cost, high value)
+
+**Your Total Protection Cost: ₹456/year for complete family coverage!**
+"""
+
+
+def simple_answer(question, lang='en'):
+    """Canned chatbot answer from the intent classifier"""
+    return get_classifier().answer(question, lang)
+
+
+def knowledge_based_response(prompt):
+    """Fallback knowledge-based responses"""
+    return get_classifier().guide(prompt)
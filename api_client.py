@@ -0,0 +1,68 @@
+"""Blocking client for service.py, used by the Streamlit app when ADVISOR_API_URL is set"""
+import json
+import os
+
+API_URL = os.environ.get('ADVISOR_API_URL', '')
+API_TIMEOUT = float(os.environ.get('ADVISOR_API_TIMEOUT', '120'))
+
+
+class AdvisorAPIError(Exception):
+    """Raised when the advisor API refuses a request or ends a stream with an error"""
+
+
+class AdvisorClient:
+    """Keep-alive HTTP client for the advisor API; safe to share between sessions"""
+
+    def __init__(self, base_url=API_URL, timeout=API_TIMEOUT):
+        # Imported here so the app can read API_URL without loading an HTTP stack it may never use
+        import httpx
+
+        self.client = httpx.Client(base_url=base_url, timeout=timeout)
+
+    def _check(self, response):
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('error')
+            except ValueError:
+                message = response.text
+            raise AdvisorAPIError(f"{response.status_code}: {message}")
+
+    def call(self, path, payload):
+        """Final answer event of an /advice, /chat or /claim request"""
+        response = self.client.post(path, json=payload)
+        self._check(response)
+        return response.json()
+
+    def tokens(self, path, payload, result):
+        """Yield streamed tokens; the final answer event is stored in result"""
+        with self.client.stream('POST', path, json=dict(payload, stream=True)) as response:
+            if response.status_code >= 400:
+                response.read()
+                self._check(response)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if 'error' in event:
+                    raise AdvisorAPIError(event['error'])
+                if event.get('done'):
+                    result.update(event)
+                elif event.get('token'):
+                    yield event['token']
+
+    def premium(self, **selection):
+        response = self.client.post('/premium', json=selection)
+        self._check(response)
+        return response.json()
+
+    def health(self):
+        """The service's /health answer, including the state of its model"""
+        response = self.client.get('/health')
+        self._check(response)
+        return response.json()
+
+    def report(self, user_data, advice, lang='en'):
+        """PDF bytes of the report for a profile and its advice"""
+        response = self.client.post('/report.pdf', json=dict(user_data, advice=advice, lang=lang))
+        self._check(response)
+        return response.content
@@ -2,15 +2,29 @@ import streamlit as st
 import time
 import json
 from datetime import datetime
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-import io
+import importlib.util
 import os
-import requests
+import uuid
+
+from advice_cache import AdviceCache, canonical_profile
+from advisor import (
+    TRANSLATED_OPTIONS, INCOME_BRACKETS, INCOME_MAP, CLAIM_TYPES, CLAIM_HELP,
+    ADVICE_OPTIONS, CLAIM_OPTIONS, CHAT_OPTIONS, CHAT_SYSTEM,
+    to_english_option, profile_advice_prompt,
+    build_chat_prompt, build_claim_prompt, format_advice, fallback_advice,
+    simple_answer, knowledge_based_response
+)
+from api_client import API_URL
+from chat_context import compact_history, trim_history, is_follow_up
+from intents import INTENT_ROUTING, get_classifier
+from metrics import get_registry, start_metrics_server
+from model_lifecycle import DOWN_STATES, HEALTH_INTERVAL, ModelMonitor
+from premium_engine import APY_PENSIONS, quote, optimize_plan
+from semantic_cache import SemanticCache
+from session_store import (
+    SESSION_DEFAULTS, SESSION_TOKEN_ROTATE, new_state, encode_state, open_session_store,
+    new_session_id, issue_token, redeem_token, revoke_token
+)
 
 st.set_page_config(
     page_title="GenAI Insurance Advisor", 
@@ -19,142 +33,38 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-try:
-    import ollama
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
+# The Ollama client, Hugging Face fallback, API client and PDF renderer are imported on first use,
+# so a new server process renders its first page without loading them
+OLLAMA_INSTALLED = importlib.util.find_spec('ollama') is not None
 
+MODEL_STATUS = {
+    'ready': "⚡ Online", 'cold': "⏳ Loading", 'loading': "⏳ Loading", 'unknown': "Checking...",
+    'missing': "Not pulled", 'offline': "Offline",
+}
 
-def get_free_ai_response(prompt, max_retries=3):
-    """Use Hugging Face's free inference API"""
-    
-    models = [
-        "microsoft/DialoGPT-large",
-        "facebook/blenderbot-400M-distill",
-        "microsoft/DialoGPT-medium"
-    ]
-    
-    for model in models:
-        for attempt in range(max_retries):
-            try:
-                API_URL = f"https://api-inference.huggingface.co/models/{model}"
-                
-                # Check if API key exists
-                api_key = ""
-                try:
-                    api_key = st.secrets.get('HUGGINGFACE_API_KEY', '')
-                except:
-                    pass
-                
-                headers = {
-                    "Authorization": f"Bearer {api_key}"
-                } if api_key else {}
-                
-                formatted_prompt = f"Insurance Expert: {prompt}\nResponse:"
-                
-                payload = {
-                    "inputs": formatted_prompt,
-                    "parameters": {
-                        "max_length": 200,
-                        "temperature": 0.7,
-                        "do_sample": True
-                    }
-                }
-                
-                response = requests.post(API_URL, headers=headers, json=payload, timeout=30)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if isinstance(result, list) and len(result) > 0:
-                        if 'generated_text' in result[0]:
-                            text = result[0]['generated_text']
-                            if "Response:" in text:
-                                text = text.split("Response:")[-1].strip()
-                            return text
-                elif response.status_code == 503:
-                    break
-                    
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    continue
-                
-    return get_knowledge_based_response(prompt)
 
-def get_knowledge_based_response(prompt):
-    """Fallback knowledge-based responses"""
-    prompt_lower = prompt.lower()
+@st.cache_resource
+def get_huggingface_api_key():
+    """Resolve the Hugging Face API key once per process"""
+    api_key = os.environ.get('HUGGINGFACE_API_KEY', '')
+    try:
+        api_key = st.secrets.get('HUGGINGFACE_API_KEY', api_key)
+    except:
+        pass
+    return api_key
+
+def get_free_ai_response(prompt, max_retries=3, channel='claim'):
+    """Use Hugging Face's free inference API, racing the models in hedged mode"""
+    from hf_fallback import query_models_hedged
+
+    text = query_models_hedged(prompt, get_huggingface_api_key(), max_retries=max_retries)
+    if text:
+        get_registry().record_response(channel, 'huggingface')
+        return text
     
-    if any(word in prompt_lower for word in ['claim', 'file', 'document']):
-        return """To file an insurance claim:
-        
-1. **Report immediately** - Contact your insurer within 24-48 hours
-2. **Gather documents** - Policy number, incident details, photos, receipts
-3. **Fill forms accurately** - Complete all claim forms truthfully
-4. **Submit promptly** - Don't delay submission
-5. **Follow up** - Keep track of your claim status
-6. **Keep records** - Maintain copies of all communications
-
-Most claims are processed within 7-15 business days if all documents are complete."""
-
-    elif any(word in prompt_lower for word in ['advice', 'recommend', 'choose', 'best']):
-        return """Microinsurance Guidance:
-
-**Health Insurance:**
-- Covers medical emergencies and hospitalization
-- Look for cashless facility at nearby hospitals
-- Check waiting periods for pre-existing conditions
-
-**Life Insurance:**
-- Provides financial security to your family
-- Term insurance offers maximum coverage at low cost
-- Consider your family's monthly expenses × 120 months
-
-**General Tips:**
-- Start with basic health coverage
-- Pay premiums on time to avoid policy lapse
-- Understand exclusions and waiting periods
-- Keep all policy documents safe
-- Review coverage annually"""
-
-    elif any(word in prompt_lower for word in ['premium', 'cost', 'payment', 'afford']):
-        return """Managing Insurance Costs:
-
-**Reduce Premiums:**
-- Buy policies when young and healthy
-- Choose higher deductibles if you can afford them
-- Look for group insurance through employers
-- Compare quotes from multiple insurers
-
-**Payment Tips:**
-- Set up automatic payments to avoid lapses
-- Pay annually instead of monthly to save on fees
-- Use digital payment methods for convenience
-- Keep payment receipts for tax benefits
-
-**Budget Planning:**
-- Allocate 10-15% of income for insurance
-- Prioritize health insurance first
-- Build emergency fund alongside insurance"""
+    get_registry().record_response(channel, 'knowledge_base')
+    return knowledge_based_response(prompt)
 
-    else:
-        return """I'm here to help with your insurance questions! 
-
-**I can assist with:**
-- Choosing the right insurance policy
-- Understanding claim procedures
-- Comparing different insurance options
-- Managing premium payments
-- Understanding policy terms and conditions
-
-**Popular Topics:**
-- Health insurance coverage
-- Life insurance planning
-- Claim filing process
-- Premium calculation
-- Policy renewal procedures
-
-Feel free to ask specific questions about any insurance topic!"""
 # 1. TRANSLATIONS AND CONFIGURATIONS
 TRANSLATIONS = {
     'en': {
@@ -231,238 +141,287 @@ TRANSLATIONS = {
     }
 }
 
-TRANSLATED_OPTIONS = {
-    'en': {
-        'occupations': ["Farmer", "Driver", "Teacher", "Shopkeeper", "Labor Worker", "Government Employee", "Self Employed", "Private Employee", "Student", "Retired", "Other"],
-        'family_sizes': ["1", "2-3", "4-5", "6+"],
-        'health_status': ["Excellent", "Good", "Fair", "Have medical conditions", "Prefer not to say"],
-        'financial_goals': ["Basic Protection", "Family Security", "Health Coverage", "Retirement Planning", "Child Education", "Wealth Building"],
-        'risk_levels': ["Conservative", "Moderate", "Aggressive"]
-    },
-    'hi': {
-        'occupations': ["किसान", "ड्राइवर", "शिक्षक", "दुकानदार", "मजदूर", "सरकारी कर्मचारी", "स्व-नियोजित", "निजी कर्मचारी", "छात्र", "सेवानिवृत्त", "अन्य"],
-        'family_sizes': ["1", "2-3", "4-5", "6+"],
-        'health_status': ["उत्कृष्ट", "अच्छा", "ठीक", "चिकित्सा समस्याएं हैं", "नहीं बताना चाहते"],
-        'financial_goals': ["बुनियादी सुरक्षा", "पारिवारिक सुरक्षा", "स्वास्थ्य कवरेज", "सेवानिवृत्ति योजना", "बच्चों की शिक्षा", "धन निर्माण"],
-        'risk_levels': ["रूढ़िवादी", "मध्यम", "आक्रामक"]
-    }
-}
-
 LANGUAGES = {
     'en': '🇺🇸 English',
     'hi': '🇮🇳 हिंदी'
 }
 # 2. CONFIGURATION FUNCTIONS 
+CACHE_NAMESPACES = {}
+
+def register_cache_clear(namespace, clear):
+    """Register a cache-clearing callable under an invalidation namespace"""
+    CACHE_NAMESPACES.setdefault(namespace, []).append(clear)
+
+def cache_namespace(namespace):
+    """Decorator registering a Streamlit-cached function under a namespace"""
+    def register(func):
+        register_cache_clear(namespace, func.clear)
+        return func
+    return register
+
+def clear_cache_namespace(namespace):
+    """Clear only the caches in one namespace, leaving every other cached entry intact"""
+    for clear in CACHE_NAMESPACES.get(namespace, []):
+        clear()
+
+@cache_namespace('config')
 @st.cache_data
-def get_static_config():
-    """Cache static configuration data with language support"""
-    lang = st.session_state.get('selected_language', 'en')
-    
+def get_static_config(lang='en'):
+    """Cache static configuration data per language"""
     return {
         'occupations': TRANSLATED_OPTIONS[lang]['occupations'],
-        'income_brackets': [
-            "₹0-5,000", "₹5,000-10,000", "₹10,000-15,000",
-            "₹15,000-25,000", "₹25,000-50,000", "₹50,000+"
-        ],
-        'income_map': {
-            "₹0-5,000": 2500,
-            "₹5,000-10,000": 7500,
-            "₹10,000-15,000": 12500,
-            "₹15,000-25,000": 20000,
-            "₹25,000-50,000": 37500,
-            "₹50,000+": 75000
-        },
+        'income_brackets': INCOME_BRACKETS,
+        'income_map': INCOME_MAP,
         'family_sizes': TRANSLATED_OPTIONS[lang]['family_sizes'],
         'health_status': TRANSLATED_OPTIONS[lang]['health_status'],
         'financial_goals': TRANSLATED_OPTIONS[lang]['financial_goals'],
         'risk_levels': TRANSLATED_OPTIONS[lang]['risk_levels'],
-        'claim_types': [
-            "Accident Claim (PMSBY)",
-            "Life Insurance Claim (PMJJBY)", 
-            "Health Insurance Claim (PMJAY)",
-            "Other Government Scheme"
-        ]
+        'claim_types': CLAIM_TYPES
     }
 
+@st.cache_resource
+def get_session_store():
+    """Session store shared by every session of this server process"""
+    return open_session_store()
+
 def init_session_state():
-    """Initialize session state efficiently"""
-    defaults = {
-        'advice_generated': False,
-        'user_data': {},
-        'advice_content': "",
-        'processing': False,
-        'chat_history': [],
-        'premium_calculator': False,
-        'claim_assistant': False,
-        'selected_language': 'en'
-    }
-    
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
+    """Load this session's plan, chat and language from the session store for this run"""
+    rotate_session_token()
+    state = get_session_store().get(get_session_id()) or new_state()
+    for key, default in SESSION_DEFAULTS.items():
+        st.session_state[key] = state.get(key, default)
+    st.session_state.stored_state = encode_state({key: st.session_state[key] for key in SESSION_DEFAULTS})
+    if 'processing' not in st.session_state:
+        st.session_state.processing = False
 
-def clear_language_cache():
-    """Clear cached data when language changes"""
-    try:
-        st.cache_data.clear()
-    except:
-        pass
+def save_session_state():
+    """Write this run's changes back to the session store and drop the in-memory copy until the next run"""
+    if 'stored_state' not in st.session_state:
+        return
+    state = {key: st.session_state.get(key, default) for key, default in SESSION_DEFAULTS.items()}
+    if encode_state(state) != st.session_state.stored_state:
+        get_session_store().put(get_session_id(), state)
+    for key in SESSION_DEFAULTS:
+        st.session_state.pop(key, None)
+    del st.session_state['stored_state']
 
 def get_text(key, lang='en'):
     """Get translated text"""
     return TRANSLATIONS.get(lang, {}).get(key, TRANSLATIONS['en'].get(key, key))
 # 3. AI FUNCTIONS
+@cache_namespace('advice')
 @st.cache_data(ttl=1800)
 def get_cached_fallback_advice(age, job, income, location):
     """Cache fallback advice to avoid regeneration"""
-    return f"""
-## 🛡️ Smart Insurance Recommendations
-
-**Your Profile:** {age} years, {job}, ₹{income}/month, {location}
+    return fallback_advice(age, job, income, location)
 
-### Essential Coverage Portfolio:
+STREAMING_ENABLED = os.environ.get('ADVISOR_STREAMING', '1') != '0'
 
-**1. PMSBY - Accident Shield (₹20/year) 🚨**
-- India's cheapest accident insurance
-- ₹2 lakh coverage for workplace/travel accidents
-- Must-have for all working individuals
+@st.cache_resource
+def start_metrics():
+    """Start the Prometheus /metrics endpoint once per server process"""
+    return start_metrics_server()
 
-**2. PMJJBY - Family Protection (₹436/year) 👨‍👩‍👧‍👦**
-- ₹2 lakh life insurance coverage
-- Automatic premium deduction
-- Ideal for families with children
+def latency_text():
+    """Live p50/p95 of recent model calls for the header, or None before the first call"""
+    summary = get_registry().latency_summary()
+    if not summary['count']:
+        return None
+    return f"{summary['p50']:.1f}s", f"p95 {summary['p95']:.1f}s"
 
-**3. PMJAY - Free Healthcare (₹0/year) 🏥**
-- Completely FREE for eligible families
-- ₹5 lakh hospitalization coverage
-- Covers 1,400+ procedures
+def get_session_id():
+    """Stable id for this browser session; it owns the session's model calls and keys its stored state.
 
-**4. State Health Insurance 🏥**
-- Check your state's specific schemes
-- Often provides additional coverage
-- May cover outpatient treatments
-
-### Quick Action Steps:
-1. **Today:** Check PMJAY eligibility online
-2. **This week:** Visit nearest bank with Aadhaar
-3. **Apply for:** PMSBY first (lowest cost, high value)
+    The id never appears in the page; a new browser session resumes a stored
+    one only by redeeming the single-use token in the URL.
+    """
+    if 'session_id' not in st.session_state:
+        session_id = redeem_token(get_session_store(), st.query_params.get('s', ''))
+        st.session_state.session_id = session_id or new_session_id()
+    return st.session_state.session_id
+
+def rotate_session_token():
+    """Put a fresh token for this session in the URL when it has none or its token is due for replacing.
+
+    A reload, a restarted worker or another replica resumes the session from
+    the URL; a token that was redeemed, replaced or left for longer than
+    SESSION_TOKEN_TTL does not, so old, shared and bookmarked URLs open a new
+    session instead of someone's plan.
+    """
+    if time.time() - st.session_state.get('session_token_issued', 0) < SESSION_TOKEN_ROTATE:
+        return
+    store = get_session_store()
+    session_id = get_session_id()
+    if st.session_state.get('session_token'):
+        revoke_token(store, st.session_state.session_token)
+    st.session_state.session_token = issue_token(store, session_id)
+    st.session_state.session_token_issued = time.time()
+    st.query_params.pop('sid', None)
+    st.query_params['s'] = st.session_state.session_token
+
+def cancel_session_generations(channel=None):
+    """Stop this session's queued and running generations in the gateway"""
+    if OLLAMA_INSTALLED:
+        get_llm_gateway().cancel(get_session_id(), channel)
+
+def cancel_stale_requests():
+    """Clear state left over from a run that Streamlit interrupted.
+
+    Only one run per session executes at a time, so a processing flag still
+    set when a run starts is stale; the gateway supersedes the interrupted
+    run's generation when this run asks for a new one.
+    """
+    st.session_state.processing = False
 
-**Your Total Protection Cost: ₹456/year for complete family coverage!**
-"""
+@st.cache_resource
+def get_model_monitor():
+    """Background probe that preloads phi3:mini and tracks its state, one per server process"""
+    return ModelMonitor(options=CHAT_OPTIONS, prime=CHAT_SYSTEM).start()
 
-@st.cache_data(ttl=1800)
-def get_cached_genai_advice(age, job, income, location, family_size, health_condition, financial_goal):
-    """Cache AI advice to avoid repeated API calls"""
-    return get_genai_advice_internal(age, job, income, location, family_size, health_condition, financial_goal)
+def ollama_available():
+    """Whether to send requests to phi3:mini: its client is installed and Ollama was not found down"""
+    return OLLAMA_INSTALLED and get_model_monitor().usable()
 
-def get_genai_advice_internal(age, job, income, location, family_size, health_condition, financial_goal):
-    """Generate advice using phi3:mini with language support"""
+@st.cache_data(ttl=HEALTH_INTERVAL)
+def get_api_model_state():
+    """phi3:mini's state as the advisor API's own monitor sees it"""
+    try:
+        return get_api_client().health()['model']['state']
+    except Exception:
+        return 'offline'
+
+def model_state():
+    """phi3:mini's state for the header, from whichever process runs the model"""
+    if get_api_client() is not None:
+        return get_api_model_state()
+    return get_model_monitor().state if OLLAMA_INSTALLED else 'offline'
+
+@st.cache_resource
+def get_llm_gateway():
+    """One pooled, bounded-concurrency phi3:mini gateway per server process"""
+    from llm_gateway import LLMGateway
+
+    return LLMGateway()
+
+@st.cache_resource
+def get_api_client():
+    """Shared client for the headless advisor API, or None to run the models in-process"""
+    if not API_URL:
+        return None
+    from api_client import AdvisorClient
+
+    return AdvisorClient()
+
+def ask_api(path, payload, stream=False):
+    """Final answer event from the advisor API, streaming its tokens into the page when enabled"""
+    payload = dict(payload, session_id=get_session_id(), lang=st.session_state.get('selected_language', 'en'))
+    client = get_api_client()
+    if not stream:
+        return client.call(path, payload)
+    result = {}
+    result['streamed'] = bool(st.write_stream(client.tokens(path, payload, result)))
+    return result
+
+def show_api_answer(path, payload, stream=False):
+    """Answer text from the advisor API, writing it out when it was not streamed"""
+    result = ask_api(path, payload, stream=stream)
+    if stream and not result.get('streamed'):
+        st.write(result['text'])
+    return result['text']
+
+def ask_phi3(prompt, options, stream=False, channel='chat'):
+    """Ask phi3:mini through the shared gateway, streaming tokens into the page when enabled.
+
+    A new request on the same channel supersedes this session's previous one.
+    """
+    tokens = get_llm_gateway().stream(prompt, options, owner=(get_session_id(), channel))
+    try:
+        if stream:
+            return st.write_stream(tokens)
+        return collect_tokens(tokens)
+    except Exception:
+        # Let the monitor find out now whether Ollama went away, so the next requests fall back at once
+        get_model_monitor().check_soon()
+        raise
+    finally:
+        tokens.close()
+
+def collect_tokens(tokens):
+    """Gather a blocking generation, updating a progress line so a rerun can interrupt it"""
+    progress = st.empty()
+    parts = []
+    last_update = time.monotonic()
+    try:
+        for token in tokens:
+            parts.append(token)
+            if time.monotonic() - last_update > 0.5:
+                progress.caption(f"⏳ phi3:mini is writing... ({len(parts)} tokens)")
+                last_update = time.monotonic()
+    finally:
+        progress.empty()
+    return ''.join(parts)
+
+@st.cache_resource
+def get_advice_cache():
+    """Persistent advice cache keyed by bucketed profile, shared across worker processes"""
+    return AdviceCache()
+
+register_cache_clear('advice', lambda: get_advice_cache().clear())
+
+def get_cached_genai_advice(age, job, income, location, family_size, health_condition, financial_goal, stream=False):
+    """Cache AI advice per bucketed profile to avoid repeated API calls"""
+    if get_api_client() is not None:
+        return ask_api('/advice', {
+            'age': age, 'job': job, 'income': income, 'location': location, 'family_size': family_size,
+            'health_condition': health_condition, 'financial_goal': financial_goal
+        }, stream=stream)['text']
     
     lang = st.session_state.get('selected_language', 'en')
-    
-    if not OLLAMA_AVAILABLE:
+    profile = canonical_profile(
+        age,
+        to_english_option('occupations', job, lang),
+        income,
+        location,
+        family_size,
+        to_english_option('health_status', health_condition, lang),
+        to_english_option('financial_goals', financial_goal, lang),
+        lang
+    )
+    
+    cache = get_advice_cache()
+    cached = cache.get(profile)
+    get_registry().record_cache('advice', cached is not None)
+    if cached is not None:
+        get_registry().record_response('advice', 'cache')
+        return cached
+    
+    if not ollama_available():
+        get_registry().record_response('advice', 'knowledge_base')
         return get_cached_fallback_advice(age, job, income, location)
     
-    if lang == 'hi':
-        prompt = f"""भारत के लिए बीमा सलाहकार। हिंदी में सलाह चाहिए:
-
-प्रोफाइल: {age} साल, {job}, ₹{income}/महीना, {location}, परिवार: {family_size}
-लक्ष्य: {financial_goal}
-स्वास्थ्य: {health_condition}
-
-टॉप 3 बीमा योजनाओं में सुझाव दें:
-- प्रीमियम लागत
-- कवरेज राशि
-- क्यों उपयुक्त है
-- कैसे आवेदन करें
-
-PMSBY, PMJJBY, PMJAY पर फोकस करें। संक्षिप्त रखें।"""
-    else:
-        prompt = f"""Insurance advisor for India. Quick advice needed:
-
-Profile: {age}yr {job}, ₹{income}/month, {location}, family:{family_size}
-Goal: {financial_goal}
-Health: {health_condition}
-
-Recommend top 3 insurance schemes with:
-- Premium cost
-- Coverage amount  
-- Why suitable
-- How to apply
-
-Focus on PMSBY, PMJJBY, PMJAY. Keep brief."""
-
     try:
-        response = ollama.chat(
-            model='phi3:mini',
-            messages=[{'role': 'user', 'content': prompt}],
-            stream=False,
-            options={
-                'temperature': 0.7,
-                'top_p': 0.9,        
-                'max_tokens': 200,
-                'num_ctx': 1024,
-                'num_predict': 200
-            }
-        )
-        
-        ai_advice = response['message']['content']
-        
-        full_advice = f"""
-## 🤖 AI Insurance Advisor Analysis (Powered by phi3:mini - Lightning Fast!)
-
-{ai_advice}
-
----
-
-## 📊 Recommended Insurance Portfolio
-
-### 1. PMSBY - Accident Insurance ✅
-- **Premium:** ₹20 per year
-- **Coverage:** ₹2 lakh accident protection
-- **Best for:** Everyone (mandatory recommendation)
-- **Apply at:** Any bank branch with Aadhaar
-
-### 2. PMJJBY - Life Insurance ✅  
-- **Premium:** ₹436 per year
-- **Coverage:** ₹2 lakh life cover
-- **Best for:** Families with dependents
-- **Apply at:** Bank with auto-debit facility
-
-### 3. PMJAY - Ayushman Bharat Health Insurance ✅
-- **Premium:** FREE for eligible families
-- **Coverage:** ₹5 lakh per family per year
-- **Best for:** Families earning < ₹1.8L annually
-- **Check eligibility:** pmjay.gov.in
-
-### 4. Atal Pension Yojana (APY) 💰
-- **Premium:** ₹42-₹291 per month (age dependent)
-- **Coverage:** ₹1,000-₹5,000 monthly pension
-- **Best for:** Retirement planning
-- **Apply at:** Any bank
-
----
-
-## 💡 Your Personalized Action Plan:
-1. **This Week:** Visit bank for PMSBY (₹20) - Easiest to start
-2. **Next Week:** Apply for PMJJBY if you have family
-3. **Check online:** PMJAY eligibility on official website
-4. **Long-term:** Consider APY for retirement
-
-**Total Annual Investment:** ₹456-₹3,948 (based on your needs)
-**Response time:** Under 10 seconds with phi3:mini!
-"""
-        
-        return full_advice
-        
+        # Generate from the bucketed profile so the cached text fits everyone in the bucket
+        ai_advice = ask_phi3(profile_advice_prompt(profile), ADVICE_OPTIONS, stream=stream, channel='advice')
     except Exception as e:
         st.error(f"phi3:mini AI Error: {str(e)}. Using fallback recommendations...")
+        get_registry().record_response('advice', 'knowledge_base')
         return get_cached_fallback_advice(age, job, income, location)
+    
+    advice = format_advice(ai_advice, profile)
+    
+    get_registry().record_response('advice', 'phi3')
+    cache.put(profile, advice)
+    return advice
+
 # 4. FEATURE FUNCTIONS
 def premium_calculator():
     """Optimized premium calculator with cached calculations"""
     st.subheader("💰 Premium Calculator")
     
+    user_data = st.session_state.get('user_data') or {}
+    age = int(user_data.get('age', 30))
+    family_size = user_data.get('family_size', '1')
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -471,9 +430,10 @@ def premium_calculator():
         pmjjby = st.checkbox("PMJJBY - Life (₹436/year)")
         apy = st.checkbox("Atal Pension Yojana")
         
-        apy_amount = "₹42"
+        apy_pension = 1000
         if apy:
-            apy_amount = st.selectbox("APY Monthly:", ["₹42", "₹84", "₹168", "₹291"])
+            apy_pension = st.selectbox("APY Pension at 60 (₹/month):", [int(p) for p in APY_PENSIONS],
+                                       format_func=lambda p: f"₹{p:,}")
     
     with col2:
         st.write("**Additional Coverage:**")
@@ -487,52 +447,54 @@ def premium_calculator():
         if term_insurance:
             term_premium = st.slider("Term Premium (₹/month):", 300, 3000, 800)
     
-    total_annual = 0
-    if pmsby: total_annual += 20
-    if pmjjby: total_annual += 436
-    if apy: 
-        apy_map = {"₹42": 504, "₹84": 1008, "₹168": 2016, "₹291": 3492}
-        total_annual += apy_map.get(apy_amount, 504)
-    if health_addon: 
-        total_annual += health_premium * 12
-    if term_insurance: 
-        total_annual += term_premium * 12
+    plan = quote(
+        age=age,
+        family_size=family_size,
+        pmsby=pmsby,
+        pmjjby=pmjjby,
+        apy_pension=apy_pension if apy else 0,
+        health_monthly=health_premium if health_addon else 0,
+        term_monthly=term_premium if term_insurance else 0
+    )
+    
+    if apy:
+        if plan['apy_monthly']:
+            st.caption(f"APY contribution at age {age}: ₹{plan['apy_monthly']:,}/month")
+        else:
+            st.caption(f"APY is open to ages 18-40; not available at age {age}.")
+    if not plan['eligible']:
+        st.warning(f"Some selected schemes are not available at age {age} (PMJJBY up to 50, PMSBY up to 70, term cover up to 65).")
     
+    total_annual = plan['annual']
     st.metric("💸 Total Annual Premium", f"₹{total_annual:,}", f"₹{total_annual//12:,}/month")
     
     if total_annual > 0:
-        coverage_estimate = 200000 + (500000 if health_addon else 0) + (1000000 if term_insurance else 0)
-        st.metric("🛡️ Total Coverage", f"₹{coverage_estimate//100000:,} Lakh")
+        st.metric("🛡️ Total Coverage", f"₹{plan['coverage']/100000:,.1f} Lakh")
+    
+    with st.expander("🏆 Best coverage for your budget"):
+        monthly_income = int(user_data.get('income_num', 10000))
+        budget = st.slider("Yearly budget (₹):", 0, 60000, monthly_income * 12 // 20, step=500)
+        best = optimize_plan(age, family_size, monthly_income, budget, apy_pension=apy_pension if apy else 0)
+        if best['feasible']:
+            parts = [name for name, taken in (("PMSBY", best['pmsby']), ("PMJJBY", best['pmjjby'])) if taken]
+            if best['apy_pension']:
+                parts.append(f"APY ₹{best['apy_pension']:,} pension")
+            if best['health_monthly']:
+                parts.append(f"Health top-up ₹{best['health_monthly']:,}/month")
+            if best['term_monthly']:
+                parts.append(f"Term ₹{best['term_monthly']:,}/month")
+            if best['pmjay']:
+                parts.append("PMJAY (free if eligible)")
+            st.write(" + ".join(parts) or "No paid cover fits this budget")
+            st.metric("Coverage", f"₹{best['coverage']/100000:,.1f} Lakh", f"₹{best['annual']:,}/year")
+        else:
+            st.write("The selected APY pension alone costs more than this budget.")
 
+@cache_namespace('answers')
 @st.cache_data(ttl=3600)
 def get_cached_claim_help():
     """Cache claim help responses"""
-    return {
-        "Accident Claim (PMSBY)": """
-        **PMSBY Claim Process:**
-        1. Contact bank immediately
-        2. Submit claim form within 30 days
-        3. Required: Death certificate/disability certificate
-        4. Timeline: 30-60 days
-        5. Helpline: 1800-180-1111
-        """,
-        "Life Insurance Claim (PMJJBY)": """
-        **PMJJBY Claim Process:**
-        1. Inform bank within 30 days
-        2. Submit death certificate + claim form
-        3. Bank will process within 30 days
-        4. Amount credited to nominee account
-        5. Helpline: Contact your bank
-        """,
-        "Health Insurance Claim (PMJAY)": """
-        **PMJAY Claim Help:**
-        1. Visit empaneled hospital
-        2. Show Ayushman card at admission
-        3. Cashless treatment for eligible procedures
-        4. For issues: Call 14555
-        5. Website: pmjay.gov.in
-        """
-    }
+    return CLAIM_HELP
 
 def show_generic_claim_help(claim_type):
     """Generic claim help when AI is not available"""
@@ -543,199 +505,52 @@ def claim_assistant():
     """Optimized claim assistant with phi3:mini"""
     st.subheader("🤝 Claim Assistant")
     
-    config = get_static_config()
+    config = get_static_config(st.session_state.get('selected_language', 'en'))
     claim_type = st.selectbox("Select Claim Type:", config['claim_types'])
     
     issue_description = st.text_area("Describe your issue:", 
                                    placeholder="e.g., Hospital denied cashless treatment, Claim rejected, Need help with documents")
     
     if st.button("🤖 Get AI Help") and issue_description:
-        with st.spinner("phi3:mini AI analyzing (5-10 seconds)..."):
-            
-            if OLLAMA_AVAILABLE:
-                try:
-                    prompt = f"""Insurance claim help for India:
-
-Type: {claim_type}
-Issue: {issue_description}
-
-Quick help needed:
-1. What to do now
-2. Documents needed
-3. Contact info
-4. Timeline
-
-Keep brief, actionable advice only."""
-
-                    response = ollama.chat(
-                        model='phi3:mini',
-                        messages=[{'role': 'user', 'content': prompt}],
-                        stream=False,
-                        options={
-                            'temperature': 0.3,
-                            'max_tokens': 150,
-                            'num_ctx': 512,
-                            'num_predict': 150
-                        }
-                    )
-                    
-                    st.success("🤖 phi3:mini AI Claim Assistant Response (Ultra Fast!):")
-                    st.write(response['message']['content'])
-                    
-                except Exception as e:
-                    st.error(f"phi3:mini AI Error: {e}")
-                    # Use fallback AI
-                    fallback_response = get_free_ai_response(f"Claim help for {claim_type}: {issue_description}")
-                    st.info("🤖 Fallback AI Response:")
-                    st.write(fallback_response)
-            else:
-                # Use fallback AI when Ollama is not available
-                fallback_response = get_free_ai_response(f"Claim help for {claim_type}: {issue_description}")
-                st.info("🤖 AI Response:")
-                st.write(fallback_response)
-
-@st.cache_data(ttl=1800)
-def get_simple_answer(question):
-    """Cache simple chatbot answers"""
-    if 'pmjay' in question or 'ayushman' in question:
-        return "PMJAY provides ₹5 lakh free health coverage. Check eligibility at pmjay.gov.in or call 14555."
-    elif 'pmsby' in question:
-        return "PMSBY costs ₹20/year for ₹2 lakh accident coverage. Apply at any bank with Aadhaar and account."
-    elif 'pmjjby' in question:
-        return "PMJJBY costs ₹436/year for ₹2 lakh life insurance. Available for 18-50 age group through banks."
-    elif 'document' in question:
-        return "Basic documents: Aadhaar card, bank account, mobile number. Specific schemes may need additional documents."
-    else:
-        return "For detailed information, visit your nearest bank branch or check the official government insurance websites."
-
-def insurance_chatbot():
-    """Optimized insurance Q&A chatbot with phi3:mini (lightning fast)"""
-    st.subheader("💬 Insurance Chatbot")
-    
-    # Show recent chat history
-    recent_chats = st.session_state.chat_history[-5:] if len(st.session_state.chat_history) > 5 else st.session_state.chat_history
-    
-    for chat in recent_chats:
-        st.write(f"**You:** {chat['question']}")
-        st.write(f"**Bot:** {chat['answer']}")
-        st.write("---")
-    
-    # Input for new question - FIXED INDENTATION
-    user_question = st.text_input("Ask any insurance question:", 
-                                placeholder="e.g., How to apply for PMJAY? What documents needed for PMSBY?")
-    
-    if st.button("Ask Bot") and user_question:
-        
-        if OLLAMA_AVAILABLE:
+        if get_api_client() is not None:
             try:
-                prompt = f"""Insurance expert for India. Quick answer:
-
-Q: {user_question}
-
-Give brief, practical answer in 2-3 lines. Focus on actionable steps."""
-
-                response = ollama.chat(
-                    model='phi3:mini',
-                    messages=[{'role': 'user', 'content': prompt}],
-                    stream=False,
-                    options={
-                        'temperature': 0.3,
-                        'max_tokens': 100,
-                        'num_ctx': 512,
-                        'num_predict': 100
-                    }
-                )
-                
-                answer = response['message']['content']
+                st.success("🤖 AI Claim Assistant Response:")
+                if STREAMING_ENABLED:
+                    show_api_answer('/claim', {'claim_type': claim_type, 'issue': issue_description}, stream=True)
+                else:
+                    with st.spinner("AI analyzing..."):
+                        answer = ask_api('/claim', {'claim_type': claim_type, 'issue': issue_description})['text']
+                    st.write(answer)
+            except Exception as e:
+                st.error(f"Advisor service error: {e}")
+                show_generic_claim_help(claim_type)
+        elif ollama_available():
+            try:
+                prompt = build_claim_prompt(claim_type, issue_description)
+
+                if STREAMING_ENABLED:
+                    st.success("🤖 phi3:mini AI Claim Assistant Response (Ultra Fast!):")
+                    ask_phi3(prompt, CLAIM_OPTIONS, stream=True, channel='claim')
+                else:
+                    with st.spinner("phi3:mini AI analyzing..."):
+                        answer = ask_phi3(prompt, CLAIM_OPTIONS, channel='claim')
+                    st.success("🤖 phi3:mini AI Claim Assistant Response (Ultra Fast!):")
+                    st.write(answer)
+                get_registry().record_response('claim', 'phi3')
                 
             except Exception as e:
-                answer = f"I'm having trouble connecting to phi3:mini AI. Please try again or contact your nearest bank for insurance guidance. phi3:mini AI Error: Failed to connect to Ollama. Please check that Ollama is downloaded, running and accessible. https://ollama.com/download"
+                st.error(f"phi3:mini AI Error: {e}")
+                # Use fallback AI
+                with st.spinner("Trying fallback AI..."):
+                    fallback_response = get_free_ai_response(f"Claim help for {claim_type}: {issue_description}")
+                st.info("🤖 Fallback AI Response:")
+                st.write(fallback_response)
         else:
-            # Use fallback to Hugging Face API
-            answer = get_free_ai_response(user_question)
-        
-        # Add to chat history
-        st.session_state.chat_history.append({
-            'question': user_question,
-            'answer': answer,
-            'timestamp': datetime.now().strftime("%H:%M")
-        })
-        
-        # Keep only last 10 chats
-        if len(st.session_state.chat_history) > 10:
-            st.session_state.chat_history = st.session_state.chat_history[-10:]
-        
-        st.rerun()
-
-def generate_insurance_pdf(user_data, advice_content):
-    """Generate PDF report of insurance recommendations"""
-    buffer = io.BytesIO()
-    
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    title = Paragraph("🛡️ Your Personalized Insurance Plan", styles['Title'])
-    story.append(title)
-    story.append(Spacer(1, 20))
-    
-    date_text = f"Generated on: {datetime.now().strftime('%B %d, %Y')}"
-    date_para = Paragraph(date_text, styles['Normal'])
-    story.append(date_para)
-    story.append(Spacer(1, 20))
-    
-    profile_title = Paragraph("Your Profile", styles['Heading2'])
-    story.append(profile_title)
-    
-    profile_text = f"""
-    • Age: {user_data.get('age')} years<br/>
-    • Occupation: {user_data.get('job')}<br/>
-    • Monthly Income: {user_data.get('income')}<br/>
-    • Location: {user_data.get('location')}<br/>
-    • Family Size: {user_data.get('family_size')}<br/>
-    • Financial Goal: {user_data.get('financial_goal')}<br/>
-    """
-    
-    profile_para = Paragraph(profile_text, styles['Normal'])
-    story.append(profile_para)
-    story.append(Spacer(1, 20))
-    
-    rec_title = Paragraph("AI Recommendations", styles['Heading2'])
-    story.append(rec_title)
-    
-    clean_advice = advice_content.replace('##', '').replace('**', '').replace('*', '')
-    clean_advice = clean_advice.replace('✅', '✓').replace('🏥', 'Health').replace('💰', 'Money')
-    clean_advice = clean_advice.replace('[', '').replace(']', '').replace('(', '').replace(')', '')
-    
-    advice_para = Paragraph(clean_advice[:2000], styles['Normal'])  # Limit length
-    story.append(advice_para)
-    story.append(Spacer(1, 20))
-    
-    # Contact info
-    contact_title = Paragraph("Next Steps", styles['Heading2'])
-    story.append(contact_title)
-    
-    next_steps = """
-    1. Visit your nearest bank branch with Aadhaar card<br/>
-    2. Apply for PMSBY (₹20/year) first - easiest to start<br/>
-    3. Check PMJAY eligibility online at pmjay.gov.in<br/>
-    4. Consider PMJJBY if you have family dependents<br/>
-    5. Keep this report for reference when visiting bank<br/>
-    """
-    
-    steps_para = Paragraph(next_steps, styles['Normal'])
-    story.append(steps_para)
-    
-    # Footer
-    story.append(Spacer(1, 30))
-    footer = Paragraph("Generated by GenAI Insurance Advisor • Powered by phi3:mini AI", styles['Italic'])
-    story.append(footer)
-    
-    # Build PDF
-    doc.build(story)
-    
-    buffer.seek(0)
-    return buffer
+            # Use fallback AI when Ollama is not available
+            with st.spinner("Getting AI help..."):
+                fallback_response = get_free_ai_response(f"Claim help for {claim_type}: {issue_description}")
+            st.info("🤖 AI Response:")
+            st.write(fallback_response)
 
 def add_pdf_download_button():
     """Add PDF download functionality"""
@@ -746,19 +561,41 @@ def add_pdf_download_button():
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            if st.button("📄 Generate & Download PDF Report", type="secondary", use_container_width=True):
+            lang = st.session_state.get('selected_language', 'en')
+            if get_api_client() is None:
+                try:
+                    from report_pdf import MissingFontError, render_report
+                except ImportError:
+                    st.info("PDF feature requires: pip install reportlab")
+                    return
+                try:
+                    # Rendered in the background when the advice was generated, so normally a cache hit
+                    pdf_bytes = render_report(st.session_state.user_data, st.session_state.advice_content, lang)
+                    st.download_button(
+                        label="💾 Download Your Insurance Plan (PDF)",
+                        data=pdf_bytes,
+                        file_name=f"Insurance_Plan_{datetime.now().strftime('%Y%m%d')}.pdf",
+                        mime="application/pdf",
+                        type="primary",
+                        use_container_width=True
+                    )
+                except MissingFontError as e:
+                    st.error(str(e))
+                except Exception as e:
+                    st.error(f"Error generating PDF: {str(e)}")
+            elif st.button("📄 Generate & Download PDF Report", type="secondary", use_container_width=True):
                 try:
                     with st.spinner("Generating PDF report..."):
-                        # Generate PDF
-                        pdf_buffer = generate_insurance_pdf(
-                            st.session_state.user_data, 
-                            st.session_state.advice_content
+                        pdf_bytes = get_api_client().report(
+                            st.session_state.user_data,
+                            st.session_state.advice_content,
+                            lang
                         )
                         
                         # Create download
                         st.download_button(
                             label="💾 Download Your Insurance Plan (PDF)",
-                            data=pdf_buffer.getvalue(),
+                            data=pdf_bytes,
                             file_name=f"Insurance_Plan_{datetime.now().strftime('%Y%m%d')}.pdf",
                             mime="application/pdf",
                             type="primary",
@@ -769,23 +606,85 @@ def add_pdf_download_button():
                         
                 except Exception as e:
                     st.error(f"Error generating PDF: {str(e)}")
-                    st.info("PDF feature requires: pip install reportlab")
                     
         st.info("💡 Tip: Save this PDF and take it to your bank when applying for insurance schemes!")
 
+@cache_namespace('answers')
 @st.cache_data(ttl=1800)
-def get_simple_answer(question):
+def get_simple_answer(question, lang='en'):
     """Cache simple chatbot answers"""
-    if 'pmjay' in question or 'ayushman' in question:
-        return "PMJAY provides ₹5 lakh free health coverage. Check eligibility at pmjay.gov.in or call 14555."
-    elif 'pmsby' in question:
-        return "PMSBY costs ₹20/year for ₹2 lakh accident coverage. Apply at any bank with Aadhaar and account."
-    elif 'pmjjby' in question:
-        return "PMJJBY costs ₹436/year for ₹2 lakh life insurance. Available for 18-50 age group through banks."
-    elif 'document' in question:
-        return "Basic documents: Aadhaar card, bank account, mobile number. Specific schemes may need additional documents."
+    return simple_answer(question, lang)
+
+@st.cache_resource
+def get_chat_cache():
+    """Process-wide near-duplicate cache in front of the chatbot LLM call"""
+    return SemanticCache()
+
+def get_chat_context():
+    """Earlier turns to send verbatim and the summary of older ones, folding turns that outgrew the budget"""
+    history = st.session_state.chat_history
+    summary, folded = compact_history(history, st.session_state.chat_summary, st.session_state.chat_folded)
+    st.session_state.chat_summary, st.session_state.chat_folded = summary, folded
+    return [{'question': turn['question'], 'answer': turn['answer']} for turn in history[folded:]], summary
+
+def answer_question(user_question):
+    """Chatbot answer from the intent classifier, the semantic cache, phi3:mini or the canned answers.
+
+    Follow-ups lean on the conversation, so they skip the intent and cache
+    tiers, which only know the question.
+    """
+    lang = st.session_state.get('selected_language', 'en')
+    follow_up = is_follow_up(user_question, st.session_state.chat_history)
+    routed = get_classifier().route(user_question, lang) if INTENT_ROUTING and not follow_up else None
+    if routed is not None:
+        get_registry().record_response('chat', 'intent')
+        return routed
+    
+    chat_cache = get_chat_cache()
+    cached_answer = None
+    if not follow_up:
+        cached_answer = chat_cache.get(user_question, lang)
+        get_registry().record_cache('chat', cached_answer is not None)
+    tier = 'knowledge_base'
+    
+    if cached_answer is not None:
+        answer = cached_answer
+        tier = 'cache'
+    elif ollama_available():
+        try:
+            prompt = build_chat_prompt(user_question, *get_chat_context())
+
+            if STREAMING_ENABLED:
+                st.write(f"**You:** {user_question}")
+                st.write("**Bot:**")
+                answer = ask_phi3(prompt, CHAT_OPTIONS, stream=True)
+            else:
+                answer = ask_phi3(prompt, CHAT_OPTIONS)
+            
+            if not follow_up:
+                chat_cache.put(user_question, answer, lang)
+            tier = 'phi3'
+            
+        except Exception as e:
+            tier = 'error'
+            answer = "I'm having trouble connecting to phi3:mini AI. Please try again or contact your nearest bank for insurance guidance."
     else:
-        return "For detailed information, visit your nearest bank branch or check the official government insurance websites."
+        answer = get_simple_answer(user_question, lang)
+    
+    get_registry().record_response('chat', tier)
+    return answer
+
+def answer_question_via_api(user_question):
+    """Chatbot answer from the headless advisor API"""
+    history, summary = get_chat_context()
+    try:
+        if STREAMING_ENABLED:
+            st.write(f"**You:** {user_question}")
+            st.write("**Bot:**")
+        return show_api_answer('/chat', {'question': user_question, 'history': history, 'summary': summary},
+                               stream=STREAMING_ENABLED)
+    except Exception:
+        return "I'm having trouble connecting to the advisor service. Please try again or contact your nearest bank for insurance guidance."
 
 def insurance_chatbot():
     """Optimized insurance Q&A chatbot with phi3:mini (lightning fast)"""
@@ -801,33 +700,10 @@ def insurance_chatbot():
     user_question = st.text_input("Ask any insurance question:", 
                                 placeholder="e.g., How to apply for PMJAY? What documents needed for PMSBY?")
     if st.button("Ask Bot") and user_question:
-        
-        if OLLAMA_AVAILABLE:
-            try:
-                prompt = f"""Insurance expert for India. Quick answer:
-
-Q: {user_question}
-
-Give brief, practical answer in 2-3 lines. Focus on actionable steps."""
-
-                response = ollama.chat(
-                    model='phi3:mini',  # Super fast model
-                    messages=[{'role': 'user', 'content': prompt}],
-                    stream=False,
-                    options={
-                        'temperature': 0.3,
-                        'max_tokens': 100,   # Very short for speed
-                        'num_ctx': 512,      # Small context for speed
-                        'num_predict': 100   # Fast prediction
-                    }
-                )
-                
-                answer = response['message']['content']
-                
-            except Exception as e:
-                answer = "I'm having trouble connecting to phi3:mini AI. Please try again or contact your nearest bank for insurance guidance."
+        if get_api_client() is not None:
+            answer = answer_question_via_api(user_question)
         else:
-            answer = get_simple_answer(user_question.lower())
+            answer = answer_question(user_question)
         
         st.session_state.chat_history.append({
             'question': user_question,
@@ -835,33 +711,17 @@ Give brief, practical answer in 2-3 lines. Focus on actionable steps."""
             'timestamp': datetime.now().strftime("%H:%M")
         })
         
-        if len(st.session_state.chat_history) > 10:
-            st.session_state.chat_history = st.session_state.chat_history[-10:]
+        # Turns dropped from the history are kept in the chat summary
+        st.session_state.chat_history, st.session_state.chat_summary, st.session_state.chat_folded = trim_history(
+            st.session_state.chat_history, st.session_state.chat_summary, st.session_state.chat_folded, 10)
         
         st.rerun()
 
-LANGUAGES = {
-    'en': '🇺🇸 English',
-    'hi': '🇮🇳 हिंदी'
-}
-
-def get_text(key, lang='en'):
-    """Get translated text"""
-    return TRANSLATIONS.get(lang, {}).get(key, TRANSLATIONS['en'].get(key, key))
 # 5. Main Optimized Streamlit App
 def main():
-    if 'advice_generated' not in st.session_state:
-        st.session_state.advice_generated = False
-    if 'user_data' not in st.session_state:
-        st.session_state.user_data = {}
-    if 'advice_content' not in st.session_state:
-        st.session_state.advice_content = ""
-    if 'processing' not in st.session_state:
-        st.session_state.processing = False
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
-    if 'selected_language' not in st.session_state:
-        st.session_state.selected_language = 'en'
+    init_session_state()
+    cancel_stale_requests()
+    start_metrics()
         
     lang = st.session_state.get('selected_language', 'en')
 
@@ -880,13 +740,15 @@ def main():
         
             if selected_lang != st.session_state.get('selected_language', 'en'):
                 st.session_state.selected_language = selected_lang
-                clear_language_cache()  # Clear cache when language changes
                 st.rerun()
             
-    if OLLAMA_AVAILABLE:
-            st.success(f"✅ {get_text('ai_ready', lang)}")
-    else:
+    state = model_state()
+    if state in DOWN_STATES:
             st.warning("⚠️ Using Smart Recommendations (Install Ollama + phi3:mini for full AI features)")
+    elif state in ('cold', 'loading'):
+            st.info("⏳ phi3:mini is loading; the first answers may take a little longer")
+    else:
+            st.success(f"✅ {get_text('ai_ready', lang)}")
     
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
@@ -904,11 +766,15 @@ def main():
         st.metric(max_coverage_text, "₹5L", health_free_text)
     
     with col4:
-        st.metric("AI Model", "phi3:mini", f"⚡ Online" if OLLAMA_AVAILABLE else "Offline")
+        st.metric("AI Model", "phi3:mini", MODEL_STATUS.get(state, state))
     
     with col5:
         response_time_text = get_text('response_time', lang) if 'response_time' in TRANSLATIONS.get(lang, {}) else "Response Time"
-        st.metric(response_time_text, "<30s", "Real-time")  
+        latency = latency_text()
+        if latency:
+            st.metric(response_time_text, latency[0], latency[1], delta_color="off")
+        else:
+            st.metric(response_time_text, "—", "No calls yet", delta_color="off")
     
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
         f"🏠 {get_text('main_advisor', lang)}", 
@@ -925,6 +791,7 @@ def main():
             st.success(f"🎉 {get_text('plan_ready', lang)}")
         
             if st.button(f"🔄 {get_text('new_consultation', lang)}", type="secondary"):
+                cancel_session_generations()
                 for key in ['advice_generated', 'user_data', 'advice_content', 'processing']:
                     st.session_state[key] = False if 'generated' in key or 'processing' in key else {}
                 st.rerun()
@@ -951,7 +818,7 @@ def main():
     
         else:
             st.subheader(f"📝 {get_text('tell_about', lang)}")
-            config = get_static_config()
+            config = get_static_config(lang)
 
             with st.form("user_form", clear_on_submit=False):            
                 col1, col2, col3 = st.columns(3)
@@ -978,7 +845,7 @@ def main():
                     if not location.strip():
                         st.error(get_text('enter_location', lang))
                     else:
-                        st.session_state.processing = True
+                        st.session_state.processing = uuid.uuid4().hex
                 
                         st.session_state.user_data = {
                             'age': age,
@@ -991,6 +858,11 @@ def main():
                             'financial_goal': financial_goal,
                             'risk_appetite': risk_appetite
                         }
+                        if get_api_client() is None:
+                            from report_pdf import warm_up
+
+                            # Fonts and styles load on the PDF thread while phi3:mini writes the advice
+                            warm_up()
                         try:
                             advice = get_cached_genai_advice(
                                 age=age,
@@ -999,7 +871,8 @@ def main():
                                 location=location,
                                 family_size=family_size,
                                 health_condition=health_condition,
-                                financial_goal=financial_goal
+                                financial_goal=financial_goal,
+                                stream=STREAMING_ENABLED
                             )
                     
                             st.session_state.advice_content = advice
@@ -1012,6 +885,11 @@ def main():
                 
                         finally:
                             st.session_state.processing = False
+
+                        if get_api_client() is None:
+                            from report_pdf import prerender
+
+                            prerender(st.session_state.user_data, st.session_state.advice_content, lang)
                 
                         st.success("✅ Analysis complete! Your personalized insurance plan is ready.")
                         st.rerun()
@@ -1058,7 +936,19 @@ def main():
     st.sidebar.code("pip install ollama streamlit")
     st.sidebar.code("ollama pull phi3:mini")
     st.sidebar.markdown("**Then run:** `streamlit run app.py`")
-    st.sidebar.success("✅ phi3:mini is super fast - responses in 5-10 seconds!")
+    latency = latency_text()
+    if latency:
+        st.sidebar.success(f"✅ phi3:mini typical response: {latency[0]} ({latency[1]})")
+    
+    advice_stats = get_advice_cache().stats()
+    st.sidebar.caption(
+        f"Advice cache: {advice_stats['total_hits']} hits / {advice_stats['total_misses']} misses "
+        f"({advice_stats['hit_rate']:.0%} hit rate)"
+    )
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Also runs when st.rerun() or st.stop() ends the script early
+        save_session_state()
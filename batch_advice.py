@@ -0,0 +1,184 @@
+"""Advice and PDF reports for a whole enrollment camp's applicant list
+
+Applicants sharing a bucketed profile get one generation; results are
+written as each profile finishes, not when the whole list is done.
+
+Examples:
+    python batch_advice.py applicants.csv > results.jsonl
+    python batch_advice.py applicants.jsonl --pdf-dir reports/ --workers 2
+    python batch_advice.py applicants.csv --zip camp_reports.zip
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from advice_cache import AdviceCache, canonical_profile, profile_key
+from advisor import PROFILE_FIELDS, to_english_option, fallback_advice, parse_profile
+from report_pdf import generate_insurance_pdf
+from warmup_advice import generate_advice
+
+BATCH_LIMIT = int(os.environ.get('ADVISOR_BATCH_LIMIT', '5000'))
+
+
+def read_applicants(text):
+    """Rows of a CSV file with a header line, or of a JSON/JSONL applicant list"""
+    text = text.lstrip('\ufeff').strip()
+    if not text:
+        return []
+    if text.startswith('['):
+        rows = json.loads(text)
+    elif text.startswith('{'):
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Every applicant must be an object of form fields")
+    return [{key.strip(): value.strip() if isinstance(value, str) else value
+             for key, value in row.items() if key} for row in rows]
+
+
+def applicant_profile(fields, lang):
+    """Canonical advice-cache profile for parsed form fields in the given language"""
+    return canonical_profile(
+        fields['age'],
+        to_english_option('occupations', fields['job'], lang),
+        fields['income'],
+        fields['location'],
+        fields['family_size'],
+        to_english_option('health_status', fields['health_condition'], lang),
+        to_english_option('financial_goals', fields['financial_goal'], lang),
+        lang
+    )
+
+
+def plan_batch(rows):
+    """Group applicants by profile key; returns (groups, {row index: error}) for invalid rows"""
+    groups = {}
+    errors = {}
+    for index, row in enumerate(rows):
+        try:
+            fields = parse_profile(row)
+        except ValueError as e:
+            errors[index] = str(e)
+            continue
+        profile = applicant_profile(fields, row.get('lang') or 'en')
+        group = groups.setdefault(profile_key(profile), {'profile': profile, 'fields': fields, 'rows': []})
+        group['rows'].append(index)
+    return groups, errors
+
+
+def applicant_result(rows, index, advice, tier, error=None):
+    row = rows[index]
+    result = {
+        'row': index + 1,
+        'id': row.get('id') or row.get('name') or str(index + 1),
+        'name': row.get('name', ''),
+        'tier': tier,
+        'advice': advice,
+    }
+    if error:
+        result['error'] = error
+    return result
+
+
+def pdf_name(result):
+    slug = re.sub(r'[^\w-]+', '_', str(result['id'])).strip('_') or 'applicant'
+    return f"{result['row']:04d}_{slug}.pdf"
+
+
+def applicant_pdf(rows, result):
+    """PDF bytes of one applicant's report"""
+    row = rows[result['row'] - 1]
+    user_data = {field: row.get(field) for field in PROFILE_FIELDS}
+    return generate_insurance_pdf(user_data, result['advice'], row.get('lang') or 'en').getvalue()
+
+
+def run_batch(rows, cache, gateway, workers=2):
+    """Yield one result per applicant, in the order their profiles' advice becomes ready"""
+    groups, errors = plan_batch(rows)
+    for index, error in errors.items():
+        yield applicant_result(rows, index, None, 'invalid', error=error)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for group in groups.values():
+            cached = cache.get(group['profile'])
+            if cached is not None:
+                for index in group['rows']:
+                    yield applicant_result(rows, index, cached, 'cache')
+            else:
+                futures[pool.submit(generate_advice, group['profile'], cache, gateway)] = group
+
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                advice, tier, error = future.result(), 'phi3', None
+            except Exception as e:
+                fields = group['fields']
+                advice = fallback_advice(fields['age'], fields['job'], fields['income'], fields['location'])
+                tier, error = 'knowledge_base', str(e)
+            for index in group['rows']:
+                yield applicant_result(rows, index, advice, tier, error=error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('applicants', help="CSV, JSON or JSONL file of applicants (form fields with English labels)")
+    parser.add_argument('--output', metavar='FILE', help="write JSONL results here instead of stdout")
+    parser.add_argument('--pdf-dir', metavar='DIR', help="write one PDF report per applicant into DIR")
+    parser.add_argument('--zip', metavar='FILE', help="write every applicant's PDF report into one zip archive")
+    parser.add_argument('--workers', type=int, default=2, help="concurrent generations against Ollama")
+    parser.add_argument('--timeout', type=float, default=300, help="per-generation deadline in seconds")
+    args = parser.parse_args(argv)
+
+    with open(args.applicants, encoding='utf-8') as f:
+        rows = read_applicants(f.read())
+
+    from llm_gateway import LLMGateway
+
+    cache = AdviceCache()
+    # The whole batch may queue; generations share the gateway's in-flight slots
+    gateway = LLMGateway(max_in_flight=args.workers, max_queue=2 * len(rows) + 2,
+                         queue_timeout=args.timeout, request_timeout=args.timeout)
+
+    if args.pdf_dir:
+        os.makedirs(args.pdf_dir, exist_ok=True)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    archive = zipfile.ZipFile(args.zip, 'w', zipfile.ZIP_DEFLATED) if args.zip else None
+    summary = {'applicants': len(rows)}
+    started = time.monotonic()
+    try:
+        for done, result in enumerate(run_batch(rows, cache, gateway, workers=args.workers), 1):
+            summary[result['tier']] = summary.get(result['tier'], 0) + 1
+            if result['advice'] and (args.pdf_dir or archive):
+                pdf = applicant_pdf(rows, result)
+                if args.pdf_dir:
+                    with open(os.path.join(args.pdf_dir, pdf_name(result)), 'wb') as f:
+                        f.write(pdf)
+                if archive:
+                    archive.writestr(pdf_name(result), pdf)
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+            if done % 25 == 0 or done == len(rows):
+                print(f"{done}/{len(rows)} done in {time.monotonic() - started:.0f}s", file=sys.stderr)
+    finally:
+        if archive:
+            archive.close()
+        if args.output:
+            output.close()
+
+    summary['seconds'] = round(time.monotonic() - started, 1)
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary.get('invalid') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
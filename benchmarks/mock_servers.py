@@ -0,0 +1,233 @@
+"""Deterministic local stand-ins for the Ollama and Hugging Face inference APIs"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VOCABULARY = (
+    "PMSBY PMJJBY PMJAY APY insurance premium coverage bank Aadhaar claim hospital family "
+    "accident life health pension eligible apply documents nominee benefit scheme yearly monthly "
+    "cashless lakh rupees branch enrol renew policy secure savings income protection"
+).split()
+
+
+def generate_words(prompt, count):
+    """The same prompt always produces the same answer"""
+    rng = random.Random(hashlib.sha1(prompt.encode('utf-8')).hexdigest())
+    return [rng.choice(VOCABULARY) for _ in range(count)]
+
+
+class MockServer:
+    """Threaded HTTP server on a free local port, run from a daemon thread"""
+
+    handler = None
+
+    def __init__(self, **settings):
+        handler = type('Handler', (self.handler,), {'settings': settings, 'stats': {'requests': 0}})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.stats = handler.stats
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    settings = {}
+    stats = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def prompt_tokens(messages):
+    """Messages as the word tokens phi3's chat template would feed the model"""
+    tokens = []
+    for message in messages:
+        tokens.extend([f"<|{message.get('role', 'user')}|>"] + message.get('content', '').split() + ['<|end|>'])
+    return tokens + ['<|assistant|>']
+
+
+def common_prefix(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+class OllamaHandler(QuietHandler):
+    """/api/chat with NDJSON streaming, first-token latency and a fixed token rate.
+
+    Like Ollama, each of a few slots keeps the tokens of its last request and
+    only evaluates the part of a new prompt past their common prefix.
+    """
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self.send_json(200, {'models': [{'name': 'phi3:mini', 'model': 'phi3:mini'}]})
+        elif self.path == '/api/ps':
+            loaded = self.settings['loaded'].is_set()
+            self.send_json(200, {'models': [{'name': 'phi3:mini', 'model': 'phi3:mini'}] if loaded else []})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/api/chat':
+            self.send_json(404, {'error': 'not found'})
+            return
+        self.stats['requests'] += 1
+        request = self.read_json()
+        self.load()
+        messages = request.get('messages', [])
+        prompt = ''.join(message.get('content', '') for message in messages)
+        options = request.get('options') or {}
+        count = min(int(options.get('num_predict') or self.settings['max_tokens']), self.settings['max_tokens'])
+        words = generate_words(prompt, count)
+        model = request.get('model', 'phi3:mini')
+        evaluated = self.evaluate(prompt_tokens(messages), words)
+
+        time.sleep(self.settings['latency'] + evaluated / self.settings['prompt_rate'])
+        interval = 1.0 / self.settings['token_rate']
+        final = {
+            'model': model, 'created_at': '', 'message': {'role': 'assistant', 'content': ''},
+            'done': True, 'done_reason': 'stop',
+            'prompt_eval_count': evaluated, 'eval_count': count,
+            'prompt_eval_duration': int(evaluated / self.settings['prompt_rate'] * 1e9)
+        }
+
+        if not request.get('stream', True):
+            time.sleep(interval * count)
+            final['message']['content'] = ' '.join(words)
+            self.send_json(200, final)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for word in words:
+                self.write_chunk({'model': model, 'created_at': '',
+                                  'message': {'role': 'assistant', 'content': word + ' '}, 'done': False})
+                time.sleep(interval)
+            self.write_chunk(final)
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def load(self):
+        """The first request waits for the model to load, as every request after an unload would"""
+        with self.settings['load_lock']:
+            if not self.settings['loaded'].is_set():
+                time.sleep(self.settings['load_time'])
+                self.stats['loads'] += 1
+                self.settings['loaded'].set()
+
+    def evaluate(self, tokens, answer):
+        """Prompt tokens left to evaluate after the longest cached prefix.
+
+        A prompt extending a slot's tokens continues in that slot; otherwise, as
+        in Ollama, the shared prefix is copied to a free or the least recently
+        used slot, so one conversation does not overwrite another.
+        """
+        with self.settings['lock']:
+            slots = self.settings['slots']
+            reused, best = max(((common_prefix(cached, tokens), i) for i, cached in enumerate(slots)), default=(0, None))
+            if best is not None and reused == len(slots[best]):
+                slots.pop(best)
+            elif len(slots) >= self.settings['parallel']:
+                slots.pop(0)
+            slots.append(tokens + answer)
+        return len(tokens) - reused
+
+    def write_chunk(self, payload):
+        data = (json.dumps(payload) + '\n').encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+class HuggingFaceHandler(QuietHandler):
+    """Inference API stand-in; a seeded share of requests answers 503 while "loading" """
+
+    def do_POST(self):
+        self.stats['requests'] += 1
+        prompt = self.read_json().get('inputs', '')
+        with self.settings['lock']:
+            failing = self.settings['rng'].random() < self.settings['error_rate']
+        time.sleep(self.settings['latency'])
+        if failing:
+            self.send_json(503, {'error': 'Model is loading', 'estimated_time': 0.1})
+            return
+        answer = ' '.join(generate_words(prompt, self.settings['max_tokens']))
+        self.send_json(200, [{'generated_text': f"{prompt} {answer}"}])
+
+
+class MockOllama(MockServer):
+    handler = OllamaHandler
+
+    def __init__(self, latency=0.05, token_rate=200.0, max_tokens=80, prompt_rate=500.0, parallel=4, load_time=0.0):
+        super().__init__(latency=latency, token_rate=token_rate, max_tokens=max_tokens, prompt_rate=prompt_rate,
+                         parallel=parallel, slots=[], lock=threading.Lock(), load_time=load_time,
+                         loaded=threading.Event(), load_lock=threading.Lock())
+        self.stats['loads'] = 0
+
+
+class MockHuggingFace(MockServer):
+    handler = HuggingFaceHandler
+
+    def __init__(self, latency=0.1, error_rate=0.0, max_tokens=40, seed=7):
+        super().__init__(latency=latency, error_rate=error_rate, max_tokens=max_tokens,
+                         rng=random.Random(seed), lock=threading.Lock())
+
+    @property
+    def models_url(self):
+        return self.url + '/models'
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the mock Ollama and Hugging Face servers")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument('--token-rate', type=float, default=200, help="tokens streamed per second")
+    args = parser.parse_args()
+
+    ollama_server = MockOllama(args.latency, args.token_rate).start()
+    hf_server = MockHuggingFace().start()
+    print(f"OLLAMA_HOST={ollama_server.url}")
+    print(f"HF_INFERENCE_URL={hf_server.models_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,349 @@
+"""Offline benchmark of the advisor pipeline against mock Ollama and Hugging Face servers
+
+Each simulated session drives the real Streamlit app headlessly: page load,
+advice form, PDF report, chatbot questions and the claim assistant.
+Streamlit's AppTest is not thread-safe, so concurrent sessions run in
+separate worker processes, each behaving like one app server process that
+shares the mock servers and the advice cache file with the others.
+
+Examples:
+    python -m benchmarks.run --sessions 20 --concurrency 4 --output bench.json
+    python -m benchmarks.run --no-ollama --sessions 10
+    python -m benchmarks.run --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.mock_servers import MockOllama, MockHuggingFace
+from benchmarks.workloads import build_sessions
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+SCHEMA_VERSION = 1
+STEPS = ['load', 'advice', 'pdf', 'chat', 'claim']
+COUNTERS = ['advisor_cache_lookups_total', 'advisor_responses_total', 'advisor_model_calls_total']
+
+
+def configure_environment(ollama_url, hf_url, workdir, streaming):
+    """Point the app at the mock servers; must run before the app's modules are imported"""
+    os.environ.update({
+        'OLLAMA_HOST': ollama_url,
+        'HF_INFERENCE_URL': hf_url,
+        'HF_HEDGE_DELAY': os.environ.get('HF_HEDGE_DELAY', '0.5'),
+        'HF_LATENCY_BUDGET': os.environ.get('HF_LATENCY_BUDGET', '5'),
+        'ADVICE_CACHE_PATH': os.path.join(workdir, 'advice_cache.sqlite3'),
+        'SESSION_STORE_PATH': os.path.join(workdir, 'sessions.sqlite3'),
+        'ADVISOR_METRICS_PORT': '0',
+        'ADVISOR_TRACE_PATH': '',
+        'ADVISOR_STREAMING': '1' if streaming else '0',
+    })
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def chat_prompt_tokens():
+    """Prompt tokens the model has reported evaluating for chatbot calls in this process"""
+    from metrics import get_registry
+
+    return sum(value for labels, value in get_registry().counter_values('advisor_model_tokens_total')
+               if labels['channel'] == 'chat' and labels['kind'] == 'prompt')
+
+
+def run_session(plan, timeout, prompt_tokens=None):
+    """Drive one headless app session; returns (step timings, errors, AppTest).
+
+    With a prompt_tokens dict, the prompt tokens evaluated for each chatbot
+    question answered by the model are appended under its position in the session.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings = {}
+    errors = []
+
+    def step(name, action):
+        started = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            errors.append(f"{name}: {e!r}")
+            return
+        timings.setdefault(name, []).append(time.perf_counter() - started)
+        if at.exception:
+            errors.append(f"{name}: {at.exception[0].message}")
+
+    def by_label(widgets, label):
+        return next(widget for widget in widgets if widget.label == label)
+
+    def submit_advice():
+        profile = plan['profile']
+        by_label(at.number_input, "Your Age").set_value(profile['age'])
+        by_label(at.selectbox, "Your Occupation").set_value(profile['job'])
+        by_label(at.selectbox, "Family Size").set_value(profile['family_size'])
+        by_label(at.selectbox, "Monthly Income").set_value(profile['income'])
+        by_label(at.selectbox, "Health Status").set_value(profile['health_condition'])
+        by_label(at.selectbox, "Primary Financial Goal").set_value(profile['financial_goal'])
+        by_label(at.text_input, "Your City/Village").input(profile['location'])
+        next(button for button in at.button if "Get AI Advice" in button.label).click().run()
+
+    def ask(position, question):
+        before = chat_prompt_tokens()
+        by_label(at.text_input, "Ask any insurance question:").input(question)
+        by_label(at.button, "Ask Bot").click().run()
+        evaluated = chat_prompt_tokens() - before
+        if prompt_tokens is not None and evaluated:
+            prompt_tokens.setdefault(position, []).append(evaluated)
+
+    def claim_help():
+        by_label(at.selectbox, "Select Claim Type:").set_value(plan['claim']['type'])
+        by_label(at.text_area, "Describe your issue:").input(plan['claim']['issue'])
+        by_label(at.button, "🤖 Get AI Help").click().run()
+
+    def download_report():
+        at.run()
+        if not at.get('download_button'):
+            raise RuntimeError("no PDF download button")
+
+    step('load', at.run)
+    step('advice', submit_advice)
+    # The report is pre-rendered with the advice; this times the page rerun that hands it to the download button
+    step('pdf', download_report)
+    for position, question in enumerate(plan['questions']):
+        step('chat', lambda: ask(position, question))
+    step('claim', claim_help)
+    return timings, errors, at
+
+
+def warm_up(timeout):
+    """Load the page once so imports and process-wide singletons are not timed"""
+    from streamlit.testing.v1 import AppTest
+
+    AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+
+
+def run_worker(plans, timeout):
+    """Run sessions one after another in a worker process and report its counters"""
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    from metrics import get_registry
+
+    warm_up(timeout)
+    timings = {}
+    errors = []
+    prompt_tokens = {}
+    started = time.time()
+    for plan in plans:
+        session_timings, session_errors, _ = run_session(plan, timeout, prompt_tokens)
+        for step, samples in session_timings.items():
+            timings.setdefault(step, []).extend(samples)
+        errors.extend(session_errors)
+    registry = get_registry()
+    counters = {name: registry.counter_values(name) for name in COUNTERS}
+    return timings, errors, counters, prompt_tokens, (started, time.time())
+
+
+def summarize(samples):
+    from metrics import percentile
+
+    if not samples:
+        return {'count': 0}
+    return {
+        'count': len(samples),
+        'mean': round(sum(samples) / len(samples), 4),
+        'p50': round(percentile(samples, 50), 4),
+        'p95': round(percentile(samples, 95), 4),
+        'p99': round(percentile(samples, 99), 4),
+        'max': round(max(samples), 4),
+    }
+
+
+def grouped(series, group_by, key):
+    """{group: {key value: count}} from one counter's series"""
+    result = {}
+    for labels, value in series:
+        bucket = result.setdefault(labels[group_by], {})
+        bucket[labels[key]] = bucket.get(labels[key], 0) + value
+    return result
+
+
+def measure_memory(plans, timeout):
+    """Median heap growth of a live session, measured one session at a time"""
+    if not plans:
+        return None
+    growth = []
+    warm_up(timeout)
+    tracemalloc.start()
+    try:
+        for plan in plans:
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            session = run_session(plan, timeout)
+            gc.collect()
+            growth.append(tracemalloc.get_traced_memory()[0] - before)
+            del session
+    finally:
+        tracemalloc.stop()
+    return round(sorted(growth)[len(growth) // 2] / 1024, 1)
+
+
+def run_benchmark(args):
+    plans = build_sessions(args.sessions, seed=args.seed, repeat_ratio=args.repeat_ratio,
+                           questions_per_session=args.questions, follow_up_ratio=args.follow_ups)
+
+    with MockOllama(args.ollama_latency, args.token_rate, args.max_tokens, args.prompt_rate,
+                    load_time=args.load_time) as ollama_server, \
+            MockHuggingFace(args.hf_latency, args.hf_error_rate) as hf_server, \
+            tempfile.TemporaryDirectory() as workdir:
+        ollama_url = 'http://127.0.0.1:9' if args.no_ollama else ollama_server.url
+        configure_environment(ollama_url, hf_server.models_url, workdir, args.streaming)
+        timings = {step: [] for step in STEPS}
+        errors = []
+        counters = {name: [] for name in COUNTERS}
+        prompt_tokens = {}
+        shares = [plans[i::args.concurrency] for i in range(args.concurrency)]
+
+        # Spawned workers import the app fresh, after the environment points at the mocks
+        context = multiprocessing.get_context('spawn')
+        spans = []
+        with ProcessPoolExecutor(max_workers=args.concurrency, mp_context=context) as pool:
+            futures = [pool.submit(run_worker, share, args.timeout) for share in shares if share]
+            for future in futures:
+                worker_timings, worker_errors, worker_counters, worker_prompt_tokens, span = future.result()
+                spans.append(span)
+                for position, samples in worker_prompt_tokens.items():
+                    prompt_tokens.setdefault(position, []).extend(samples)
+                for step, samples in worker_timings.items():
+                    timings[step].extend(samples)
+                errors.extend(worker_errors)
+                for name, series in worker_counters.items():
+                    counters[name].extend(series)
+        wall = max(end for _, end in spans) - min(start for start, _ in spans)
+
+        cache = {}
+        for name, results in grouped(counters['advisor_cache_lookups_total'], 'cache', 'result').items():
+            total = results.get('hit', 0) + results.get('miss', 0)
+            cache[name] = {'hits': results.get('hit', 0), 'misses': results.get('miss', 0),
+                           'hit_rate': round(results.get('hit', 0) / total, 4) if total else 0.0}
+        model_requests = {'ollama': ollama_server.stats['requests'], 'huggingface': hf_server.stats['requests'],
+                          'ollama_loads': ollama_server.stats['loads']}
+        tiers = grouped(counters['advisor_responses_total'], 'channel', 'tier')
+        calls = grouped(counters['advisor_model_calls_total'], 'provider', 'status')
+
+        memory_per_session = measure_memory(plans[:args.memory_sessions], args.timeout)
+
+    steps_done = sum(len(samples) for samples in timings.values())
+    return {
+        'schema': SCHEMA_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'config': {
+            'sessions': args.sessions, 'concurrency': args.concurrency, 'seed': args.seed,
+            'repeat_ratio': args.repeat_ratio, 'questions': args.questions, 'follow_ups': args.follow_ups,
+            'streaming': args.streaming,
+            'ollama': None if args.no_ollama else {'latency': args.ollama_latency, 'token_rate': args.token_rate,
+                                                   'max_tokens': args.max_tokens, 'prompt_rate': args.prompt_rate,
+                                                   'load_time': args.load_time},
+            'huggingface': {'latency': args.hf_latency, 'error_rate': args.hf_error_rate},
+        },
+        'wall_seconds': round(wall, 3),
+        'throughput': {
+            'sessions_per_second': round(args.sessions / wall, 3),
+            'steps_per_second': round(steps_done / wall, 3),
+        },
+        'steps': {step: summarize(samples) for step, samples in timings.items()},
+        'cache': cache,
+        'tiers': tiers,
+        'model_calls': {'by_status': calls, 'server_requests': model_requests},
+        # Prompt tokens the model evaluated per chatbot question, by its position in the session
+        'chat_prompt_eval': {position + 1: summarize(samples) for position, samples in sorted(prompt_tokens.items())},
+        'memory': {'per_session_kb': memory_per_session, 'max_rss_mb': max_rss_mb()},
+        'errors': len(errors),
+        'error_samples': errors[:5],
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Regressions of result against a baseline run, as human-readable lines"""
+    regressions = []
+    if baseline.get('schema') != result['schema']:
+        return [f"baseline schema {baseline.get('schema')} does not match {result['schema']}"]
+
+    old_rate = baseline['throughput']['sessions_per_second']
+    new_rate = result['throughput']['sessions_per_second']
+    if new_rate < old_rate * (1 - tolerance):
+        regressions.append(f"throughput {new_rate} sessions/s is below baseline {old_rate}")
+
+    for step, stats in result['steps'].items():
+        old = baseline['steps'].get(step, {}).get('p95')
+        if old and stats.get('p95') and stats['p95'] > old * (1 + tolerance):
+            regressions.append(f"{step} p95 {stats['p95']}s exceeds baseline {old}s")
+
+    for name, stats in result['cache'].items():
+        old = baseline['cache'].get(name, {}).get('hit_rate')
+        if old is not None and stats['hit_rate'] < old - tolerance:
+            regressions.append(f"{name} cache hit rate {stats['hit_rate']} is below baseline {old}")
+
+    if result['errors'] > baseline.get('errors', 0):
+        regressions.append(f"{result['errors']} errors (baseline {baseline.get('errors', 0)})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20, help="simulated user sessions")
+    parser.add_argument('--concurrency', type=int, default=4, help="sessions running at once")
+    parser.add_argument('--seed', type=int, default=42, help="workload seed")
+    parser.add_argument('--repeat-ratio', type=float, default=0.5, help="share of sessions submitting the default profile")
+    parser.add_argument('--questions', type=int, default=2, help="chatbot questions per session")
+    parser.add_argument('--follow-ups', type=float, default=0.3, help="share of later questions that are follow-ups")
+    parser.add_argument('--ollama-latency', type=float, default=0.05, help="mock Ollama seconds to first token")
+    parser.add_argument('--token-rate', type=float, default=200, help="mock Ollama tokens per second")
+    parser.add_argument('--prompt-rate', type=float, default=500, help="mock Ollama prompt tokens evaluated per second")
+    parser.add_argument('--load-time', type=float, default=0.0, help="mock Ollama seconds to load the model")
+    parser.add_argument('--max-tokens', type=int, default=80, help="longest mock Ollama answer")
+    parser.add_argument('--hf-latency', type=float, default=0.1, help="mock Hugging Face response time")
+    parser.add_argument('--hf-error-rate', type=float, default=0.0, help="share of mock Hugging Face 503s")
+    parser.add_argument('--no-ollama', action='store_true', help="run with Ollama unreachable to time the fallbacks")
+    parser.add_argument('--no-streaming', dest='streaming', action='store_false', help="disable token streaming")
+    parser.add_argument('--memory-sessions', type=int, default=3, help="sessions replayed under tracemalloc")
+    parser.add_argument('--timeout', type=float, default=60, help="seconds allowed per app interaction")
+    parser.add_argument('--output', help="write the JSON result here as well as to stdout")
+    parser.add_argument('--baseline', help="earlier JSON result to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    result = run_benchmark(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 1 if result['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
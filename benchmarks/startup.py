@@ -0,0 +1,90 @@
+"""Cold-start benchmark: time from a fresh interpreter to the app's first rendered page
+
+Each sample starts a new Python process, as a new server worker or
+autoscaled replica would, imports Streamlit's AppTest and renders app.py
+once. It reports the import and first-page times and which of the heavy
+optional subsystems the first page pulled in; those should load only when
+a session uses them.
+
+Examples:
+    python -m benchmarks.startup --samples 5
+    python -m benchmarks.startup --budget 2.0     # exit 1 if the median cold start exceeds 2 seconds
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+# Subsystems a first page view must not import: model clients, HTTP libraries and PDF rendering
+LAZY_MODULES = ['ollama', 'llm_gateway', 'hf_fallback', 'requests', 'httpx', 'reportlab', 'report_pdf']
+
+SAMPLE = """
+import json, logging, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+rendered = time.perf_counter()
+print(json.dumps({
+    'streamlit': imported - started,
+    'first_page': rendered - imported,
+    'total': rendered - started,
+    'loaded': [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+    'errors': [element.message for element in at.exception],
+}))
+"""
+
+
+def run_sample(workdir):
+    """Timings of one cold start in a new interpreter"""
+    env = dict(os.environ, ADVICE_CACHE_PATH=os.path.join(workdir, 'advice_cache.sqlite3'),
+               SESSION_STORE_PATH=os.path.join(workdir, 'sessions.sqlite3'),
+               ADVISOR_METRICS_PORT='0', ADVISOR_TRACE_PATH='')
+    output = subprocess.run([sys.executable, '-c', SAMPLE, APP_PATH, json.dumps(LAZY_MODULES)],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_startup(samples):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_sample(workdir) for _ in range(samples)]
+    return {
+        'samples': samples,
+        'python': sys.version.split()[0],
+        'seconds': {key: round(statistics.median(result[key] for result in results), 3)
+                    for key in ('streamlit', 'first_page', 'total')},
+        'max_total': round(max(result['total'] for result in results), 3),
+        'loaded': sorted({name for result in results for name in result['loaded']}),
+        'errors': [error for result in results for error in result['errors']][:5],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=5, help="cold starts to time")
+    parser.add_argument('--budget', type=float, help="fail when the median cold start takes longer (seconds)")
+    parser.add_argument('--output', help="write the JSON result here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    result = run_startup(args.samples)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    failures = [f"first page imported {name}" for name in result['loaded']] + result['errors']
+    if args.budget is not None and result['seconds']['total'] > args.budget:
+        failures.append(f"median cold start {result['seconds']['total']}s exceeds budget {args.budget}s")
+    for line in failures:
+        print(f"REGRESSION: {line}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Seeded synthetic sessions: profiles, chatbot questions and claim issues"""
+import random
+
+from advisor import TRANSLATED_OPTIONS, INCOME_BRACKETS, CLAIM_TYPES
+
+LOCATIONS = ['Pune', 'Mumbai', 'Lucknow', 'Patna', 'Jaipur', 'Bhopal', 'Kochi', 'Nashik', 'Ranchi', 'Guwahati']
+
+QUESTIONS = [
+    ["How to apply for PMJAY?", "how do I apply for ayushman bharat", "PMJAY application process?"],
+    ["What documents are needed for PMSBY?", "documents required for pmsby", "PMSBY papers needed"],
+    ["What is the premium of PMJJBY?", "pmjjby cost per year", "How much does PMJJBY cost?"],
+    ["Who is eligible for Atal Pension Yojana?", "APY eligibility", "am I eligible for atal pension"],
+    ["How do I file an accident claim?", "accident insurance claim process", "how to claim accident insurance"],
+    ["Can I get health insurance with diabetes?", "health insurance for diabetes patients",
+     "diabetes health cover options"],
+]
+
+# Questions that only make sense after an earlier answer
+FOLLOW_UPS = [
+    "And for my wife?", "What if I am above 50?", "Which documents should I carry?",
+    "How long does it take?", "Can I do it at the post office instead?",
+]
+
+CLAIM_ISSUES = [
+    "Hospital denied cashless treatment",
+    "Claim rejected for missing documents",
+    "Nominee details are wrong in the bank record",
+    "Accident happened last week, what should I do first?",
+    "Bank is not responding to my claim for 45 days",
+]
+
+
+def default_profile():
+    """The form's untouched defaults, which campaign traffic mostly submits"""
+    options = TRANSLATED_OPTIONS['en']
+    return {
+        'age': 30,
+        'job': options['occupations'][0],
+        'income': INCOME_BRACKETS[0],
+        'location': 'Pune',
+        'family_size': options['family_sizes'][0],
+        'health_condition': options['health_status'][0],
+        'financial_goal': options['financial_goals'][0],
+    }
+
+
+def random_profile(rng):
+    options = TRANSLATED_OPTIONS['en']
+    return {
+        'age': rng.randint(18, 65),
+        'job': rng.choice(options['occupations']),
+        'income': rng.choice(INCOME_BRACKETS),
+        'location': rng.choice(LOCATIONS),
+        'family_size': rng.choice(options['family_sizes']),
+        'health_condition': rng.choice(options['health_status']),
+        'financial_goal': rng.choice(options['financial_goals']),
+    }
+
+
+def build_sessions(count, seed=42, repeat_ratio=0.5, questions_per_session=2, follow_up_ratio=0.3):
+    """Session plans; repeat_ratio of them submit the default profile like a campaign burst.
+
+    After the first question, follow_up_ratio of the questions are follow-ups to the conversation.
+    """
+    rng = random.Random(seed)
+    sessions = []
+    for i in range(count):
+        profile = default_profile() if rng.random() < repeat_ratio else random_profile(rng)
+        sessions.append({
+            'id': i,
+            'profile': profile,
+            'questions': [rng.choice(FOLLOW_UPS) if turn and rng.random() < follow_up_ratio
+                          else rng.choice(rng.choice(QUESTIONS)) for turn in range(questions_per_session)],
+            'claim': {'type': rng.choice(CLAIM_TYPES), 'issue': rng.choice(CLAIM_ISSUES)},
+        })
+    return sessions
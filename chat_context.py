@@ -0,0 +1,150 @@
+"""Multi-turn chatbot context: recent turns verbatim, older ones folded into a short summary
+
+The context has to fit phi3:mini's window next to the question and its
+grounding facts, so every message is measured with a local estimate of
+its tokens. Turns leave the verbatim window several at a time and the
+summary only changes when they do; between those points each request
+extends the previous one, so Ollama reuses the prompt it has already
+evaluated and only the newest turn costs prompt-evaluation time.
+"""
+import math
+import os
+import re
+
+from semantic_cache import SCHEMES, normalize, words
+
+# Estimated tokens the summary and the verbatim turns may use together
+CHAT_HISTORY_TOKENS = int(os.environ.get('CHAT_HISTORY_TOKENS', '512'))
+# The summary keeps its most recent lines within this many tokens
+CHAT_SUMMARY_TOKENS = int(os.environ.get('CHAT_SUMMARY_TOKENS', '160'))
+# Once over budget, turns are folded until the context is down to this share of it, so the next
+# few turns fit without another fold and the prefix stays stable for longer
+FOLD_TARGET = 0.5
+# Words of the question and of the answer's first sentence kept per summary line
+SUMMARY_WORDS = 20
+# Template tokens phi3 adds around every chat message (<|user|>, <|end|> and newlines)
+MESSAGE_TOKENS = 4
+
+# A question leans on the conversation when it starts like a continuation, refers back with a
+# pronoun, or is too short to stand alone without naming a scheme ("and for my wife?", "is it free?")
+FOLLOW_UP_OPENERS = ('and', 'also', 'but', 'then', 'so', 'what about', 'how about', 'what if', 'और', 'तो', 'लेकिन')
+FOLLOW_UP_PRONOUNS = {
+    'it', 'its', 'this', 'that', 'these', 'those', 'they', 'them', 'their', 'he', 'him', 'his', 'she', 'her',
+    'same', 'यह', 'वह', 'ये', 'वे', 'इस', 'उस', 'इसे', 'उसे', 'इसका', 'उसका', 'इसके', 'उसके', 'इसमें', 'उसमें',
+}
+FOLLOW_UP_WORDS = 3
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z]+|\n|[ \t\r\f\v]+|.', re.S)
+
+
+def count_tokens(text):
+    """Estimated phi3:mini tokens in the text, erring high.
+
+    Its SentencePiece vocabulary holds whole common English words, splits
+    digits and acronyms finely, has single tokens for Devanagari letters
+    and falls back to UTF-8 bytes for other characters such as ₹ or emoji.
+    """
+    total = 0
+    for piece in TOKEN_PATTERN.findall(text or ''):
+        if piece[0].isalpha() and piece.isascii():
+            total += math.ceil(len(piece) / 2) if piece.isupper() and len(piece) > 1 else 1 + len(piece) // 6
+        elif piece == '\n' or piece.isascii() and not piece.isspace():
+            total += 1
+        elif 'ऀ' <= piece <= 'ॿ':
+            total += 1
+        elif not piece.isspace():
+            total += len(piece.encode('utf-8'))
+    return total
+
+
+def message_tokens(message):
+    return count_tokens(message['content']) + MESSAGE_TOKENS
+
+
+def turn_messages(turn):
+    """A chat_history entry as the user and assistant messages it was"""
+    return [{'role': 'user', 'content': turn['question']}, {'role': 'assistant', 'content': turn['answer']}]
+
+
+def turn_tokens(turn):
+    return sum(message_tokens(message) for message in turn_messages(turn))
+
+
+def clip_words(text, count=SUMMARY_WORDS):
+    words = text.split()
+    return ' '.join(words[:count]) + (' ...' if len(words) > count else '')
+
+
+def summary_line(turn):
+    """One compressed line for a turn: the question and the first sentence of the answer"""
+    answer = re.split(r'(?<=[.!?।])\s', turn['answer'].strip(), maxsplit=1)[0]
+    return f"- Asked: {clip_words(turn['question'])} Told: {clip_words(answer)}"
+
+
+def fold_turns(summary, turns, max_tokens=CHAT_SUMMARY_TOKENS):
+    """Summary with a line per turn appended, dropping its oldest lines beyond max_tokens"""
+    lines = [line for line in summary.splitlines() if line] + [summary_line(turn) for turn in turns]
+    while len(lines) > 1 and count_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def context_tokens(history, summary, folded):
+    return count_tokens(summary) + sum(map(turn_tokens, history[folded:]))
+
+
+def compact_history(history, summary='', folded=0, budget=CHAT_HISTORY_TOKENS):
+    """(summary, folded) with the turns after history[:folded] and the summary within the budget.
+
+    Unchanged while they already fit, so the context stays a prefix of the
+    next request's until the next fold.
+    """
+    folded = min(folded, len(history))
+    if context_tokens(history, summary, folded) <= budget:
+        return summary, folded
+    while folded < len(history) and context_tokens(history, summary, folded) > budget * FOLD_TARGET:
+        summary = fold_turns(summary, history[folded:folded + 1])
+        folded += 1
+    return summary, folded
+
+
+def trim_history(history, summary, folded, max_turns):
+    """(history, summary, folded) keeping the last max_turns turns; dropped turns live on in the summary"""
+    dropped = len(history) - max_turns
+    if dropped <= 0:
+        return history, summary, folded
+    if dropped > folded:
+        summary = fold_turns(summary, history[folded:dropped])
+    return history[dropped:], summary, max(0, folded - dropped)
+
+
+def is_follow_up(question, earlier):
+    """Whether the question leans on the earlier turns (or their summary) rather than standing alone.
+
+    A follow-up's answer depends on the conversation, so it must not be
+    answered from, or stored in, caches keyed by the question alone. Any
+    other question, even late in a conversation, still goes to them.
+    """
+    if not earlier:
+        return False
+    tokens = words(question, keep='')
+    text = ' '.join(tokens)
+    if any(text == opener or text.startswith(opener + ' ') for opener in FOLLOW_UP_OPENERS):
+        return True
+    if FOLLOW_UP_PRONOUNS.intersection(tokens):
+        return True
+    return len(tokens) <= FOLLOW_UP_WORDS and not SCHEMES.intersection(normalize(question))
+
+
+def chat_messages(system, prompt, turns=(), summary='', budget=None):
+    """System message with the summary, then the turns and the prompt; the oldest turns go while over budget"""
+    if summary:
+        system = f"{system}\n\nEarlier in this conversation:\n{summary}"
+    head = [{'role': 'system', 'content': system}]
+    tail = [{'role': 'user', 'content': prompt}]
+    turns = list(turns)
+    if budget is not None:
+        spare = budget - sum(map(message_tokens, head + tail))
+        while turns and sum(map(turn_tokens, turns)) > spare:
+            turns.pop(0)
+    return head + [message for turn in turns for message in turn_messages(turn)] + tail
@@ -0,0 +1,156 @@
+"""Scheme eligibility and recommendations from structured scheme rules, without a model call"""
+from functools import lru_cache
+
+from premium_engine import SCHEMES, PMJAY, APY_MIN_AGE, APY_MAX_AGE, TERM_MAX_AGE, apy_contribution
+
+# Scores add up per profile; the highest-scoring schemes a profile qualifies for are recommended
+SCHEME_RULES = [
+    {
+        'key': 'pmsby', 'name': 'PMSBY - Accident Insurance',
+        'min_age': SCHEMES['pmsby']['min_age'], 'max_age': SCHEMES['pmsby']['max_age'],
+        'premium': f"₹{SCHEMES['pmsby']['annual']} per year", 'cover': "₹2 lakh accident protection",
+        'apply': "Any bank branch with Aadhaar", 'score': 5,
+        'boosts': {'job': {'Driver': 2, 'Labor Worker': 2, 'Farmer': 1}},
+    },
+    {
+        'key': 'pmjjby', 'name': 'PMJJBY - Life Insurance',
+        'min_age': SCHEMES['pmjjby']['min_age'], 'max_age': SCHEMES['pmjjby']['max_age'],
+        'premium': f"₹{SCHEMES['pmjjby']['annual']} per year", 'cover': "₹2 lakh life cover",
+        'apply': "Bank with auto-debit facility", 'score': 3,
+        'boosts': {'family_size': {'2-3': 2, '4-5': 3, '6+': 3},
+                   'financial_goal': {'Family Security': 3, 'Basic Protection': 1}},
+    },
+    {
+        'key': 'pmjay', 'name': 'PMJAY - Ayushman Bharat Health Insurance',
+        'max_income': PMJAY['max_monthly_income'],
+        'premium': "FREE for eligible families", 'cover': "₹5 lakh per family per year",
+        'apply': "pmjay.gov.in or call 14555", 'score': 4,
+        'income_reason': "For households under about ₹1.8 lakh/year",
+        'boosts': {'health_condition': {'Fair': 1, 'Have medical conditions': 3},
+                   'financial_goal': {'Health Coverage': 3}},
+    },
+    {
+        'key': 'apy', 'name': 'Atal Pension Yojana (APY)',
+        'min_age': APY_MIN_AGE, 'max_age': APY_MAX_AGE,
+        'premium': None, 'cover': "₹1,000-₹5,000 monthly pension from age 60",
+        'apply': "Any bank", 'score': 1,
+        'boosts': {'financial_goal': {'Retirement Planning': 5},
+                   'job': {'Farmer': 1, 'Labor Worker': 1, 'Driver': 1, 'Shopkeeper': 1, 'Self Employed': 1}},
+    },
+    {
+        'key': 'health_topup', 'name': 'Health Insurance Top-up',
+        'min_income': PMJAY['max_monthly_income'] + 1,
+        'premium': "from ₹200 per month", 'cover': "₹2-₹10 lakh hospital cover",
+        'apply': "Insurer or bank branch", 'score': 2,
+        'income_reason': "PMJAY already covers hospital costs at this income", 'income_status': 'not_suggested',
+        'boosts': {'health_condition': {'Fair': 1, 'Have medical conditions': 2},
+                   'financial_goal': {'Health Coverage': 4}},
+    },
+    {
+        'key': 'term', 'name': 'Term Life Insurance',
+        'max_age': TERM_MAX_AGE, 'min_income': 15000,
+        'premium': "from ₹300 per month", 'cover': "₹5 lakh+ life cover",
+        'apply': "Insurer or bank branch", 'score': 1,
+        'income_reason': "Suggested from ₹15,000/month income", 'income_status': 'not_suggested',
+        'boosts': {'family_size': {'4-5': 2, '6+': 2},
+                   'financial_goal': {'Family Security': 2, 'Child Education': 2, 'Wealth Building': 1}},
+    },
+]
+
+RECOMMENDED_COUNT = 3
+MAX_AGE = 120
+
+STATUS_LABELS = {'eligible': "✅ Eligible", 'likely': "🟡 Likely eligible", 'check': "🟡 Depends on exact age",
+                 'not_eligible': "❌ Not eligible", 'not_suggested': "➖ Not needed now"}
+
+OPEN_STATUSES = ('eligible', 'likely', 'check')
+
+
+def compile_rules(rules):
+    """Rules as flat tuples with numeric bounds filled in, so checking a profile is only comparisons"""
+    return [(
+        rule,
+        rule.get('min_age', 0), rule.get('max_age', MAX_AGE),
+        rule.get('min_income', 0), rule.get('max_income', float('inf')),
+        tuple(rule.get('boosts', {}).items()),
+    ) for rule in rules]
+
+
+COMPILED_RULES = compile_rules(SCHEME_RULES)
+
+
+def age_range(age_band):
+    """(youngest, oldest) age of an advice-cache age band such as '26-35' or '61+'"""
+    text = str(age_band)
+    if text.endswith('+'):
+        return int(text[:-1]), MAX_AGE
+    low, _, high = text.partition('-')
+    return int(low), int(high or low)
+
+
+@lru_cache(maxsize=None)
+def apy_premium(low, high):
+    """Contribution range over an age band, from the ₹1,000 pension at the youngest age to ₹5,000 at the oldest"""
+    low, high = max(low, APY_MIN_AGE), min(high, APY_MAX_AGE)
+    if low > high:
+        low, high = APY_MIN_AGE, APY_MAX_AGE
+    return f"₹{int(apy_contribution(low, 1000))}-₹{int(apy_contribution(high, 5000))} per month (age dependent)"
+
+
+def assess(profile):
+    """Eligibility of every scheme for a bucketed profile, best recommendations first"""
+    low, high = age_range(profile['age_band'])
+    income = int(profile['income'])
+    schemes = []
+    for rule, min_age, max_age, min_income, max_income, boosts in COMPILED_RULES:
+        if income < min_income or income > max_income:
+            status, reason = rule.get('income_status', 'not_eligible'), rule['income_reason']
+        elif high < min_age or low > max_age:
+            status, reason = 'not_eligible', f"Open to ages {min_age}-{max_age}"
+        elif low < min_age or high > max_age:
+            status, reason = 'check', f"Open to ages {min_age}-{max_age}"
+        else:
+            # PMJAY is decided by the SECC household list, income only makes it likely
+            status = 'likely' if rule['key'] == 'pmjay' else 'eligible'
+            reason = "Income under about ₹1.8 lakh/year" if rule['key'] == 'pmjay' else ""
+
+        score = rule['score'] + sum(values.get(profile.get(field), 0) for field, values in boosts)
+        premium = rule['premium'] or apy_premium(low, high)
+        schemes.append(dict(key=rule['key'], name=rule['name'], status=status, reason=reason, premium=premium,
+                            cover=rule['cover'], apply=rule['apply'], score=score))
+
+    schemes.sort(key=lambda scheme: (scheme['status'] not in OPEN_STATUSES, -scheme['score']))
+    recommended = [scheme for scheme in schemes if scheme['status'] in OPEN_STATUSES][:RECOMMENDED_COUNT]
+    return {'schemes': schemes, 'recommended': recommended}
+
+
+def scheme_facts(assessment):
+    """One line per recommended scheme, for the model to explain rather than work out"""
+    return '\n'.join(f"- {scheme['name']}: {scheme['premium']}, {scheme['cover']}"
+                     for scheme in assessment['recommended'])
+
+
+def eligibility_markdown(assessment):
+    lines = ["## 🏥 Eligibility Check", ""]
+    for scheme in assessment['schemes']:
+        note = f" — {scheme['reason']}" if scheme['reason'] else ""
+        lines.append(f"- **{scheme['name']}:** {STATUS_LABELS[scheme['status']]}{note}")
+    return '\n'.join(lines)
+
+
+def action_plan_markdown(assessment):
+    steps = ["This Week", "Next Week", "This Month"]
+    lines = ["## 💡 Your Personalized Action Plan:"]
+    for step, scheme in zip(steps, assessment['recommended']):
+        lines.append(f"{len(lines)}. **{step}:** Apply for {scheme['name'].split(' - ')[0]} ({scheme['apply']})")
+    return '\n'.join(lines)
+
+
+def portfolio_markdown(assessment):
+    sections = ["## 📊 Recommended Insurance Portfolio"]
+    for number, scheme in enumerate(assessment['recommended'], 1):
+        sections.append(f"""### {number}. {scheme['name']} ✅
+- **Premium:** {scheme['premium']}
+- **Coverage:** {scheme['cover']}
+- **Apply at:** {scheme['apply']}""")
+    return '\n\n'.join(sections)
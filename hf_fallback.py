@@ -0,0 +1,329 @@
+"""Hugging Face inference fallback used when phi3:mini is unavailable"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import ModelCall
+
+API_BASE = os.environ.get('HF_INFERENCE_URL', 'https://api-inference.huggingface.co/models')
+MODELS = [
+    "microsoft/DialoGPT-large",
+    "facebook/blenderbot-400M-distill",
+    "microsoft/DialoGPT-medium"
+]
+HEDGE_DELAY = float(os.environ.get('HF_HEDGE_DELAY', '2'))
+LATENCY_BUDGET = float(os.environ.get('HF_LATENCY_BUDGET', '20'))
+REQUEST_TIMEOUT = 30
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+BREAKER_THRESHOLD = int(os.environ.get('HF_BREAKER_THRESHOLD', '3'))
+BREAKER_COOLDOWN = float(os.environ.get('HF_BREAKER_COOLDOWN', '120'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide keep-alive session so retries reuse pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=len(MODELS), pool_maxsize=16)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+class CircuitBreaker:
+    """Skip a model for a cool-down window after repeated failures"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True when closed, or half-open after the cool-down has passed"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            return time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model):
+    """Circuit breaker shared by every request to one model"""
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker()
+        return _breakers[model]
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_delay(response):
+    """Server-suggested wait from Retry-After or a 503 model-loading estimate"""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    if response.status_code == 503:
+        try:
+            return float(response.json().get('estimated_time'))
+        except Exception:
+            pass
+    return None
+
+
+def build_payload(prompt):
+    """Inference API payload for an insurance question"""
+    return {
+        "inputs": f"Insurance Expert: {prompt}\nResponse:",
+        "parameters": {
+            "max_length": 200,
+            "temperature": 0.7,
+            "do_sample": True
+        }
+    }
+
+
+def parse_generated_text(result):
+    """Pull the answer out of an inference API result, or None if there is none"""
+    if isinstance(result, list) and len(result) > 0 and 'generated_text' in result[0]:
+        text = result[0]['generated_text']
+        if "Response:" in text:
+            text = text.split("Response:")[-1].strip()
+        return text or None
+    return None
+
+
+def query_model(model, prompt, headers=None, max_retries=3, deadline=None, cancelled=None):
+    """Ask one model with backoff, stopping once it answers, gives up, or the race is over"""
+    session = get_session()
+    breaker = get_breaker(model)
+    payload = build_payload(prompt)
+    call = ModelCall('huggingface', model, 'fallback')
+    status = 'cancelled'
+
+    try:
+        for attempt in range(max_retries):
+            if cancelled is not None and cancelled.is_set():
+                return None
+
+            timeout = REQUEST_TIMEOUT
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    status = 'timeout'
+                    return None
+
+            delay = backoff_delay(attempt)
+            try:
+                response = session.post(f"{API_BASE}/{model}", headers=headers, json=payload, timeout=timeout)
+                if response.status_code == 200:
+                    text = parse_generated_text(response.json())
+                    if text:
+                        breaker.record_success()
+                        status = 'ok'
+                        return text
+                elif response.status_code in (429, 503):
+                    suggested = retry_after_delay(response)
+                    if suggested is not None:
+                        delay = suggested
+                elif 400 <= response.status_code < 500:
+                    break
+            except Exception:
+                pass
+
+            if attempt == max_retries - 1:
+                break
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                break
+            if cancelled is not None:
+                if cancelled.wait(delay):
+                    return None
+            else:
+                time.sleep(delay)
+
+        breaker.record_failure()
+        status = 'error'
+        return None
+    finally:
+        call.finish(status)
+
+
+def query_models_hedged(prompt, api_key="", models=MODELS, hedge_delay=HEDGE_DELAY,
+                        budget=LATENCY_BUDGET, max_retries=3):
+    """Race the models and return the first good answer within the latency budget.
+
+    The first model starts immediately; each further model starts after
+    hedge_delay seconds, or as soon as a running one fails. hedge_delay=0
+    fires every model at once. Losers stop retrying once a winner is found,
+    and models whose circuit breaker is open are skipped.
+    """
+    deadline = time.monotonic() + budget
+    cancelled = threading.Event()
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    remaining = [model for model in models if get_breaker(model).allow()]
+    executor = ThreadPoolExecutor(max_workers=len(models) or 1)
+
+    def launch():
+        return executor.submit(query_model, remaining.pop(0), prompt, headers,
+                               max_retries, deadline, cancelled)
+
+    try:
+        pending = {launch()} if remaining else set()
+        while hedge_delay <= 0 and remaining:
+            pending.add(launch())
+
+        while pending:
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                break
+
+            done, pending = wait(
+                pending,
+                timeout=min(time_left, hedge_delay) if remaining else time_left,
+                return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                text = future.result()
+                if text:
+                    return text
+
+            if remaining:
+                pending.add(launch())
+        return None
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Keep-alive httpx client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(limits=httpx.Limits(max_connections=16, max_keepalive_connections=len(MODELS)))
+        _async_clients[loop] = client
+    return client
+
+
+async def query_model_async(model, prompt, headers=None, max_retries=3, deadline=None):
+    """asyncio version of query_model; cancelling the task aborts the request in flight"""
+    client = get_async_client()
+    breaker = get_breaker(model)
+    payload = build_payload(prompt)
+    call = ModelCall('huggingface', model, 'fallback')
+    status = 'cancelled'
+
+    try:
+        for attempt in range(max_retries):
+            timeout = REQUEST_TIMEOUT
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    status = 'timeout'
+                    return None
+
+            delay = backoff_delay(attempt)
+            try:
+                response = await client.post(f"{API_BASE}/{model}", headers=headers, json=payload, timeout=timeout)
+                if response.status_code == 200:
+                    text = parse_generated_text(response.json())
+                    if text:
+                        breaker.record_success()
+                        status = 'ok'
+                        return text
+                elif response.status_code in (429, 503):
+                    suggested = retry_after_delay(response)
+                    if suggested is not None:
+                        delay = suggested
+                elif 400 <= response.status_code < 500:
+                    break
+            except Exception:
+                pass
+
+            if attempt == max_retries - 1:
+                break
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
+
+        breaker.record_failure()
+        status = 'error'
+        return None
+    finally:
+        call.finish(status)
+
+
+async def query_models_hedged_async(prompt, api_key="", models=MODELS, hedge_delay=HEDGE_DELAY,
+                                    budget=LATENCY_BUDGET, max_retries=3):
+    """asyncio version of query_models_hedged; losing requests are cancelled outright"""
+    deadline = time.monotonic() + budget
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    remaining = [model for model in models if get_breaker(model).allow()]
+
+    def launch():
+        return asyncio.ensure_future(query_model_async(remaining.pop(0), prompt, headers, max_retries, deadline))
+
+    pending = {launch()} if remaining else set()
+    while hedge_delay <= 0 and remaining:
+        pending.add(launch())
+
+    try:
+        while pending:
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                break
+
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=min(time_left, hedge_delay) if remaining else time_left,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                text = task.result()
+                if text:
+                    return text
+
+            if remaining:
+                pending.add(launch())
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,123 @@
+"""Keyword intent classifier for insurance questions, answering common ones without a model call
+
+Intents, their weighted English/Hindi keywords and their answers live in
+intents.json. Keywords are whole words or phrases; a trailing * matches
+any word starting with the prefix ("claim*" matches "claims", "claimed").
+Intents of kind "scheme" describe one scheme, those of kind "greeting"
+small talk; the rest are topics such as documents, claims or eligibility.
+"""
+import json
+import os
+from collections import defaultdict
+
+from semantic_cache import words
+
+INTENTS_PATH = os.environ.get('ADVISOR_INTENTS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json'))
+INTENT_ROUTING = os.environ.get('INTENT_ROUTING', '1') != '0'
+# A question is answered from intents.json only when its best intent scores at least this much
+# and beats the runner-up, e.g. one scheme name, or two topic keywords
+ROUTE_MIN_SCORE = float(os.environ.get('INTENT_MIN_SCORE', '3'))
+
+_END = ''
+
+
+class IntentClassifier:
+    """Token trie over every keyword, so a question is classified in one pass over its words"""
+
+    def __init__(self, data):
+        self.intents = data['intents']
+        self.default_answer = data['default_answer']
+        self.guides = data['guides']
+        self.by_name = {intent['name']: intent for intent in self.intents}
+        self.trie = {}
+        # prefix length -> prefix -> [(intent index, weight, keyword)]
+        self.prefixes = defaultdict(lambda: defaultdict(list))
+
+        for index, intent in enumerate(self.intents):
+            for keyword, weight in intent['keywords'].items():
+                tokens = words(keyword, keep='')
+                if keyword.endswith('*') and len(tokens) == 1:
+                    self.prefixes[len(tokens[0])][tokens[0]].append((index, weight, (index, keyword)))
+                    continue
+                node = self.trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(_END, []).append((index, weight, (index, keyword)))
+
+    def scores(self, question):
+        """Summed keyword weights per intent index; a keyword counts once however often it appears"""
+        tokens = words(question, keep='')
+        matched = {}
+        for start, token in enumerate(tokens):
+            node = self.trie
+            for position in range(start, len(tokens)):
+                node = node.get(tokens[position])
+                if node is None:
+                    break
+                for index, weight, keyword in node.get(_END, ()):
+                    matched[keyword] = (index, weight)
+            for length, entries in self.prefixes.items():
+                for index, weight, keyword in entries.get(token[:length], ()):
+                    matched[keyword] = (index, weight)
+
+        totals = defaultdict(float)
+        for index, weight in matched.values():
+            totals[index] += weight
+        return totals
+
+    def ranked(self, totals):
+        """(intent name, score, runner-up score) of the best of the totals, or (None, 0, 0) when there are none"""
+        if not totals:
+            return None, 0.0, 0.0
+        # Earlier intents in the file win ties
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return self.intents[ranked[0][0]]['name'], ranked[0][1], runner_up
+
+    def classify(self, question):
+        """(intent name, score, runner-up score) of the best intent, or (None, 0, 0) when nothing matches"""
+        return self.ranked(self.scores(question))
+
+    def answer(self, question, lang='en'):
+        """Short canned answer for the best intent, or the default answer"""
+        name, _, _ = self.classify(question)
+        answers = self.by_name[name]['answer'] if name else self.default_answer
+        return answers.get(lang) or answers['en']
+
+    def route(self, question, lang='en', min_score=ROUTE_MIN_SCORE):
+        """Canned answer when the question clearly belongs to one intent, else None so a model answers it.
+
+        A scheme's answer only describes the scheme, so a question that also
+        asks about a topic ("documents for PMSBY", "apply for PMJAY") goes to
+        the model instead.
+        """
+        totals = self.scores(question)
+        name, score, runner_up = self.ranked(totals)
+        if name is None or score < min_score or score <= runner_up:
+            return None
+        if self.by_name[name].get('kind') == 'scheme' and any('kind' not in self.intents[index] for index in totals):
+            return None
+        answers = self.by_name[name]['answer']
+        return answers.get(lang) or answers['en']
+
+    def guide(self, prompt):
+        """Long-form knowledge base text for the prompt's topic"""
+        name, _, _ = self.classify(prompt)
+        key = self.by_name[name].get('guide', 'default') if name else 'default'
+        return self.guides.get(key, self.guides['default'])
+
+
+def load_classifier(path=INTENTS_PATH):
+    with open(path, encoding='utf-8') as f:
+        return IntentClassifier(json.load(f))
+
+
+_classifier = None
+
+
+def get_classifier():
+    """Process-wide classifier, built on first use"""
+    global _classifier
+    if _classifier is None:
+        _classifier = load_classifier()
+    return _classifier
@@ -0,0 +1,548 @@
+"""Shared gateway for every phi3:mini call made by the advisor"""
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import ollama
+
+from metrics import ModelCall
+from model_lifecycle import DEFAULT_MODEL, KEEP_ALIVE, keep_alive_value
+
+MAX_IN_FLIGHT = int(os.environ.get('OLLAMA_MAX_IN_FLIGHT', '2'))
+MAX_QUEUE = int(os.environ.get('OLLAMA_MAX_QUEUE', '16'))
+QUEUE_TIMEOUT = float(os.environ.get('OLLAMA_QUEUE_TIMEOUT', '20'))
+REQUEST_TIMEOUT = float(os.environ.get('OLLAMA_REQUEST_TIMEOUT', '60'))
+COALESCE = os.environ.get('OLLAMA_COALESCE', '1') != '0'
+
+
+class GatewayBusy(Exception):
+    """Raised when a request is refused admission or waits too long for a slot"""
+
+
+class GatewayTimeout(Exception):
+    """Raised when a generation runs past its deadline"""
+
+
+class GenerationCancelled(Exception):
+    """Raised in a generation that was superseded by a newer request or cancelled"""
+
+
+class RequestRegistry:
+    """Tracks the current request id per owner so older generations can be abandoned.
+
+    An owner is a (session_id, channel) tuple such as (session, 'advice'); a
+    new request for the same owner supersedes the one before it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = {}
+        self._ids = itertools.count(1)
+
+    def register(self, owner, request_id=None):
+        if owner is None:
+            return None
+        request_id = request_id or f"req-{next(self._ids)}"
+        with self._lock:
+            self._current[owner] = request_id
+        return request_id
+
+    def is_current(self, owner, request_id):
+        if owner is None:
+            return True
+        with self._lock:
+            return self._current.get(owner) == request_id
+
+    def finish(self, owner, request_id):
+        if owner is None:
+            return
+        with self._lock:
+            if self._current.get(owner) in (request_id, None):
+                self._current.pop(owner, None)
+
+    def cancel(self, session_id, channel=None):
+        """Mark every request of a session, or of one channel in it, as cancelled"""
+        with self._lock:
+            for owner in self._current:
+                if owner[0] == session_id and (channel is None or owner[1] == channel):
+                    self._current[owner] = None
+
+
+def as_messages(prompt):
+    """Chat messages for a prompt: a string is one user message, a list of messages is sent as is"""
+    return [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt
+
+
+def flight_key(prompt, options):
+    """Requests with the same prompt and options can share one generation"""
+    return json.dumps(as_messages(prompt), ensure_ascii=False), json.dumps(options, sort_keys=True)
+
+
+def prompt_eval_seconds(chunk):
+    """Time Ollama spent evaluating the prompt; tokens it reused from its cache are not counted"""
+    duration = chunk.get('prompt_eval_duration')
+    return None if duration is None else duration / 1e9
+
+
+class Flight:
+    """One running generation and every token it has produced so far"""
+
+    def __init__(self, key):
+        self.key = key
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        self.abandoned = False
+        self.cond = threading.Condition()
+
+    def push(self, token):
+        with self.cond:
+            self.tokens.append(token)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def follow(self, deadline, is_current):
+        """Replay the tokens so far, then yield new ones as they arrive"""
+        seen = 0
+        while True:
+            with self.cond:
+                while seen == len(self.tokens) and not self.done:
+                    if not is_current():
+                        raise GenerationCancelled("phi3:mini generation was superseded")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise GatewayTimeout("phi3:mini generation exceeded its deadline")
+                    self.cond.wait(remaining)
+                tokens = self.tokens[seen:]
+                seen += len(tokens)
+                done, error = self.done, self.error
+
+            yield from tokens
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class AsyncFlight:
+    """asyncio counterpart of Flight, driven by a task on the gateway's loop"""
+
+    def __init__(self, key):
+        self.key = key
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        self.task = None
+        self.changed = asyncio.Event()
+
+    def _notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def push(self, token):
+        self.tokens.append(token)
+        self._notify()
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def follow(self, deadline, is_current):
+        """Replay the tokens so far, then yield new ones as they arrive"""
+        seen = 0
+        while True:
+            if not is_current():
+                raise GenerationCancelled("phi3:mini generation was superseded")
+            if seen < len(self.tokens):
+                token = self.tokens[seen]
+                seen += 1
+                yield token
+                continue
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+            remaining = deadline - time.monotonic()
+            try:
+                await asyncio.wait_for(self.changed.wait(), max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise GatewayTimeout("phi3:mini generation exceeded its deadline")
+
+
+def call_status(error):
+    """Outcome label recorded for a call that ended with this exception"""
+    if isinstance(error, GatewayBusy):
+        return 'busy'
+    if isinstance(error, GatewayTimeout):
+        return 'timeout'
+    if isinstance(error, (GenerationCancelled, GeneratorExit, asyncio.CancelledError)):
+        return 'cancelled'
+    return 'error'
+
+
+class LLMGateway:
+    """One persistent Ollama client with bounded concurrency and a FIFO wait queue"""
+
+    def __init__(self, host=None, model=DEFAULT_MODEL, max_in_flight=MAX_IN_FLIGHT,
+                 max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT, request_timeout=REQUEST_TIMEOUT,
+                 coalesce=COALESCE, keep_alive=KEEP_ALIVE):
+        self.model = model
+        self.keep_alive = keep_alive_value(keep_alive)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.coalesce = coalesce
+        self.client = ollama.Client(host=host, timeout=request_timeout)
+
+        self.requests = RequestRegistry()
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queue = deque()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.coalesced = 0
+
+    def cancel(self, session_id, channel=None):
+        """Abandon a session's queued and running generations at their next token"""
+        self.requests.cancel(session_id, channel)
+        with self._cond:
+            self._cond.notify_all()
+        with self._flights_lock:
+            flights = list(self._flights.values())
+        for flight in flights:
+            with flight.cond:
+                flight.cond.notify_all()
+
+    def stats(self):
+        """Current number of running and queued requests, and how many were shared"""
+        with self._cond:
+            stats = {'in_flight': self._active, 'queued': len(self._queue)}
+        with self._flights_lock:
+            stats['shared'] = len(self._flights)
+            stats['coalesced'] = self.coalesced
+        return stats
+
+    def _acquire(self, deadline, is_current=lambda: True):
+        """Wait for a free slot in FIFO order, refusing work once the queue is full"""
+        with self._cond:
+            if self._active < self.max_in_flight and not self._queue:
+                self._active += 1
+                return
+
+            if len(self._queue) >= self.max_queue:
+                raise GatewayBusy(f"phi3:mini queue full ({self.max_queue} waiting)")
+
+            ticket = object()
+            self._queue.append(ticket)
+            wait_until = min(deadline, time.monotonic() + self.queue_timeout)
+            try:
+                while not (self._queue[0] is ticket and self._active < self.max_in_flight):
+                    if not is_current():
+                        raise GenerationCancelled("Superseded while waiting for a phi3:mini slot")
+                    remaining = wait_until - time.monotonic()
+                    if remaining <= 0:
+                        raise GatewayBusy("Timed out waiting for a free phi3:mini slot")
+                    self._cond.wait(remaining)
+                self._queue.popleft()
+                self._active += 1
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                self._cond.notify_all()
+                raise
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _generate(self, prompt, options, deadline, is_current, channel=None):
+        """Run one generation against Ollama, holding a slot until it ends or is closed"""
+        call = ModelCall('ollama', self.model, channel)
+        try:
+            self._acquire(deadline, is_current)
+        except BaseException as e:
+            call.finish(call_status(e))
+            raise
+        call.acquired()
+
+        chunks = None
+        status = 'ok'
+        try:
+            chunks = self.client.chat(
+                model=self.model,
+                messages=as_messages(prompt),
+                stream=True,
+                options=options,
+                keep_alive=self.keep_alive
+            )
+            for chunk in chunks:
+                if not is_current():
+                    raise GenerationCancelled("phi3:mini generation was superseded")
+                if time.monotonic() > deadline:
+                    raise GatewayTimeout("phi3:mini generation exceeded its deadline")
+                if chunk.get('done'):
+                    call.usage(chunk.get('prompt_eval_count'), chunk.get('eval_count'), prompt_eval_seconds(chunk))
+                token = chunk['message']['content']
+                if token:
+                    call.token()
+                    yield token
+        except BaseException as e:
+            status = call_status(e)
+            raise
+        finally:
+            if chunks is not None:
+                chunks.close()
+            self._release()
+            call.finish(status)
+
+    def _produce(self, flight, prompt, options, deadline, channel):
+        """Feed a shared flight from its own thread so no single follower drives it"""
+        error = None
+        try:
+            for token in self._generate(prompt, options, deadline, lambda: not flight.abandoned, channel):
+                flight.push(token)
+        except Exception as e:
+            error = e
+        finally:
+            with self._flights_lock:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+            flight.finish(error)
+
+    def _join(self, prompt, options, deadline, channel=None):
+        """Follow the running generation for this prompt, starting one if there is none"""
+        key = flight_key(prompt, options)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = Flight(key)
+                self._flights[key] = flight
+                threading.Thread(target=self._produce, args=(flight, prompt, options, deadline, channel),
+                                 daemon=True).start()
+            else:
+                self.coalesced += 1
+            flight.followers += 1
+        return flight
+
+    def _leave(self, flight):
+        """Stop the generation once its last follower has gone"""
+        with self._flights_lock:
+            flight.followers -= 1
+            if flight.followers == 0 and not flight.done:
+                flight.abandoned = True
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+        if flight.abandoned:
+            with self._cond:
+                self._cond.notify_all()
+
+    def stream(self, prompt, options, timeout=None, owner=None, request_id=None):
+        """Yield response tokens, holding a slot until the stream ends or is closed.
+
+        With an owner, a later request for the same owner (or cancel()) stops
+        this one at its next token and closes the connection to Ollama.
+
+        Identical prompts running at the same time share one generation: a late
+        caller replays the tokens produced so far, then follows the live stream.
+        The generation only stops early once every caller has gone.
+        """
+        deadline = time.monotonic() + (timeout or self.request_timeout)
+        request_id = self.requests.register(owner, request_id)
+        is_current = lambda: self.requests.is_current(owner, request_id)
+        channel = owner[1] if owner else None
+        try:
+            if not self.coalesce:
+                yield from self._generate(prompt, options, deadline, is_current, channel)
+                return
+
+            flight = self._join(prompt, options, deadline, channel)
+            try:
+                yield from flight.follow(deadline, is_current)
+            finally:
+                self._leave(flight)
+        finally:
+            self.requests.finish(owner, request_id)
+
+    def chat(self, prompt, options, timeout=None, owner=None, request_id=None):
+        """Return the full response text for a prompt"""
+        return ''.join(self.stream(prompt, options, timeout=timeout, owner=owner, request_id=request_id))
+
+
+class AsyncLLMGateway:
+    """asyncio counterpart of LLMGateway; use it from a single event loop"""
+
+    def __init__(self, host=None, model=DEFAULT_MODEL, max_in_flight=MAX_IN_FLIGHT,
+                 max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT, request_timeout=REQUEST_TIMEOUT,
+                 coalesce=COALESCE, keep_alive=KEEP_ALIVE):
+        self.model = model
+        self.keep_alive = keep_alive_value(keep_alive)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.coalesce = coalesce
+        self.client = ollama.AsyncClient(host=host, timeout=request_timeout)
+
+        self.requests = RequestRegistry()
+        self._slots = None
+        self._active = 0
+        self._waiting = 0
+        self._flights = {}
+        self.coalesced = 0
+
+    def cancel(self, session_id, channel=None):
+        """Abandon a session's running generations at their next token"""
+        self.requests.cancel(session_id, channel)
+
+    def stats(self):
+        """Current number of running and queued requests, and how many were shared"""
+        return {'in_flight': self._active, 'queued': self._waiting,
+                'shared': len(self._flights), 'coalesced': self.coalesced}
+
+    async def _acquire(self, deadline):
+        if self._slots is None:
+            # Created on first use so it belongs to the loop that runs the gateway
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        # Counted here rather than read off the semaphore: wait_for only starts
+        # the acquire in a later task, so a burst would all pass a locked() check
+        if self._active + self._waiting >= self.max_in_flight + self.max_queue:
+            raise GatewayBusy(f"phi3:mini queue full ({self.max_queue} waiting)")
+
+        self._waiting += 1
+        try:
+            wait = min(deadline - time.monotonic(), self.queue_timeout)
+            await asyncio.wait_for(self._slots.acquire(), max(wait, 0))
+        except asyncio.TimeoutError:
+            raise GatewayBusy("Timed out waiting for a free phi3:mini slot")
+        finally:
+            self._waiting -= 1
+        self._active += 1
+
+    def _release(self):
+        self._active -= 1
+        self._slots.release()
+
+    async def _generate(self, prompt, options, deadline, is_current, channel=None):
+        """Run one generation against Ollama, holding a slot until it ends or is closed"""
+        call = ModelCall('ollama', self.model, channel)
+        try:
+            await self._acquire(deadline)
+        except BaseException as e:
+            call.finish(call_status(e))
+            raise
+        call.acquired()
+
+        chunks = None
+        status = 'ok'
+        try:
+            if not is_current():
+                raise GenerationCancelled("Superseded while waiting for a phi3:mini slot")
+            chunks = await self.client.chat(
+                model=self.model,
+                messages=as_messages(prompt),
+                stream=True,
+                options=options,
+                keep_alive=self.keep_alive
+            )
+            async for chunk in chunks:
+                if not is_current():
+                    raise GenerationCancelled("phi3:mini generation was superseded")
+                if time.monotonic() > deadline:
+                    raise GatewayTimeout("phi3:mini generation exceeded its deadline")
+                if chunk.get('done'):
+                    call.usage(chunk.get('prompt_eval_count'), chunk.get('eval_count'), prompt_eval_seconds(chunk))
+                token = chunk['message']['content']
+                if token:
+                    call.token()
+                    yield token
+        except BaseException as e:
+            status = call_status(e)
+            raise
+        finally:
+            if chunks is not None:
+                await chunks.aclose()
+            self._release()
+            call.finish(status)
+
+    async def _produce(self, flight, prompt, options, deadline, channel):
+        error = None
+        tokens = self._generate(prompt, options, deadline, lambda: True, channel)
+        try:
+            async for token in tokens:
+                flight.push(token)
+        except asyncio.CancelledError:
+            error = GenerationCancelled("phi3:mini generation was abandoned")
+        except Exception as e:
+            error = e
+        finally:
+            await tokens.aclose()
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            flight.finish(error)
+
+    def _join(self, prompt, options, deadline, channel=None):
+        key = flight_key(prompt, options)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = AsyncFlight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.ensure_future(self._produce(flight, prompt, options, deadline, channel))
+        else:
+            self.coalesced += 1
+        flight.followers += 1
+        return flight
+
+    def _leave(self, flight):
+        flight.followers -= 1
+        if flight.followers == 0 and not flight.done:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            flight.task.cancel()
+
+    async def stream(self, prompt, options, timeout=None, owner=None, request_id=None):
+        """Yield response tokens, holding a slot until the stream ends or is closed.
+
+        Identical concurrent prompts share one generation, as in LLMGateway.stream.
+        """
+        deadline = time.monotonic() + (timeout or self.request_timeout)
+        request_id = self.requests.register(owner, request_id)
+        is_current = lambda: self.requests.is_current(owner, request_id)
+        channel = owner[1] if owner else None
+        try:
+            if not self.coalesce:
+                tokens = self._generate(prompt, options, deadline, is_current, channel)
+            else:
+                flight = self._join(prompt, options, deadline, channel)
+                tokens = flight.follow(deadline, is_current)
+            try:
+                async for token in tokens:
+                    yield token
+            finally:
+                await tokens.aclose()
+                if self.coalesce:
+                    self._leave(flight)
+        finally:
+            self.requests.finish(owner, request_id)
+
+    async def chat(self, prompt, options, timeout=None, owner=None, request_id=None):
+        """Return the full response text; cancelling the caller frees the slot at once"""
+        tokens = self.stream(prompt, options, timeout=timeout, owner=owner, request_id=request_id)
+        try:
+            return ''.join([token async for token in tokens])
+        finally:
+            await tokens.aclose()
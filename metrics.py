@@ -0,0 +1,273 @@
+"""Latency, token and cache metrics for every model call, with a Prometheus endpoint and a JSONL trace"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.environ.get('ADVISOR_METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('ADVISOR_METRICS_PORT', '9108'))
+TRACE_PATH = os.environ.get('ADVISOR_TRACE_PATH', os.path.join('.cache', 'model_calls.jsonl'))
+WINDOW = int(os.environ.get('ADVISOR_METRICS_WINDOW', '500'))
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+HELP = {
+    'advisor_model_calls_total': ('counter', "Model calls by provider, model, channel and outcome"),
+    'advisor_model_tokens_total': ('counter', "Prompt and completion tokens reported by the model"),
+    'advisor_cache_lookups_total': ('counter', "Cache lookups by cache and result"),
+    'advisor_responses_total': ('counter', "Answers shown to users by channel and the tier that produced them"),
+    'advisor_model_queue_wait_seconds': ('histogram', "Time spent waiting for a gateway slot"),
+    'advisor_model_ttft_seconds': ('histogram', "Time from the call starting to its first token"),
+    'advisor_model_latency_seconds': ('histogram', "Total time of a model call"),
+    'advisor_model_prompt_eval_seconds': ('histogram', "Time the model spent evaluating prompt tokens it had not cached"),
+    'advisor_model_tokens_per_second': ('gauge', "Completion tokens per second of the latest finished call"),
+}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list, or None when it is empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, edge in enumerate(self.buckets):
+            if value <= edge:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Process-wide counters, histograms and a window of recent call latencies"""
+
+    def __init__(self, trace_path=TRACE_PATH, window=WINDOW):
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._recent = deque(maxlen=window)
+
+        if trace_path:
+            directory = os.path.dirname(trace_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            key = (name, tuple(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            key = (name, tuple(labels))
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    def record_call(self, record):
+        """Account for one finished model call and append it to the trace"""
+        labels = (('provider', record['provider']), ('model', record['model']), ('channel', record['channel']))
+        self.inc('advisor_model_calls_total', labels + (('status', record['status']),))
+        for kind in ('prompt', 'completion'):
+            if record.get(f'{kind}_tokens'):
+                self.inc('advisor_model_tokens_total', labels + (('kind', kind),), record[f'{kind}_tokens'])
+        for name, field in (('advisor_model_queue_wait_seconds', 'queue_wait'),
+                            ('advisor_model_ttft_seconds', 'ttft'),
+                            ('advisor_model_latency_seconds', 'latency'),
+                            ('advisor_model_prompt_eval_seconds', 'prompt_eval')):
+            if record.get(field) is not None:
+                self.observe(name, labels, record[field])
+
+        with self._lock:
+            if record.get('tokens_per_second') is not None:
+                self._gauges[('advisor_model_tokens_per_second', labels)] = record['tokens_per_second']
+            if record['status'] == 'ok':
+                self._recent.append(record['latency'])
+        self.trace(record)
+
+    def record_cache(self, cache, hit):
+        self.inc('advisor_cache_lookups_total', (('cache', cache), ('result', 'hit' if hit else 'miss')))
+        self.trace({'event': 'cache', 'cache': cache, 'hit': hit})
+
+    def record_response(self, channel, tier):
+        """Count which tier answered: phi3, cache, intent, huggingface or knowledge_base"""
+        self.inc('advisor_responses_total', (('channel', channel), ('tier', tier)))
+        self.trace({'event': 'response', 'channel': channel, 'tier': tier})
+
+    def trace(self, record):
+        if not self.trace_path:
+            return
+        line = json.dumps(dict(record, ts=round(time.time(), 3)), ensure_ascii=False)
+        with self._lock:
+            try:
+                with open(self.trace_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError:
+                pass
+
+    def counter_values(self, name):
+        """[(labels dict, value)] for every series of one counter"""
+        with self._lock:
+            return [(dict(labels), value) for (metric, labels), value in self._counters.items() if metric == name]
+
+    def latency_summary(self):
+        """p50/p95 over the most recent successful model calls"""
+        with self._lock:
+            recent = list(self._recent)
+        return {'count': len(recent), 'p50': percentile(recent, 50), 'p95': percentile(recent, 95)}
+
+    def render(self):
+        """Every metric in Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (h.buckets, list(h.counts), h.count, h.sum) for key, h in self._histograms.items()}
+
+        lines = []
+        for name, (kind, text) in HELP.items():
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+            for (metric, labels), value in sorted(gauges.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(labels)} {value:.3f}")
+            for (metric, labels), (buckets, counts, count, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for edge, bucket_count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', edge),))} {bucket_count}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Registry shared by the gateways, the fallback and the app in this process"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+class ModelCall:
+    """Timings of one model call; finish() reports it to the registry exactly once"""
+
+    def __init__(self, provider, model, channel=None, registry=None):
+        self.provider = provider
+        self.model = model
+        self.channel = channel or 'default'
+        self.registry = registry or get_registry()
+        self.started = time.monotonic()
+        self.queue_wait = None
+        self.ttft = None
+        self.chunks = 0
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.prompt_eval = None
+        self.finished = False
+
+    def acquired(self):
+        """The call got its gateway slot"""
+        self.queue_wait = time.monotonic() - self.started
+
+    def token(self):
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self.started
+        self.chunks += 1
+
+    def usage(self, prompt_tokens=None, completion_tokens=None, prompt_eval=None):
+        """Token counts and prompt-evaluation seconds the model reported in its final chunk"""
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.prompt_eval = prompt_eval
+
+    def finish(self, status='ok'):
+        if self.finished:
+            return
+        self.finished = True
+        latency = time.monotonic() - self.started
+        rounded = lambda value: None if value is None else round(value, 4)
+        completion_tokens = self.completion_tokens or self.chunks or None
+        tokens_per_second = None
+        if completion_tokens and self.ttft is not None and latency > self.ttft:
+            tokens_per_second = completion_tokens / (latency - self.ttft)
+
+        self.registry.record_call({
+            'event': 'model_call',
+            'provider': self.provider,
+            'model': self.model,
+            'channel': self.channel,
+            'status': status,
+            'queue_wait': rounded(self.queue_wait),
+            'ttft': rounded(self.ttft),
+            'latency': rounded(latency),
+            'prompt_eval': rounded(self.prompt_eval),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'tokens_per_second': rounded(tokens_per_second),
+        })
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body = self.registry.render().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.split('?')[0] == '/metrics.json':
+            body = json.dumps(self.registry.latency_summary()).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST, registry=None):
+    """Serve /metrics from a daemon thread; None when disabled or the port is taken"""
+    if not port:
+        return None
+    handler = type('Handler', (MetricsHandler,), {'registry': registry or get_registry()})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,165 @@
+"""Keeps phi3:mini loaded and tracks whether it is, so requests never wait on a model that is not there
+
+A daemon thread asks Ollama every OLLAMA_HEALTH_INTERVAL seconds which
+models are loaded (/api/ps) and pulled (/api/tags). When phi3:mini is pulled
+but not loaded, at startup or after Ollama unloaded or restarted, it loads it
+with the options and keep-alive every call uses and evaluates the chat
+system prompt, so the first question starts from a cached prefix. It talks
+plain HTTP through the standard library, so probing never imports the Ollama
+client.
+
+Example:
+    python model_lifecycle.py      # probe once, preload if needed and print the state
+"""
+import json
+import os
+import threading
+import time
+import urllib.request
+
+DEFAULT_MODEL = 'phi3:mini'
+# How long Ollama keeps the model loaded after a request: a duration such as "30m", or seconds; negative is forever
+KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+HEALTH_INTERVAL = float(os.environ.get('OLLAMA_HEALTH_INTERVAL', '15'))
+HEALTH_TIMEOUT = float(os.environ.get('OLLAMA_HEALTH_TIMEOUT', '2'))
+PRELOAD = os.environ.get('OLLAMA_PRELOAD', '1') != '0'
+# Seconds between probes while Ollama is down, so it is used again soon after it comes back
+DOWN_INTERVAL = 3
+# Seconds a preload may take; loading phi3:mini from disk on a small CPU box is slow
+LOAD_TIMEOUT = 300
+
+# Model states: ready (loaded), cold (pulled but not loaded), loading (being preloaded), missing (not pulled),
+# offline (Ollama unreachable) and unknown (not probed yet). Requests go to the model in every state but
+# these, which go straight to the fallbacks
+DOWN_STATES = ('offline', 'missing')
+
+
+def keep_alive_value(value=KEEP_ALIVE):
+    """keep_alive as Ollama expects it: a number of seconds, or a duration string such as "30m" """
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def base_url(host=None):
+    """Ollama's base URL from host or OLLAMA_HOST, read the way the Ollama client reads it"""
+    host = (host or os.environ.get('OLLAMA_HOST') or '127.0.0.1:11434').rstrip('/')
+    if '://' not in host:
+        host = f"http://{host}"
+    host = host.replace('://0.0.0.0', '://127.0.0.1')
+    return host if host.count(':') > 1 else f"{host}:11434"
+
+
+class ModelMonitor:
+    """Background health probe and preloader for one Ollama model"""
+
+    def __init__(self, host=None, model=DEFAULT_MODEL, options=None, prime=None, keep_alive=KEEP_ALIVE,
+                 interval=HEALTH_INTERVAL, timeout=HEALTH_TIMEOUT, preload=PRELOAD):
+        self.url = base_url(host)
+        self.model = model
+        self.options = options or {}
+        self.prime = prime
+        self.keep_alive = keep_alive_value(keep_alive)
+        self.interval = interval
+        self.timeout = timeout
+        self.preload_enabled = preload
+        self.state = 'unknown'
+        self.error = None
+        self.checked = None
+        self.loads = 0
+        self.load_seconds = None
+        self._loading = False
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def request(self, path, payload=None, timeout=None):
+        data = None if payload is None else json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(self.url + path, data=data, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+            return json.loads(response.read() or b'{}')
+
+    def listed(self, models):
+        names = {name for model in models for name in (model.get('name'), model.get('model'))}
+        return self.model in names or f"{self.model}:latest" in names
+
+    def probe(self):
+        """Ask Ollama whether the model is loaded, pulled or neither, and record the answer"""
+        try:
+            if self.listed(self.request('/api/ps').get('models') or []):
+                state = 'ready'
+            elif self.listed(self.request('/api/tags').get('models') or []):
+                state = 'loading' if self._loading else 'cold'
+            else:
+                state = 'missing'
+            error = None
+        except (OSError, ValueError) as e:
+            state, error = 'offline', str(e)
+        self.state, self.error, self.checked = state, error, time.time()
+        return state
+
+    def preload(self):
+        """Load the model with the options every call uses, so no call reloads it, and evaluate the shared prefix"""
+        messages = [{'role': 'system', 'content': self.prime}] if self.prime else []
+        payload = {'model': self.model, 'messages': messages, 'stream': False, 'keep_alive': self.keep_alive,
+                   'options': dict(self.options, num_predict=1)}
+        self._loading = True
+        self.state = 'loading'
+        started = time.monotonic()
+        try:
+            self.request('/api/chat', payload, timeout=LOAD_TIMEOUT)
+            self.loads += 1
+            self.load_seconds = round(time.monotonic() - started, 3)
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+        finally:
+            self._loading = False
+        return self.probe()
+
+    def check(self):
+        """Probe once, preloading the model when it is pulled but not loaded"""
+        state = self.probe()
+        if state == 'cold' and self.preload_enabled:
+            state = self.preload()
+        return state
+
+    def run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                # An answer the probe cannot read (a cut-off body, an unexpected shape) must not end the
+                # thread and leave the last state standing
+                self.state, self.error, self.checked = 'offline', f"{type(e).__name__}: {e}", time.time()
+            self._wake.wait(self.interval if self.usable() else min(self.interval, DOWN_INTERVAL))
+            self._wake.clear()
+
+    def start(self):
+        """Start probing from a daemon thread; safe to call more than once"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='model-monitor', daemon=True)
+                self._thread.start()
+        return self
+
+    def check_soon(self):
+        """A call failed: probe now instead of at the next interval"""
+        self._wake.set()
+
+    def usable(self):
+        """Whether requests should go to the model; false once Ollama was found down or without the model"""
+        return self.state not in DOWN_STATES
+
+    def stats(self):
+        return {'model': self.model, 'state': self.state, 'error': self.error,
+                'checked_ago': None if self.checked is None else round(time.time() - self.checked, 1),
+                'loads': self.loads, 'load_seconds': self.load_seconds}
+
+
+if __name__ == "__main__":
+    from advisor import CHAT_OPTIONS, CHAT_SYSTEM
+
+    monitor = ModelMonitor(options=CHAT_OPTIONS, prime=CHAT_SYSTEM)
+    monitor.check()
+    print(json.dumps(monitor.stats(), indent=2))
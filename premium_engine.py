@@ -0,0 +1,220 @@
+"""Premium and coverage tables for the schemes, evaluated with NumPy over many profiles and plan bundles at once"""
+import numpy as np
+
+# Yearly premium, sum assured and enrolment ages of the flat-rate government schemes
+SCHEMES = {
+    'pmsby': {'annual': 20, 'cover': 200000, 'min_age': 18, 'max_age': 70},
+    'pmjjby': {'annual': 436, 'cover': 200000, 'min_age': 18, 'max_age': 50},
+}
+
+# Atal Pension Yojana monthly contribution by entry age (rows, 18-40) and guaranteed monthly pension (columns)
+APY_MIN_AGE = 18
+APY_MAX_AGE = 40
+APY_PENSIONS = np.array([1000, 2000, 3000, 4000, 5000])
+APY_CONTRIBUTIONS = np.array([
+    [42, 84, 126, 168, 210],
+    [46, 92, 138, 183, 228],
+    [50, 100, 150, 198, 248],
+    [54, 108, 162, 215, 269],
+    [59, 117, 177, 234, 292],
+    [64, 127, 192, 254, 318],
+    [70, 139, 208, 277, 346],
+    [76, 151, 226, 301, 376],
+    [82, 164, 246, 327, 409],
+    [90, 178, 268, 356, 446],
+    [97, 194, 292, 388, 485],
+    [106, 212, 318, 423, 529],
+    [116, 231, 347, 462, 577],
+    [126, 252, 379, 504, 630],
+    [138, 276, 414, 551, 689],
+    [151, 302, 453, 602, 752],
+    [165, 330, 495, 659, 824],
+    [181, 362, 543, 722, 902],
+    [198, 396, 594, 792, 990],
+    [218, 436, 654, 870, 1087],
+    [240, 480, 720, 957, 1196],
+    [264, 528, 792, 1054, 1318],
+    [291, 582, 873, 1164, 1454],
+])
+
+# Ayushman Bharat (PMJAY): free family health cover for households under about ₹1.8 lakh/year
+PMJAY = {'cover': 500000, 'max_monthly_income': 15000}
+
+# Health top-up: cover bought per rupee of monthly premium for one member, divided by the family-floater multiplier
+HEALTH_COVER_PER_RUPEE = 1000
+FAMILY_MULTIPLIERS = {'1': 1.0, '2-3': 1.5, '4-5': 1.9, '6+': 2.3}
+
+# Term insurance: cover per rupee of monthly premium at age 30 or under, divided by the age loading
+TERM_COVER_PER_RUPEE = 1250
+TERM_MAX_AGE = 65
+TERM_AGE_LOADING = [(30, 1.0), (40, 1.6), (50, 2.8), (TERM_MAX_AGE, 4.5)]
+
+# Slider ranges (min, max, step) searched by the plan optimizer, and the default share of income it may spend
+HEALTH_RANGE = (200, 2000, 50)
+TERM_RANGE = (300, 3000, 100)
+BUDGET_SHARE = 0.05
+
+# Options offered by the calculator; 0 means the product is not taken
+BUNDLE_OPTIONS = {
+    'pmsby': [0, 1],
+    'pmjjby': [0, 1],
+    'apy_pension': [0, 1000, 2000, 3000, 4000, 5000],
+    'health_monthly': [0, 200, 500, 1000, 2000],
+    'term_monthly': [0, 300, 800, 1500, 3000],
+}
+
+
+def plan_bundles(options=BUNDLE_OPTIONS):
+    """Every combination of the options, as one array per product"""
+    grids = np.meshgrid(*[np.asarray(values) for values in options.values()], indexing='ij')
+    return {name: grid.ravel() for name, grid in zip(options, grids)}
+
+
+def apy_contribution(ages, pensions):
+    """Monthly APY contribution for entry ages and pensions; NaN where the age or pension is not allowed"""
+    ages, pensions = np.broadcast_arrays(np.asarray(ages), np.asarray(pensions))
+    rows = np.clip(ages - APY_MIN_AGE, 0, len(APY_CONTRIBUTIONS) - 1)
+    columns = np.clip(np.searchsorted(APY_PENSIONS, pensions), 0, len(APY_PENSIONS) - 1)
+    allowed = (ages >= APY_MIN_AGE) & (ages <= APY_MAX_AGE) & (APY_PENSIONS[columns] == pensions)
+    contribution = np.where(allowed, APY_CONTRIBUTIONS[rows, columns], np.nan)
+    return np.where(pensions == 0, 0.0, contribution)
+
+
+def family_multipliers(family_sizes):
+    return np.array([FAMILY_MULTIPLIERS.get(str(size), 1.0) for size in np.atleast_1d(family_sizes)])
+
+
+def term_loading(ages):
+    limits = np.array([limit for limit, _ in TERM_AGE_LOADING])
+    loadings = np.array([loading for _, loading in TERM_AGE_LOADING])
+    return loadings[np.clip(np.searchsorted(limits, ages), 0, len(limits) - 1)]
+
+
+def evaluate(ages, family_sizes, bundles=None):
+    """Annual cost, coverage and eligibility of every bundle for every profile, as (profiles, bundles) arrays"""
+    bundles = plan_bundles() if bundles is None else bundles
+    ages = np.atleast_1d(np.asarray(ages, dtype=int))
+    multipliers = family_multipliers(family_sizes)
+    # Applicant lists repeat the same few hundred (age, family size) pairs; price each pair once
+    pairs, inverse = np.unique(np.stack([ages, multipliers]), axis=1, return_inverse=True)
+    ages, multipliers = pairs[0].astype(int)[:, None], pairs[1][:, None]
+    take = {name: np.asarray(values)[None, :] for name, values in bundles.items()}
+
+    apy_monthly = apy_contribution(ages, take['apy_pension'])
+    eligible = ~np.isnan(apy_monthly) & ((take['term_monthly'] == 0) | (ages <= TERM_MAX_AGE))
+    annual = 12 * (np.nan_to_num(apy_monthly) + take['health_monthly'] + take['term_monthly'])
+    coverage = (take['health_monthly'] * HEALTH_COVER_PER_RUPEE / multipliers
+                + take['term_monthly'] * TERM_COVER_PER_RUPEE / term_loading(ages))
+    for name, scheme in SCHEMES.items():
+        chosen = take[name] == 1
+        eligible &= ~chosen | ((ages >= scheme['min_age']) & (ages <= scheme['max_age']))
+        annual = annual + chosen * scheme['annual']
+        coverage = coverage + chosen * scheme['cover']
+
+    inverse = inverse.ravel()
+    return {
+        'annual': annual.astype(int)[inverse],
+        'coverage': np.floor(coverage).astype(int)[inverse],
+        'apy_monthly': np.nan_to_num(apy_monthly).astype(int)[inverse],
+        'eligible': eligible[inverse],
+    }
+
+
+def quote(age=30, family_size='1', pmsby=False, pmjjby=False, apy_pension=0, health_monthly=0, term_monthly=0):
+    """Cost and coverage of one plan selection for one person"""
+    bundle = {
+        'pmsby': [int(bool(pmsby))], 'pmjjby': [int(bool(pmjjby))], 'apy_pension': [int(apy_pension)],
+        'health_monthly': [int(health_monthly)], 'term_monthly': [int(term_monthly)],
+    }
+    result = evaluate([age], [family_size], bundle)
+    annual = int(result['annual'][0, 0])
+    return {
+        'annual': annual,
+        'monthly': annual // 12,
+        'coverage': int(result['coverage'][0, 0]),
+        'apy_monthly': int(result['apy_monthly'][0, 0]),
+        'eligible': bool(result['eligible'][0, 0]),
+    }
+
+
+def pmjay_eligible(monthly_income):
+    return monthly_income <= PMJAY['max_monthly_income']
+
+
+def product_choices(age, family_size, apy_pension=0):
+    """Per product: (name, values, yearly costs, coverage) of the choices open at this age, "not taken" first"""
+    choices = []
+    for name, scheme in SCHEMES.items():
+        if scheme['min_age'] <= age <= scheme['max_age']:
+            choices.append((name, np.array([0, 1]), np.array([0, scheme['annual']]), np.array([0, scheme['cover']])))
+
+    # APY buys a pension rather than cover, so it is only priced in when the user asks for it
+    if apy_pension:
+        yearly = 12 * apy_contribution(age, apy_pension)
+        if not np.isnan(yearly):
+            choices.append(('apy_pension', np.array([apy_pension]), np.array([yearly]), np.array([0])))
+
+    health = np.concatenate([[0], np.arange(HEALTH_RANGE[0], HEALTH_RANGE[1] + 1, HEALTH_RANGE[2])])
+    choices.append(('health_monthly', health, 12 * health,
+                    health * HEALTH_COVER_PER_RUPEE / family_multipliers([family_size])[0]))
+    if age <= TERM_MAX_AGE:
+        term = np.concatenate([[0], np.arange(TERM_RANGE[0], TERM_RANGE[1] + 1, TERM_RANGE[2])])
+        choices.append(('term_monthly', term, 12 * term, term * TERM_COVER_PER_RUPEE / term_loading(age)))
+    return choices
+
+
+def optimize_plan(age, family_size='1', monthly_income=10000, budget=None, apy_pension=0):
+    """Most coverage a yearly budget buys, cheapest among equals"""
+    if budget is None:
+        budget = int(monthly_income * 12 * BUDGET_SHARE)
+    costs, covers = np.zeros(1), np.zeros(1)
+    picks = np.zeros((1, 0), dtype=int)
+    choices = product_choices(age, family_size, apy_pension)
+
+    # Multiple-choice knapsack over the (cost, coverage) Pareto frontier: after adding each product,
+    # drop combinations over budget or no better covered than a cheaper one
+    for _, values, option_costs, option_covers in choices:
+        costs = (costs[:, None] + option_costs[None, :]).ravel()
+        covers = (covers[:, None] + option_covers[None, :]).ravel()
+        picks = np.hstack([np.repeat(picks, len(values), axis=0),
+                           np.tile(np.arange(len(values)), len(picks))[:, None]])
+
+        order = np.lexsort((-covers, costs))
+        order = order[costs[order] <= budget]
+        best_before = np.maximum.accumulate(np.concatenate([[-1.0], covers[order]]))[:-1]
+        order = order[covers[order] > best_before]
+        costs, covers, picks = costs[order], covers[order], picks[order]
+
+    plan = {name: 0 for name in BUNDLE_OPTIONS}
+    pmjay = pmjay_eligible(monthly_income)
+    # Only a fixed APY choice can overrun the budget on its own; the plan is then empty
+    feasible = bool(len(costs))
+    annual = coverage = 0
+    if feasible:
+        best = int(np.argmax(covers))
+        for (name, values, _, _), index in zip(choices, picks[best]):
+            plan[name] = int(values[index])
+        annual, coverage = int(costs[best]), int(covers[best])
+    return dict(
+        plan,
+        annual=annual,
+        coverage=coverage + (PMJAY['cover'] if pmjay else 0),
+        coverage_per_rupee=round(coverage / annual, 1) if annual else 0.0,
+        budget=budget,
+        feasible=feasible,
+        pmjay=pmjay,
+    )
+
+
+def portfolio_summary(ages, family_sizes, **selection):
+    """What-if totals of offering one plan selection to many applicants"""
+    bundle = {name: [int(selection.get(name, 0))] for name in BUNDLE_OPTIONS}
+    result = evaluate(ages, family_sizes, bundle)
+    eligible = result['eligible'][:, 0]
+    return {
+        'applicants': int(eligible.size),
+        'eligible': int(eligible.sum()),
+        'annual_premium': int(result['annual'][eligible, 0].sum()),
+        'coverage': int(result['coverage'][eligible, 0].sum()),
+        'mean_annual_premium': round(float(result['annual'][eligible, 0].mean()), 2) if eligible.any() else 0.0,
+    }
@@ -0,0 +1,331 @@
+"""PDF report of a user's profile and insurance advice
+
+Fonts and paragraph styles are set up once per process. Rendered reports
+are kept in a small in-memory cache keyed by a hash of their content, and
+prerender() renders one in the background as soon as its advice exists,
+so the download button only has to hand over the bytes; warm_up() loads
+the fonts while that advice is still being generated.
+
+Hindi reports need a Devanagari TrueType font, which is not shipped: install
+fonts-noto-core (or put NotoSansDevanagari-Regular.ttf in fonts/) or set
+ADVISOR_PDF_FONT. Without one they fail with MissingFontError rather than
+print boxes; run `python report_pdf.py` to see which font is used.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import HRFlowable, Paragraph, SimpleDocTemplate, Spacer
+
+PDF_FONT = os.environ.get('ADVISOR_PDF_FONT', '')
+PDF_FONT_BOLD = os.environ.get('ADVISOR_PDF_FONT_BOLD', '')
+PDF_CACHE_SIZE = int(os.environ.get('ADVISOR_PDF_CACHE_SIZE', '64'))
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+# (regular, bold) TrueType fonts covering Devanagari and the rupee sign, first found wins
+FONT_CANDIDATES = [
+    (os.path.join(FONTS_DIR, 'NotoSansDevanagari-Regular.ttf'), os.path.join(FONTS_DIR, 'NotoSansDevanagari-Bold.ttf')),
+    ('/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf', '/usr/share/fonts/truetype/noto/NotoSansDevanagari-Bold.ttf'),
+    ('/usr/share/fonts/noto/NotoSansDevanagari-Regular.ttf', '/usr/share/fonts/noto/NotoSansDevanagari-Bold.ttf'),
+    ('/usr/share/fonts/google-noto/NotoSansDevanagari-Regular.ttf', '/usr/share/fonts/google-noto/NotoSansDevanagari-Bold.ttf'),
+    ('/usr/share/fonts/truetype/lohit-devanagari/Lohit-Devanagari.ttf', ''),
+    ('/usr/share/fonts/truetype/freefont/FreeSans.ttf', '/usr/share/fonts/truetype/freefont/FreeSansBold.ttf'),
+    ('C:\\Windows\\Fonts\\Nirmala.ttf', 'C:\\Windows\\Fonts\\NirmalaB.ttf'),
+    ('C:\\Windows\\Fonts\\mangal.ttf', 'C:\\Windows\\Fonts\\mangalb.ttf'),
+]
+
+LABELS = {
+    'en': {
+        'title': "Your Personalized Insurance Plan",
+        'generated': "Generated on",
+        'profile': "Your Profile",
+        'age': "Age", 'years': "years", 'job': "Occupation", 'income': "Monthly Income",
+        'location': "Location", 'family_size': "Family Size", 'financial_goal': "Financial Goal",
+        'advice': "AI Recommendations",
+        'next_steps': "Next Steps",
+        'steps': [
+            "Visit your nearest bank branch with Aadhaar card",
+            "Apply for PMSBY (₹20/year) first - easiest to start",
+            "Check PMJAY eligibility online at pmjay.gov.in",
+            "Consider PMJJBY if you have family dependents",
+            "Keep this report for reference when visiting bank",
+        ],
+        'footer': "Generated by GenAI Insurance Advisor • Powered by phi3:mini AI",
+    },
+    'hi': {
+        'title': "आपकी व्यक्तिगत बीमा योजना",
+        'generated': "बनाई गई",
+        'profile': "आपकी प्रोफाइल",
+        'age': "आयु", 'years': "वर्ष", 'job': "व्यवसाय", 'income': "मासिक आय",
+        'location': "स्थान", 'family_size': "परिवार का आकार", 'financial_goal': "वित्तीय लक्ष्य",
+        'advice': "AI सुझाव",
+        'next_steps': "अगले कदम",
+        'steps': [
+            "आधार कार्ड के साथ नजदीकी बैंक शाखा जाएं",
+            "सबसे पहले PMSBY (₹20/वर्ष) के लिए आवेदन करें",
+            "pmjay.gov.in पर PMJAY पात्रता जांचें",
+            "परिवार पर निर्भर सदस्य हों तो PMJJBY लें",
+            "बैंक जाते समय यह रिपोर्ट साथ रखें",
+        ],
+        'footer': "GenAI बीमा सलाहकार द्वारा बनाई गई • phi3:mini AI",
+    },
+}
+
+PROFILE_ROWS = ['age', 'job', 'income', 'location', 'family_size', 'financial_goal']
+
+DEVANAGARI = re.compile('[\u0900-\u097f]')
+
+
+_setup_lock = threading.Lock()
+_styles = None
+
+
+class MissingFontError(RuntimeError):
+    """A report has Devanagari text and no embedded font can draw it"""
+
+
+def covers_devanagari(path):
+    """Whether the TrueType font at path has glyphs for Devanagari letters"""
+    from reportlab.pdfbase.ttfonts import TTFontFile
+
+    try:
+        return ord('क') in TTFontFile(path).charToGlyph
+    except Exception:
+        return False
+
+
+def font_requirement():
+    """How to provide a Devanagari font, naming the setting or folder it is read from"""
+    if PDF_FONT:
+        return (f"ADVISOR_PDF_FONT is {PDF_FONT}, which has no Devanagari glyphs; point it at a Devanagari "
+                "TrueType font such as NotoSansDevanagari-Regular.ttf")
+    return (f"install fonts-noto-core, put NotoSansDevanagari-Regular.ttf in {FONTS_DIR} "
+            "or set ADVISOR_PDF_FONT to a Devanagari TrueType font")
+
+
+def find_fonts():
+    """(regular, bold) font files to embed, or None to use the built-in Helvetica"""
+    if PDF_FONT:
+        return PDF_FONT, PDF_FONT_BOLD or PDF_FONT
+    for regular, bold in FONT_CANDIDATES:
+        if os.path.exists(regular) and covers_devanagari(regular):
+            return regular, bold if bold and os.path.exists(bold) else regular
+    return None
+
+
+def report_styles():
+    """Paragraph styles with the embedded font registered; built once per process"""
+    global _styles
+    if _styles is not None:
+        return _styles
+    with _setup_lock:
+        if _styles is None:
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+            from reportlab.lib.fonts import addMapping
+
+            fonts = find_fonts()
+            regular, bold = 'Helvetica', 'Helvetica-Bold'
+            if fonts:
+                pdfmetrics.registerFont(TTFont('ReportFont', fonts[0]))
+                pdfmetrics.registerFont(TTFont('ReportFont-Bold', fonts[1]))
+                regular, bold = 'ReportFont', 'ReportFont-Bold'
+                for italic in (0, 1):
+                    addMapping(regular, 0, italic, regular)
+                    addMapping(regular, 1, italic, bold)
+
+            sample = getSampleStyleSheet()
+            styles = {
+                'title': ParagraphStyle('ReportTitle', sample['Title'], fontName=bold),
+                'h2': ParagraphStyle('ReportH2', sample['Heading2'], fontName=bold),
+                'h3': ParagraphStyle('ReportH3', sample['Heading3'], fontName=bold),
+                'body': ParagraphStyle('ReportBody', sample['Normal'], fontName=regular, leading=15, spaceAfter=4),
+                'bullet': ParagraphStyle('ReportBullet', sample['Normal'], fontName=regular, leading=15,
+                                         leftIndent=16, bulletIndent=4, spaceAfter=2),
+                'footer': ParagraphStyle('ReportFooter', sample['Normal'], fontName=regular, fontSize=8,
+                                         textColor='#666666', alignment=TA_CENTER),
+            }
+            _styles = dict(styles, unicode=bool(fonts), font=fonts and fonts[0],
+                           devanagari=bool(fonts) and covers_devanagari(fonts[0]))
+    return _styles
+
+
+def plain_text(text, unicode_font):
+    """Text without emoji, which the PDF fonts cannot draw; Helvetica also lacks the rupee sign"""
+    text = ''.join(ch for ch in text if unicodedata.category(ch) not in ('So', 'Cs') and ch not in '\ufe0f\u200d')
+    return text if unicode_font else text.replace('₹', 'Rs. ')
+
+
+def inline_markup(text, unicode_font):
+    """Markdown bold, italics and links as ReportLab paragraph markup"""
+    text = escape(plain_text(text, unicode_font)).strip()
+    text = re.sub(r'\[([^\]]+)\]\((https?://[^)\s]+)\)', r'<link href="\2" color="blue">\1</link>', text)
+    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
+    return re.sub(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])', r'<i>\1</i>', text)
+
+
+def markdown_flowables(markdown, styles):
+    """Flowables for the markdown the advisor produces: headings, lists, rules and paragraphs"""
+    unicode_font = styles['unicode']
+    flowables, paragraph = [], []
+
+    def flush():
+        if paragraph:
+            flowables.append(Paragraph(' '.join(paragraph), styles['body']))
+            paragraph.clear()
+
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        heading = re.match(r'^(#{1,6})\s+(.*)$', stripped)
+        bullet = re.match(r'^[-*•]\s+(.*)$', stripped)
+        numbered = re.match(r'^(\d+)[.)]\s+(.*)$', stripped)
+        if not stripped:
+            flush()
+        elif re.fullmatch(r'[-*_]{3,}', stripped):
+            flush()
+            flowables.append(HRFlowable(width='100%', thickness=0.5, color='#cccccc', spaceBefore=6, spaceAfter=6))
+        elif heading:
+            flush()
+            text = inline_markup(heading.group(2), unicode_font)
+            if text:
+                flowables.append(Paragraph(text, styles['h2'] if len(heading.group(1)) <= 2 else styles['h3']))
+        elif bullet:
+            flush()
+            flowables.append(Paragraph(inline_markup(bullet.group(1), unicode_font), styles['bullet'], bulletText='•'))
+        elif numbered:
+            flush()
+            flowables.append(Paragraph(inline_markup(numbered.group(2), unicode_font), styles['bullet'],
+                                       bulletText=f"{numbered.group(1)}."))
+        else:
+            paragraph.append(inline_markup(stripped, unicode_font))
+    flush()
+    return flowables
+
+
+def generate_insurance_pdf(user_data, advice_content, lang='en'):
+    """Generate PDF report of insurance recommendations"""
+    styles = report_styles()
+    labels = LABELS.get(lang, LABELS['en'])
+    if not styles['devanagari'] and DEVANAGARI.search(json.dumps([labels, user_data, advice_content], ensure_ascii=False,
+                                                                default=str)):
+        raise MissingFontError(f"Hindi reports need a Devanagari font: {font_requirement()}")
+
+    def text(value):
+        return inline_markup(str(value), styles['unicode'])
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=labels['title'])
+
+    story = [
+        Paragraph(text(labels['title']), styles['title']),
+        Spacer(1, 12),
+        Paragraph(f"{text(labels['generated'])}: {datetime.now().strftime('%B %d, %Y')}", styles['body']),
+        Spacer(1, 12),
+        Paragraph(text(labels['profile']), styles['h2']),
+    ]
+    for field in PROFILE_ROWS:
+        value = user_data.get(field)
+        if field == 'age':
+            value = f"{value} {labels['years']}"
+        story.append(Paragraph(f"<b>{text(labels[field])}:</b> {text(value)}", styles['bullet'], bulletText='•'))
+    story.append(Spacer(1, 12))
+
+    story.append(Paragraph(text(labels['advice']), styles['h2']))
+    story.extend(markdown_flowables(advice_content or '', styles))
+    story.append(Spacer(1, 12))
+
+    story.append(Paragraph(text(labels['next_steps']), styles['h2']))
+    for number, step in enumerate(labels['steps'], 1):
+        story.append(Paragraph(text(step), styles['bullet'], bulletText=f"{number}."))
+
+    story.append(Spacer(1, 24))
+    story.append(Paragraph(text(labels['footer']), styles['footer']))
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
+
+
+def report_key(user_data, advice_content, lang='en'):
+    """Cache key of a report; the date is included because it is printed on the report"""
+    payload = json.dumps([user_data, advice_content, lang, datetime.now().strftime('%Y-%m-%d')],
+                         sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+_reports = OrderedDict()
+_pending = {}
+_reports_lock = threading.Lock()
+_executor = None
+
+
+def _store(key, pdf):
+    with _reports_lock:
+        _reports[key] = pdf
+        _reports.move_to_end(key)
+        while len(_reports) > PDF_CACHE_SIZE:
+            _reports.popitem(last=False)
+    return pdf
+
+
+def _render(key, user_data, advice_content, lang):
+    try:
+        return _store(key, generate_insurance_pdf(user_data, advice_content, lang).getvalue())
+    finally:
+        with _reports_lock:
+            _pending.pop(key, None)
+
+
+def render_report(user_data, advice_content, lang='en'):
+    """PDF bytes of a report, from the cache, from a pre-render still running, or rendered now"""
+    key = report_key(user_data, advice_content, lang)
+    with _reports_lock:
+        pdf = _reports.get(key)
+        if pdf is not None:
+            _reports.move_to_end(key)
+            return pdf
+        future = _pending.get(key)
+    if future is not None:
+        return future.result()
+    return _store(key, generate_insurance_pdf(user_data, advice_content, lang).getvalue())
+
+
+def _background():
+    """The pre-render thread; call with _reports_lock held"""
+    global _executor
+    if _executor is None:
+        # One thread: reports render in order and never compete with each other for the GIL
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-prerender')
+    return _executor
+
+
+def warm_up():
+    """Load fonts and styles in the background, e.g. while the advice is still being generated"""
+    if _styles is None:
+        with _reports_lock:
+            _background().submit(report_styles)
+
+
+def prerender(user_data, advice_content, lang='en'):
+    """Start rendering a report in the background unless it is cached or already rendering"""
+    key = report_key(user_data, advice_content, lang)
+    with _reports_lock:
+        if key in _reports or key in _pending:
+            return
+        _pending[key] = _background().submit(_render, key, dict(user_data), advice_content, lang)
+
+
+if __name__ == "__main__":
+    styles = report_styles()
+    print(json.dumps({'font': styles['font'] or 'Helvetica', 'devanagari': styles['devanagari']}, indent=2))
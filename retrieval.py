@@ -0,0 +1,269 @@
+"""Offline BM25 retrieval over the scheme documents, so chat and claim prompts carry a few grounding snippets
+
+Sources are knowledge/*.md, the claim assistant's guides and the rule
+engine's scheme rules, cut into short snippets. The index is saved under
+.cache/retrieval in a directory named after a hash of the sources and is
+memory-mapped on load, so editing a document rebuilds it on next use.
+
+Examples:
+    python retrieval.py build
+    python retrieval.py search "hospital refused cashless treatment"
+"""
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from semantic_cache import normalize
+
+KNOWLEDGE_DIR = os.environ.get('ADVISOR_KNOWLEDGE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge'))
+INDEX_PATH = os.environ.get('RETRIEVAL_INDEX_PATH', os.path.join('.cache', 'retrieval'))
+RETRIEVAL_ENABLED = os.environ.get('RETRIEVAL', '1') != '0'
+TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', '3'))
+# Snippets scoring under this share of the best match are left out of the prompt
+MIN_RELATIVE_SCORE = 0.5
+
+# BM25 term-frequency saturation and document-length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Snippets are cut at about this many words, so a 512-token prompt fits two or three of them
+SNIPPET_WORDS = 60
+# Prompt tokens kept back for the template and question, and tokens per English word of snippet text
+PROMPT_RESERVE = 150
+TOKENS_PER_WORD = 1.5
+INDEX_VERSION = 1
+
+
+def clean_line(line):
+    """Markdown list line as plain text"""
+    line = re.sub(r'^(?:[-*]|\d+\.)\s+', '', line.strip()).replace('**', '').strip()
+    return line if not line or line[-1] in '.!?:' else line + '.'
+
+
+def chunk_markdown(title, text, max_words=SNIPPET_WORDS):
+    """Snippets of a markdown document, one or more per section, each prefixed with its title and section"""
+    sections = []
+    section, lines = '', []
+    for raw in text.splitlines():
+        stripped = raw.strip()
+        heading = stripped.lstrip('#').replace('**', '').strip()
+        if stripped.startswith('# '):
+            title = heading.split(' - ')[0]
+        elif stripped.startswith('#') or (stripped.startswith('**') and heading.endswith(':')):
+            sections.append((section, lines))
+            section, lines = heading.rstrip(':'), []
+        elif stripped:
+            lines.append(clean_line(stripped))
+    sections.append((section, lines))
+
+    snippets = []
+    for section, lines in sections:
+        prefix = f"{title}, {section}: " if section else f"{title}: "
+        chunk = []
+        for line in lines:
+            if chunk and len(' '.join(chunk + [line]).split()) > max_words:
+                snippets.append(prefix + ' '.join(chunk))
+                chunk = []
+            chunk.append(line)
+        if chunk:
+            snippets.append(prefix + ' '.join(chunk))
+    return snippets
+
+
+def rule_snippet(rule):
+    """One-line summary of an eligibility.SCHEME_RULES entry"""
+    parts = []
+    if 'min_age' in rule:
+        parts.append(f"ages {rule['min_age']}-{rule['max_age']}")
+    elif 'max_age' in rule:
+        parts.append(f"up to age {rule['max_age']}")
+    if 'max_income' in rule:
+        parts.append(f"for households earning up to ₹{rule['max_income']:,}/month")
+    if 'min_income' in rule:
+        parts.append(f"suggested from ₹{rule['min_income']:,}/month income")
+    parts.append(f"premium {rule['premium'] or 'depends on joining age'}")
+    parts.append(f"cover {rule['cover']}")
+    parts.append(f"apply at {rule['apply']}")
+    return f"{rule['name']}: {', '.join(parts)}."
+
+
+def source_snippets(knowledge_dir=KNOWLEDGE_DIR):
+    """Every snippet to index, in a stable order"""
+    from advisor import CLAIM_HELP
+    from eligibility import SCHEME_RULES
+
+    snippets = []
+    if os.path.isdir(knowledge_dir):
+        for name in sorted(os.listdir(knowledge_dir)):
+            if name.endswith('.md'):
+                with open(os.path.join(knowledge_dir, name), encoding='utf-8') as f:
+                    snippets.extend(chunk_markdown(name[:-3].upper(), f.read()))
+    for claim_type, guide in CLAIM_HELP.items():
+        snippets.extend(chunk_markdown(claim_type, guide))
+    snippets.extend(rule_snippet(rule) for rule in SCHEME_RULES)
+    return snippets
+
+
+def sources_hash(snippets):
+    digest = hashlib.sha256(f"{INDEX_VERSION}:{BM25_K1}:{BM25_B}".encode())
+    for snippet in snippets:
+        digest.update(snippet.encode('utf-8') + b'\0')
+    return digest.hexdigest()[:16]
+
+
+def build_arrays(snippets):
+    """BM25 postings with each (term, snippet) weight precomputed, so a query only sums slices"""
+    tokenized = [normalize(snippet) for snippet in snippets]
+    lengths = np.array([len(tokens) for tokens in tokenized], dtype=float)
+    average = lengths.mean() if len(lengths) else 1.0
+    postings = defaultdict(list)
+    for doc, tokens in enumerate(tokenized):
+        for term, tf in Counter(tokens).items():
+            postings[term].append((doc, tf))
+
+    terms, docs, weights = {}, [], []
+    for term in sorted(postings):
+        entries = postings[term]
+        idf = math.log(1 + (len(snippets) - len(entries) + 0.5) / (len(entries) + 0.5))
+        terms[term] = [len(docs), len(docs) + len(entries)]
+        for doc, tf in entries:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / average)
+            docs.append(doc)
+            weights.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+    encoded = [snippet.encode('utf-8') for snippet in snippets]
+    return {
+        'terms': terms,
+        'docs': np.array(docs, dtype=np.int32),
+        'weights': np.array(weights, dtype=np.float32),
+        'offsets': np.concatenate([[0], np.cumsum([len(text) for text in encoded])]).astype(np.int64),
+        'text': b''.join(encoded),
+    }
+
+
+class RetrievalIndex:
+    """BM25 search over postings arrays that may be memory-mapped files"""
+
+    def __init__(self, terms, docs, weights, offsets, text):
+        self.terms = terms
+        self.docs = docs
+        self.weights = weights
+        self.offsets = offsets
+        self.text = text
+        self.count = len(offsets) - 1
+
+    def snippet(self, doc):
+        return self.text[int(self.offsets[doc]):int(self.offsets[doc + 1])].decode('utf-8')
+
+    def search(self, query, k=TOP_K):
+        """(score, snippet) of the k best-matching snippets, best first"""
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(normalize(query)):
+            span = self.terms.get(term)
+            if span:
+                # A term lists each snippet once, so fancy-index addition is safe
+                scores[self.docs[span[0]:span[1]]] += self.weights[span[0]:span[1]]
+        hits = np.flatnonzero(scores)
+        top = hits[np.argsort(-scores[hits], kind='stable')[:k]]
+        return [(float(scores[doc]), self.snippet(doc)) for doc in top]
+
+
+def save_index(arrays, directory):
+    """Write the index into directory, via a temporary directory so readers never see half an index"""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    temporary = f"{directory}.tmp{os.getpid()}.{threading.get_ident()}"
+    os.makedirs(temporary, exist_ok=True)
+    for name in ('docs', 'weights', 'offsets'):
+        np.save(os.path.join(temporary, f'{name}.npy'), arrays[name])
+    with open(os.path.join(temporary, 'snippets.bin'), 'wb') as f:
+        f.write(arrays['text'])
+    with open(os.path.join(temporary, 'terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(arrays['terms'], f, ensure_ascii=False)
+    try:
+        os.rename(temporary, directory)
+    except OSError:
+        # Another process built the same sources first
+        shutil.rmtree(temporary, ignore_errors=True)
+
+
+def load_index(directory):
+    """Index with its arrays and snippet text memory-mapped from directory"""
+    with open(os.path.join(directory, 'terms.json'), encoding='utf-8') as f:
+        terms = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+              for name in ('docs', 'weights', 'offsets')}
+    with open(os.path.join(directory, 'snippets.bin'), 'rb') as f:
+        text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return RetrievalIndex(terms, text=text, **arrays)
+
+
+def open_index(path=INDEX_PATH, knowledge_dir=KNOWLEDGE_DIR):
+    """Memory-mapped index of the current sources, building it first when they changed"""
+    snippets = source_snippets(knowledge_dir)
+    directory = os.path.join(path, sources_hash(snippets))
+    try:
+        if not os.path.isdir(directory):
+            save_index(build_arrays(snippets), directory)
+            for name in os.listdir(path):
+                if name != os.path.basename(directory) and '.tmp' not in name:
+                    shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        return load_index(directory)
+    except OSError:
+        # Read-only or full disk: the index is small enough to keep in memory
+        arrays = build_arrays(snippets)
+        return RetrievalIndex(arrays['terms'], arrays['docs'], arrays['weights'], arrays['offsets'], arrays['text'])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index, opened on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = open_index()
+    return _index
+
+
+def prompt_context(query, options, k=TOP_K):
+    """Best snippets for the query as prompt lines, as many as fit the context the model options leave"""
+    if not RETRIEVAL_ENABLED:
+        return ''
+    budget = (options['num_ctx'] - options['num_predict'] - PROMPT_RESERVE) / TOKENS_PER_WORD - len(query.split())
+    lines = []
+    hits = get_index().search(query, k)
+    for score, snippet in hits:
+        size = len(snippet.split())
+        if score >= MIN_RELATIVE_SCORE * hits[0][0] and size <= budget:
+            lines.append(f"- {snippet}")
+            budget -= size
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ('build', 'search'):
+        print(__doc__, file=sys.stderr)
+        return 2
+    index = get_index()
+    if argv[0] == 'build':
+        print(f"{index.count} snippets, {len(index.terms)} terms in {INDEX_PATH}")
+    for score, snippet in index.search(' '.join(argv[1:])) if argv[0] == 'search' else ():
+        print(f"{score:6.2f}  {snippet}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Near-duplicate answer cache for chatbot questions"""
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+
+SIMILARITY_THRESHOLD = float(os.environ.get('CHAT_CACHE_THRESHOLD', '0.82'))
+CACHE_TTL = float(os.environ.get('CHAT_CACHE_TTL', '3600'))
+MAX_ENTRIES = int(os.environ.get('CHAT_CACHE_MAX_ENTRIES', '2000'))
+
+# Hindi words, spellings and inflections folded onto one English token
+SYNONYMS = {
+    'pm-jay': 'pmjay', 'ayushman': 'pmjay', 'ayushmaan': 'pmjay', 'आयुष्मान': 'pmjay',
+    'पीएमजेएवाई': 'pmjay', 'abpmjay': 'pmjay',
+    'पीएमएसबीवाई': 'pmsby', 'suraksha': 'pmsby', 'सुरक्षा': 'pmsby',
+    'पीएमजेजेबीवाई': 'pmjjby', 'jeevan': 'pmjjby', 'jyoti': 'pmjjby', 'जीवन': 'pmjjby', 'ज्योति': 'pmjjby',
+    'atal': 'apy', 'pension': 'apy', 'अटल': 'apy', 'पेंशन': 'apy',
+    'document': 'documents', 'docs': 'documents', 'papers': 'documents',
+    'दस्तावेज': 'documents', 'दस्तावेज़': 'documents', 'कागजात': 'documents', 'कागज': 'documents',
+    'application': 'apply', 'applying': 'apply', 'enroll': 'apply', 'enrol': 'apply',
+    'register': 'apply', 'registration': 'apply', 'join': 'apply', 'आवेदन': 'apply', 'अप्लाई': 'apply',
+    'claims': 'claim', 'क्लेम': 'claim', 'दावा': 'claim',
+    'cost': 'premium', 'price': 'premium', 'fee': 'premium', 'प्रीमियम': 'premium', 'कीमत': 'premium',
+    'eligible': 'eligibility', 'qualify': 'eligibility', 'पात्रता': 'eligibility', 'पात्र': 'eligibility',
+    'बीमा': 'insurance', 'इंश्योरेंस': 'insurance',
+    'अस्पताल': 'hospital', 'बैंक': 'bank',
+}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'for', 'to', 'of', 'in', 'on', 'is', 'are', 'do', 'does', 'i', 'me', 'my',
+    'what', 'which', 'how', 'can', 'please', 'tell', 'about', 'and', 'or', 'with', 'it', 'get',
+    'need', 'needed', 'required', 'scheme', 'yojana', 'process', 'bharat', 'pradhan', 'mantri',
+    'के', 'की', 'का', 'को', 'में', 'से', 'है', 'हैं', 'क्या', 'कैसे', 'लिए', 'और', 'मैं', 'मुझे',
+    'करें', 'करे', 'कर', 'बताएं', 'बताइए', 'योजना', 'चाहिए', 'भारत', 'प्रधानमंत्री',
+}
+
+# Questions about different schemes must never share an answer
+SCHEMES = {'pmjay', 'pmsby', 'pmjjby', 'apy'}
+
+
+def words(text, keep='-'):
+    """Lower-cased words of the text with punctuation removed; Devanagari vowel signs stay attached"""
+    chars = []
+    for ch in unicodedata.normalize('NFC', text.lower()):
+        category = unicodedata.category(ch)
+        chars.append(ch if category[0] in 'LMN' or ch in keep else ' ')
+    return ''.join(chars).split()
+
+
+def normalize(question):
+    """Fold case, punctuation and Hindi/English variants into canonical tokens"""
+    tokens = []
+    for word in words(question):
+        word = SYNONYMS.get(word, SYNONYMS.get(word.strip('-'), word.strip('-')))
+        if word and word not in STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def featurize(tokens):
+    """Token plus character-trigram bag, so misspellings still overlap"""
+    features = Counter()
+    for token in tokens:
+        features['w:' + token] += 2
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            features[padded[i:i + 3]] += 1
+    return features
+
+
+def cosine(a, b):
+    dot = sum(weight * b.get(key, 0) for key, weight in a.items())
+    if not dot:
+        return 0.0
+    norm_a = math.sqrt(sum(w * w for w in a.values()))
+    norm_b = math.sqrt(sum(w * w for w in b.values()))
+    return dot / (norm_a * norm_b)
+
+
+def cache_key(tokens, lang):
+    return f"{lang}:{' '.join(sorted(set(tokens)))}"
+
+
+def numbers(tokens):
+    """Numeric tokens as ASCII digits, so an age or amount written in Devanagari digits still matches"""
+    return frozenset(str(int(token)) for token in tokens if token.isdecimal())
+
+
+def answer_scope(tokens, lang):
+    """Questions share an answer only when asked in the same language about the same schemes and numbers"""
+    return lang, frozenset(SCHEMES.intersection(tokens)), numbers(tokens)
+
+
+class SemanticCache:
+    """Thread-safe LRU cache that also answers paraphrases above a similarity threshold"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, ttl=CACHE_TTL, max_entries=MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # language and canonical key -> (features, scope, answer, stored_at)
+        self._index = defaultdict(set)  # word feature -> canonical keys
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        features = self._entries.pop(key)[0]
+        for feature in features:
+            if feature.startswith('w:'):
+                self._index[feature].discard(key)
+                if not self._index[feature]:
+                    del self._index[feature]
+
+    def get(self, question, lang='en'):
+        """Cached answer for the question or a close paraphrase of it asked in the same language, else None"""
+        tokens = normalize(question)
+        key = cache_key(tokens, lang)
+        features = featurize(tokens)
+        scope = answer_scope(tokens, lang)
+        now = time.time()
+
+        with self._lock:
+            best_key, best_score = None, 0.0
+            if key in self._entries:
+                best_key, best_score = key, 1.0
+            else:
+                candidates = set()
+                for feature in features:
+                    if feature.startswith('w:'):
+                        candidates |= self._index.get(feature, set())
+                for candidate in candidates:
+                    entry = self._entries[candidate]
+                    if entry[1] != scope:
+                        continue
+                    score = cosine(features, entry[0])
+                    if score > best_score:
+                        best_key, best_score = candidate, score
+
+            if best_key is not None and best_score >= self.threshold:
+                entry = self._entries[best_key]
+                if now - entry[3] <= self.ttl:
+                    self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    return entry[2]
+                self._drop(best_key)
+
+            self.misses += 1
+            return None
+
+    def put(self, question, answer, lang='en'):
+        """Remember the answer under the question's canonical form and language"""
+        tokens = normalize(question)
+        if not tokens:
+            return
+        key = cache_key(tokens, lang)
+        features = featurize(tokens)
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (features, answer_scope(tokens, lang), answer, time.time())
+            for feature in features:
+                if feature.startswith('w:'):
+                    self._index[feature].add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries)
+            }
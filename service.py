@@ -0,0 +1,432 @@
+"""Headless HTTP API for the advisor, for kiosks and other clients that do not need Streamlit
+
+Run with `python service.py` (or `uvicorn service:app`). POST endpoints take
+JSON; /advice, /chat and /claim answer with one JSON object, or with
+newline-delimited JSON token events when the body has "stream": true.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import zipfile
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from advice_cache import AdviceCache
+from advisor import (
+    PROFILE_FIELDS, INCOME_MAP, CLAIM_HELP, ADVICE_OPTIONS, CLAIM_OPTIONS, CHAT_OPTIONS, CHAT_SYSTEM,
+    profile_advice_prompt, build_chat_prompt, build_claim_prompt,
+    format_advice, fallback_advice, simple_answer, knowledge_based_response, parse_profile
+)
+from batch_advice import (
+    BATCH_LIMIT, read_applicants, applicant_profile, plan_batch, applicant_result, applicant_pdf, pdf_name
+)
+from chat_context import is_follow_up
+from hf_fallback import query_models_hedged_async
+from intents import INTENT_ROUTING, get_classifier
+from metrics import get_registry
+from model_lifecycle import ModelMonitor
+from premium_engine import quote, optimize_plan
+from report_pdf import MissingFontError, render_report
+from semantic_cache import SemanticCache
+
+try:
+    from llm_gateway import AsyncLLMGateway, GenerationCancelled
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+
+    class GenerationCancelled(Exception):
+        """Never raised without the gateway; keeps the except clauses valid"""
+
+API_HOST = os.environ.get('ADVISOR_API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('ADVISOR_API_PORT', '8502'))
+
+
+def done(text, tier, **extra):
+    get_registry().record_response(extra.pop('channel'), tier)
+    return dict(extra, done=True, text=text, tier=tier)
+
+
+class AdvisorService:
+    """Advice, chat, claim, premium and report logic behind the HTTP API.
+
+    The answer methods are async generators of events: {"token": ...} while
+    phi3:mini writes, then one {"done": true, "text": ..., "tier": ...}.
+    """
+
+    def __init__(self, gateway=None, advice_cache=None, chat_cache=None, hf_api_key=None, monitor=None):
+        if gateway is None and OLLAMA_AVAILABLE:
+            gateway = AsyncLLMGateway()
+            monitor = monitor or ModelMonitor(options=CHAT_OPTIONS, prime=CHAT_SYSTEM)
+        self.gateway = gateway
+        self.monitor = monitor
+        self.advice_cache = advice_cache or AdviceCache()
+        self.chat_cache = chat_cache or SemanticCache()
+        self.hf_api_key = os.environ.get('HUGGINGFACE_API_KEY', '') if hf_api_key is None else hf_api_key
+
+    def owner(self, session_id, channel):
+        return (session_id, channel) if session_id else None
+
+    def use_model(self):
+        """Whether to ask phi3:mini: there is a gateway and its monitor has not found Ollama down"""
+        return self.gateway is not None and (self.monitor is None or self.monitor.usable())
+
+    def model_failed(self):
+        if self.monitor is not None:
+            self.monitor.check_soon()
+
+    async def advice(self, body):
+        fields = parse_profile(body)
+        profile = applicant_profile(fields, body.get('lang', 'en'))
+
+        # The advice cache is a SQLite file; its calls run off the event loop
+        cached = await run_in_threadpool(self.advice_cache.get, profile)
+        get_registry().record_cache('advice', cached is not None)
+        if cached is not None:
+            yield done(cached, 'cache', channel='advice', cached=True)
+            return
+
+        fallback = fallback_advice(fields['age'], fields['job'], fields['income'], fields['location'])
+        if not self.use_model():
+            yield done(fallback, 'knowledge_base', channel='advice')
+            return
+
+        tokens = self.gateway.stream(profile_advice_prompt(profile), ADVICE_OPTIONS,
+                                     owner=self.owner(body.get('session_id'), 'advice'))
+        parts = []
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield {'token': token}
+        except GenerationCancelled:
+            raise
+        except Exception:
+            self.model_failed()
+            yield done(fallback, 'knowledge_base', channel='advice')
+            return
+        finally:
+            await tokens.aclose()
+
+        advice = format_advice(''.join(parts), profile)
+        await run_in_threadpool(self.advice_cache.put, profile, advice)
+        yield done(advice, 'phi3', channel='advice')
+
+    async def chat(self, body):
+        question = (body.get('question') or '').strip()
+        if not question:
+            raise ValueError("Missing fields: question")
+        history = body.get('history') or []
+        if not all(isinstance(turn, dict) and 'question' in turn and 'answer' in turn for turn in history):
+            raise ValueError("history must be a list of {question, answer} turns")
+        history = [{'question': str(turn['question']), 'answer': str(turn['answer'])} for turn in history]
+        summary = str(body.get('summary') or '')
+        follow_up = is_follow_up(question, history or summary)
+
+        lang = body.get('lang', 'en')
+        routed = get_classifier().route(question, lang) if INTENT_ROUTING and not follow_up else None
+        if routed is not None:
+            yield done(routed, 'intent', channel='chat')
+            return
+
+        cached = None
+        if not follow_up:
+            cached = self.chat_cache.get(question, lang)
+            get_registry().record_cache('chat', cached is not None)
+        if cached is not None:
+            yield done(cached, 'cache', channel='chat', cached=True)
+            return
+        if not self.use_model():
+            yield done(simple_answer(question, lang), 'knowledge_base', channel='chat')
+            return
+
+        # Grounding reads the retrieval index, which is built from disk on first use
+        prompt = await run_in_threadpool(build_chat_prompt, question, history, summary)
+        tokens = self.gateway.stream(prompt, CHAT_OPTIONS,
+                                     owner=self.owner(body.get('session_id'), 'chat'))
+        parts = []
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield {'token': token}
+        except GenerationCancelled:
+            raise
+        except Exception:
+            self.model_failed()
+            yield done(simple_answer(question, lang), 'knowledge_base', channel='chat')
+            return
+        finally:
+            await tokens.aclose()
+
+        answer = ''.join(parts)
+        if not follow_up:
+            self.chat_cache.put(question, answer, lang)
+        yield done(answer, 'phi3', channel='chat')
+
+    async def claim(self, body):
+        claim_type = body.get('claim_type') or ''
+        issue = (body.get('issue') or '').strip()
+        if not issue:
+            raise ValueError("Missing fields: issue")
+        guide = CLAIM_HELP.get(claim_type)
+
+        if self.use_model():
+            prompt = await run_in_threadpool(build_claim_prompt, claim_type, issue)
+            tokens = self.gateway.stream(prompt, CLAIM_OPTIONS,
+                                         owner=self.owner(body.get('session_id'), 'claim'))
+            parts = []
+            try:
+                async for token in tokens:
+                    parts.append(token)
+                    yield {'token': token}
+                yield done(''.join(parts), 'phi3', channel='claim', guide=guide)
+                return
+            except GenerationCancelled:
+                raise
+            except Exception:
+                self.model_failed()
+            finally:
+                await tokens.aclose()
+
+        prompt = f"Claim help for {claim_type}: {issue}"
+        text = await query_models_hedged_async(prompt, self.hf_api_key)
+        if text:
+            yield done(text, 'huggingface', channel='claim', guide=guide)
+        else:
+            yield done(knowledge_based_response(prompt), 'knowledge_base', channel='claim', guide=guide)
+
+    def premium(self, body):
+        family_size = body.get('family_size') or '1'
+        try:
+            age = int(body.get('age') or 30)
+            plan = quote(
+                age=age,
+                family_size=family_size,
+                pmsby=bool(body.get('pmsby')),
+                pmjjby=bool(body.get('pmjjby')),
+                apy_pension=int(body.get('apy_pension') or 0),
+                health_monthly=int(body.get('health_monthly') or 0),
+                term_monthly=int(body.get('term_monthly') or 0)
+            )
+            if body.get('budget') is not None or body.get('income') is not None:
+                income = body.get('income') or 10000
+                plan['best_plan'] = optimize_plan(
+                    age, family_size,
+                    monthly_income=INCOME_MAP[income] if income in INCOME_MAP else int(income),
+                    budget=int(body['budget']) if body.get('budget') is not None else None,
+                    apy_pension=int(body.get('apy_pension') or 0)
+                )
+        except (TypeError, ValueError):
+            raise ValueError("age, income, budget and amounts must be whole numbers")
+        return plan
+
+    async def report(self, body):
+        """PDF bytes for a profile, generating the advice first when none is given"""
+        advice = body.get('advice')
+        if not advice:
+            async for event in self.advice(body):
+                if event.get('done'):
+                    advice = event['text']
+        user_data = {field: body.get(field) for field in PROFILE_FIELDS}
+        return await run_in_threadpool(render_report, user_data, advice, body.get('lang', 'en'))
+
+    async def batch(self, rows, workers=None):
+        """Yield one result per applicant as its profile's advice becomes ready"""
+        groups, errors = plan_batch(rows)
+        for index, error in errors.items():
+            yield applicant_result(rows, index, None, 'invalid', error=error)
+
+        # One generation per profile at a time keeps the gateway saturated without overflowing its wait queue
+        if workers is None:
+            workers = self.gateway.max_in_flight if self.gateway is not None else 4
+        slots = asyncio.Semaphore(workers)
+
+        async def answer(group):
+            row = rows[group['rows'][0]]
+            body = {field: row[field] for field in PROFILE_FIELDS}
+            body['lang'] = row.get('lang') or 'en'
+            async with slots:
+                async for event in self.advice(body):
+                    if event.get('done'):
+                        return group, event
+
+        tasks = [asyncio.ensure_future(answer(group)) for group in groups.values()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                group, event = await finished
+                for index in group['rows']:
+                    yield applicant_result(rows, index, event['text'], event['tier'])
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def health(self):
+        stats = {'status': 'ok', 'ollama': self.use_model()}
+        if self.monitor is not None:
+            stats['model'] = self.monitor.stats()
+        if self.gateway is not None:
+            stats['shared_generations'] = self.gateway.coalesced
+        return stats
+
+
+async def read_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Request body must be a JSON object")
+    return body
+
+
+SUPERSEDED = "Superseded by a newer request from the same session"
+
+
+async def respond(events, stream):
+    """Stream events as NDJSON, or wait for the final one and return it as JSON"""
+    if stream:
+        async def ndjson():
+            try:
+                async for event in events:
+                    yield json.dumps(event, ensure_ascii=False) + '\n'
+            except GenerationCancelled:
+                yield json.dumps({'error': SUPERSEDED}) + '\n'
+            finally:
+                await events.aclose()
+        return StreamingResponse(ndjson(), media_type='application/x-ndjson')
+
+    result = None
+    try:
+        async for event in events:
+            if event.get('done'):
+                result = event
+    except GenerationCancelled:
+        return JSONResponse({'error': SUPERSEDED}, status_code=409)
+    finally:
+        await events.aclose()
+    return JSONResponse(result)
+
+
+def create_app(service=None):
+    """Starlette app exposing an AdvisorService"""
+    service = service or AdvisorService()
+
+    def answer_endpoint(method):
+        async def endpoint(request):
+            body = await read_body(request)
+            events = method(body)
+            try:
+                # Run up to the first event so bad input fails before any response starts
+                first = await events.__anext__()
+            except ValueError as e:
+                raise HTTPException(400, str(e))
+            except GenerationCancelled:
+                raise HTTPException(409, SUPERSEDED)
+            except StopAsyncIteration:
+                raise HTTPException(500, "No answer was produced")
+
+            async def replay():
+                yield first
+                async for event in events:
+                    yield event
+            return await respond(replay(), bool(body.get('stream')))
+        return endpoint
+
+    async def premium(request):
+        try:
+            return JSONResponse(service.premium(await read_body(request)))
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+    async def report(request):
+        body = await read_body(request)
+        try:
+            pdf = await service.report(body)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        except MissingFontError as e:
+            raise HTTPException(503, str(e))
+        return Response(pdf, media_type='application/pdf',
+                        headers={'Content-Disposition': 'attachment; filename="Insurance_Plan.pdf"'})
+
+    async def batch(request):
+        try:
+            rows = read_applicants((await request.body()).decode('utf-8'))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise HTTPException(400, f"Could not read applicants: {e}")
+        if not rows:
+            raise HTTPException(400, "No applicants given")
+        if len(rows) > BATCH_LIMIT:
+            raise HTTPException(413, f"At most {BATCH_LIMIT} applicants per batch")
+
+        results = service.batch(rows)
+        if request.query_params.get('format') == 'zip':
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+                summary = []
+                async for result in results:
+                    summary.append(result)
+                    if result['advice']:
+                        try:
+                            pdf = await run_in_threadpool(applicant_pdf, rows, result)
+                        except MissingFontError as e:
+                            raise HTTPException(503, str(e))
+                        zf.writestr(pdf_name(result), pdf)
+                zf.writestr('results.jsonl', ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in summary))
+            return Response(archive.getvalue(), media_type='application/zip',
+                            headers={'Content-Disposition': 'attachment; filename="Insurance_Plans.zip"'})
+
+        async def ndjson():
+            async for result in results:
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        return StreamingResponse(ndjson(), media_type='application/x-ndjson')
+
+    async def health(request):
+        return JSONResponse(service.health())
+
+    async def http_error(request, exc):
+        return JSONResponse({'error': exc.detail}, status_code=exc.status_code)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Preload phi3:mini and start probing it before the first request arrives
+        if service.monitor is not None:
+            service.monitor.start()
+        yield
+
+    return Starlette(
+        routes=[
+            Route('/advice', answer_endpoint(service.advice), methods=['POST']),
+            Route('/chat', answer_endpoint(service.chat), methods=['POST']),
+            Route('/claim', answer_endpoint(service.claim), methods=['POST']),
+            Route('/premium', premium, methods=['POST']),
+            Route('/report.pdf', report, methods=['POST']),
+            Route('/batch', batch, methods=['POST']),
+            Route('/health', health, methods=['GET']),
+        ],
+        exception_handlers={HTTPException: http_error},
+        lifespan=lifespan
+    )
+
+
+app = create_app()
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the advisor over HTTP")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args(argv)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Per-session app state kept outside Streamlit's memory, so app replicas can stay stateless
+
+Sessions are keyed by a random id that never leaves the server. The page
+URL carries a short-lived, single-use token for the session instead, so a
+reload, a restarted worker or another replica behind the load balancer
+finds the same plan and chat, while an old, shared or bookmarked URL does
+not. Records are stored as compressed JSON; both backends count their
+bytes and drop sessions left idle for longer than SESSION_IDLE_TTL.
+"""
+import json
+import os
+import hashlib
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+SESSION_STORE = os.environ.get('SESSION_STORE', 'sqlite')
+SESSION_STORE_PATH = os.environ.get('SESSION_STORE_PATH', os.path.join('.cache', 'sessions.sqlite3'))
+SESSION_IDLE_TTL = float(os.environ.get('SESSION_IDLE_TTL', str(7 * 24 * 3600)))
+SESSION_STORE_MAX_BYTES = int(float(os.environ.get('SESSION_STORE_MAX_MB', '64')) * 1024 * 1024)
+# Seconds a URL token can resume its session, and after which a session in use gets a new one
+SESSION_TOKEN_TTL = float(os.environ.get('SESSION_TOKEN_TTL', '3600'))
+SESSION_TOKEN_ROTATE = float(os.environ.get('SESSION_TOKEN_ROTATE', '300'))
+# Idle sessions are swept, and a read session's last-use time refreshed, at most this often (seconds)
+SWEEP_INTERVAL = 60
+
+# Everything a session keeps between runs, with the value a new session starts from
+SESSION_DEFAULTS = {
+    'user_data': {},
+    'advice_content': "",
+    'advice_generated': False,
+    'chat_history': [],
+    # Older turns folded into a short summary, and how many of chat_history it covers
+    'chat_summary': "",
+    'chat_folded': 0,
+    'selected_language': 'en',
+}
+
+
+def new_state():
+    return json.loads(json.dumps(SESSION_DEFAULTS))
+
+
+def encode_state(state):
+    return zlib.compress(json.dumps(state, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def decode_state(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def new_session_id():
+    return secrets.token_hex(16)
+
+
+def token_key(token):
+    """Store key of a URL token's record; only a hash of the token is kept"""
+    return 'token:' + hashlib.sha256(token.encode('ascii')).hexdigest()
+
+
+def issue_token(store, session_id):
+    """New URL token that resumes the session once, within SESSION_TOKEN_TTL"""
+    token = secrets.token_urlsafe(24)
+    store.put(token_key(token), {'session_id': session_id, 'issued': time.time()})
+    return token
+
+
+def revoke_token(store, token):
+    store.delete(token_key(token))
+
+
+def redeem_token(store, token, ttl=SESSION_TOKEN_TTL):
+    """Session id the token was issued for, or None when it is malformed, used, revoked or expired.
+
+    Redeeming retires the token, so the same URL cannot open the session again.
+    """
+    if not re.fullmatch(r'[A-Za-z0-9_-]{32}', token or ''):
+        return None
+    key = token_key(token)
+    record = store.get(key)
+    if record is None:
+        return None
+    store.delete(key)
+    if time.time() - record.get('issued', 0) > ttl:
+        return None
+    session_id = record.get('session_id', '')
+    return session_id if re.fullmatch(r'[0-9a-f]{32}', session_id) else None
+
+
+class SessionRecord:
+    __slots__ = ('data', 'touched')
+
+    def __init__(self, data, touched):
+        self.data = data
+        self.touched = touched
+
+
+class MemorySessionStore:
+    """Sessions of this process only, bounded in bytes; least recently used sessions go first"""
+
+    def __init__(self, max_bytes=SESSION_STORE_MAX_BYTES, idle_ttl=SESSION_IDLE_TTL):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.bytes = 0
+        self.evictions = 0
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id):
+        record = self._records.pop(session_id, None)
+        if record is not None:
+            self.bytes -= len(record.data)
+
+    def _evict(self, now):
+        # Least recently used first, so idle sessions are always at the front
+        while self._records:
+            session_id, record = next(iter(self._records.items()))
+            if now - record.touched <= self.idle_ttl and self.bytes <= self.max_bytes:
+                break
+            self._drop(session_id)
+            self.evictions += 1
+
+    def get(self, session_id):
+        """Stored state of the session, or None for an unknown or expired session"""
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            record = self._records.get(session_id)
+            if record is None:
+                return None
+            record.touched = now
+            self._records.move_to_end(session_id)
+            data = record.data
+        return decode_state(data)
+
+    def put(self, session_id, state):
+        data = encode_state(state)
+        now = time.time()
+        with self._lock:
+            self._drop(session_id)
+            self._records[session_id] = SessionRecord(data, now)
+            self.bytes += len(data)
+            self._evict(now)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._drop(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._records), 'bytes': self.bytes,
+                    'evictions': self.evictions}
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file shared by every app process and replica that mounts it"""
+
+    def __init__(self, path=SESSION_STORE_PATH, max_bytes=SESSION_STORE_MAX_BYTES, idle_ttl=SESSION_IDLE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.evictions = 0
+        self._last_sweep = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data BLOB NOT NULL, touched REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched)")
+
+    def _sweep(self, now):
+        """Drop idle sessions, then the least recently used ones while the file holds too much"""
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        self.evictions += self._conn.execute(
+            "DELETE FROM sessions WHERE touched < ?", (now - self.idle_ttl,)
+        ).rowcount
+        excess = self._conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM sessions").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        doomed = []
+        for session_id, size in self._conn.execute("SELECT id, LENGTH(data) FROM sessions ORDER BY touched"):
+            if excess <= 0:
+                break
+            doomed.append((session_id,))
+            excess -= size
+        self._conn.executemany("DELETE FROM sessions WHERE id = ?", doomed)
+        self.evictions += len(doomed)
+
+    def get(self, session_id):
+        """Stored state of the session, or None for an unknown or expired session"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data, touched FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None or now - row[1] > self.idle_ttl:
+                return None
+            if now - row[1] > SWEEP_INTERVAL:
+                self._conn.execute("UPDATE sessions SET touched = ? WHERE id = ?", (now, session_id))
+        return decode_state(row[0])
+
+    def put(self, session_id, state):
+        data = encode_state(state)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, touched) VALUES (?, ?, ?)", (session_id, data, now)
+            )
+            self._sweep(now)
+
+    def delete(self, session_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def stats(self):
+        with self._lock:
+            sessions, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+            ).fetchone()
+        return {'backend': 'sqlite', 'sessions': sessions, 'bytes': size, 'evictions': self.evictions}
+
+
+SESSION_BACKENDS = {'memory': MemorySessionStore, 'sqlite': SQLiteSessionStore}
+
+
+def open_session_store(backend=SESSION_STORE):
+    """Store for the configured backend, 'memory' or 'sqlite'"""
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown SESSION_STORE {backend!r}; use one of {', '.join(SESSION_BACKENDS)}")
+    return SESSION_BACKENDS[backend]()
+
+
+if __name__ == "__main__":
+    print(json.dumps(open_session_store().stats(), indent=2))
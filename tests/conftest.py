@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Module constants read these at import, so keep caches, indexes, metrics and traces away from the working tree
+WORKDIR = tempfile.mkdtemp(prefix='advisor-tests-')
+os.environ.setdefault('ADVICE_CACHE_PATH', os.path.join(WORKDIR, 'advice_cache.sqlite3'))
+os.environ.setdefault('SESSION_STORE_PATH', os.path.join(WORKDIR, 'sessions.sqlite3'))
+os.environ.setdefault('RETRIEVAL_INDEX_PATH', os.path.join(WORKDIR, 'retrieval'))
+os.environ.setdefault('ADVISOR_METRICS_PORT', '0')
+os.environ.setdefault('ADVISOR_TRACE_PATH', '')
+os.environ.setdefault('OLLAMA_PRELOAD', '0')
+
+import pytest  # noqa: E402
+
+
+class FakeGateway:
+    """Stands in for AsyncLLMGateway: streams a fixed answer and records every prompt"""
+
+    max_in_flight = 4
+    coalesced = 0
+
+    def __init__(self, answer="phi3 answer"):
+        self.answer = answer
+        self.prompts = []
+
+    async def stream(self, prompt, options, timeout=None, owner=None, request_id=None):
+        self.prompts.append(prompt)
+        for word in self.answer.split(' '):
+            yield word + ' '
+
+
+class BlockingFakeGateway:
+    """Stands in for LLMGateway in the batch and warm-up jobs: answers every prompt, or raises error"""
+
+    def __init__(self, answer="phi3 explains the plan", error=None):
+        self.answer = answer
+        self.error = error
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def chat(self, prompt, options, timeout=None, owner=None, request_id=None):
+        with self._lock:
+            self.prompts.append(prompt)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+
+def final_event(events):
+    """The done event of an AdvisorService answer generator"""
+    async def collect():
+        result = None
+        async for event in events:
+            if event.get('done'):
+                result = event
+        return result
+    return asyncio.run(collect())
+
+
+@pytest.fixture
+def gateway():
+    return FakeGateway()
+
+
+@pytest.fixture
+def service(gateway, tmp_path):
+    from advice_cache import AdviceCache
+    from service import AdvisorService
+
+    return AdvisorService(gateway=gateway, advice_cache=AdviceCache(str(tmp_path / 'advice.sqlite3')),
+                          hf_api_key='')
@@ -0,0 +1,38 @@
+import advice_cache
+from advice_cache import AdviceCache, canonical_profile
+
+PROFILE = canonical_profile(32, 'Farmer', 7500, 'Pune', '4', 'Good', 'Health Security', 'en')
+
+
+def test_advice_survives_reopening(tmp_path):
+    path = str(tmp_path / 'advice.sqlite3')
+    AdviceCache(path).put(PROFILE, "advice")
+    cache = AdviceCache(path)
+    assert cache.get(PROFILE) == "advice"
+    assert cache.top_profiles(1) == [PROFILE]
+
+
+def test_advice_of_an_older_version_is_never_served(tmp_path, monkeypatch):
+    path = str(tmp_path / 'advice.sqlite3')
+    AdviceCache(path).put(PROFILE, "old prompt's advice")
+
+    monkeypatch.setattr(advice_cache, 'ADVICE_VERSION', advice_cache.ADVICE_VERSION + 1)
+    cache = AdviceCache(path)
+    assert cache.get(PROFILE) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_incomes_in_one_bracket_share_a_key():
+    def profile(income):
+        return advice_cache.profile_key(canonical_profile(32, 'Farmer', income, 'pune ', '4', 'Good', 'Health Security', 'en'))
+
+    assert profile(11000) == profile(14999) == profile(12500)
+    assert profile(15000) != profile(15001)
+
+
+def test_bucketed_profile_keeps_pmjay_eligibility():
+    from eligibility import assess
+
+    profile = canonical_profile(32, 'Farmer', 15000, 'Pune', '4', 'Good', 'Health Security', 'en')
+    pmjay = next(scheme for scheme in assess(profile)['schemes'] if scheme['key'] == 'pmjay')
+    assert pmjay['status'] == 'likely'
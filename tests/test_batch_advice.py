@@ -0,0 +1,78 @@
+import json
+import zipfile
+
+import pytest
+
+import batch_advice
+import llm_gateway
+from advice_cache import AdviceCache
+from conftest import BlockingFakeGateway
+
+HEADER = "id,name,age,job,income,location,family_size,health_condition,financial_goal\n"
+APPLICANTS = HEADER + (
+    "A1,Asha,32,Farmer,8000,Pune,2-3,Good,Family Security\n"
+    "A2,Ravi,34,Farmer,9000,Pune,2-3,Good,Family Security\n"
+    "A3,Meena,45,Driver,\"₹15,000-25,000\",Patna,4-5,Fair,Health Coverage\n"
+    "A4,Kiran,29,Astronaut,8000,Pune,1,Good,Family Security\n"
+)
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """batch(argv, **gateway_settings) runs the CLI on APPLICANTS; returns (exit code, results by id, gateway)"""
+    applicants = tmp_path / 'applicants.csv'
+    applicants.write_text(APPLICANTS, encoding='utf-8')
+    output = tmp_path / 'results.jsonl'
+    cache_path = str(tmp_path / 'advice.sqlite3')
+    monkeypatch.setattr(batch_advice, 'AdviceCache', lambda: AdviceCache(cache_path))
+
+    def run(argv=(), **gateway_settings):
+        gateway = BlockingFakeGateway(**gateway_settings)
+        monkeypatch.setattr(llm_gateway, 'LLMGateway', lambda **settings: gateway)
+        code = batch_advice.main([str(applicants), '--output', str(output), *argv])
+        results = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+        return code, {result['id']: result for result in results}, gateway
+    return run
+
+
+def test_csv_round_trip_writes_one_result_per_applicant(batch):
+    code, results, gateway = batch()
+    assert code == 1  # one invalid row
+    assert sorted(results) == ['A1', 'A2', 'A3', 'A4']
+    assert [results[key]['row'] for key in ('A1', 'A2', 'A3', 'A4')] == [1, 2, 3, 4]
+    assert results['A1']['name'] == 'Asha'
+
+    # Asha and Ravi share a bucketed profile, so two generations cover three applicants
+    assert len(gateway.prompts) == 2
+    assert {results[key]['tier'] for key in ('A1', 'A2', 'A3')} == {'phi3'}
+    assert results['A1']['advice'] == results['A2']['advice']
+    assert "phi3 explains the plan" in results['A3']['advice']
+    assert "PMJAY" in results['A1']['advice']
+
+    assert results['A4']['tier'] == 'invalid'
+    assert results['A4']['advice'] is None
+    assert results['A4']['error'].startswith("job must be one of")
+
+
+def test_second_run_is_served_from_the_cache(batch):
+    batch()
+    code, results, gateway = batch()
+    assert gateway.prompts == []
+    assert {results[key]['tier'] for key in ('A1', 'A2', 'A3')} == {'cache'}
+
+
+def test_failed_generations_fall_back_to_the_knowledge_base(batch):
+    code, results, gateway = batch(error=llm_gateway.GatewayBusy("phi3:mini queue full"))
+    assert len(gateway.prompts) == 2
+    assert results['A1']['tier'] == 'knowledge_base'
+    assert results['A1']['advice']
+    assert results['A1']['error'] == "phi3:mini queue full"
+
+
+def test_zip_holds_one_pdf_per_valid_applicant(batch, tmp_path):
+    archive = tmp_path / 'reports.zip'
+    batch(['--zip', str(archive)])
+    with zipfile.ZipFile(archive) as zf:
+        names = zf.namelist()
+        assert sorted(names) == ['0001_A1.pdf', '0002_A2.pdf', '0003_A3.pdf']
+        assert all(zf.read(name).startswith(b'%PDF') for name in names)
@@ -0,0 +1,59 @@
+import pytest
+
+from chat_context import compact_history, is_follow_up
+from conftest import final_event
+
+EARLIER = [{'question': "What is PMJAY?", 'answer': "PMJAY gives ₹5 lakh health cover per family."}]
+STANDALONE = "Is my mother covered if she lives with my brother?"
+
+
+@pytest.mark.parametrize('question', [
+    "And for my wife?",
+    "what about PMSBY?",
+    "What if I am above 50?",
+    "How long does it take?",
+    "Can I do it at the post office instead?",
+    "Documents needed?",
+    "और मेरी पत्नी के लिए?",
+])
+def test_follow_ups(question):
+    assert is_follow_up(question, EARLIER)
+
+
+@pytest.mark.parametrize('question', [
+    "What documents are needed for PMSBY?",
+    "How do I file a claim for a hospital stay?",
+    "What is PMJJBY?",
+    "Which scheme gives a pension after 60?",
+])
+def test_standalone_questions(question):
+    assert not is_follow_up(question, EARLIER)
+
+
+def test_first_question_is_never_a_follow_up():
+    assert not is_follow_up("And for my wife?", [])
+
+
+def test_standalone_second_question_reaches_the_intent_tier(service, gateway):
+    event = final_event(service.chat({'question': "How do I file a claim?", 'history': EARLIER}))
+    assert event['tier'] == 'intent'
+    assert gateway.prompts == []
+
+
+def test_standalone_second_question_reaches_the_cache(service, gateway):
+    question = "Can my brother add our parents under one card at the CSC office?"
+    assert final_event(service.chat({'question': question}))['tier'] == 'phi3'
+    event = final_event(service.chat({'question': question, 'history': EARLIER}))
+    assert event['tier'] == 'cache'
+    assert len(gateway.prompts) == 1
+
+
+def test_follow_up_skips_the_cache(service, gateway):
+    assert final_event(service.chat({'question': "And for my wife?"}))['tier'] == 'phi3'
+    event = final_event(service.chat({'question': "And for my wife?", 'history': EARLIER}))
+    assert event['tier'] == 'phi3'
+    assert len(gateway.prompts) == 2
+
+
+def test_history_within_budget_is_kept_verbatim():
+    assert compact_history(EARLIER, '', 0, budget=512) == ('', 0)
@@ -0,0 +1,99 @@
+import pytest
+
+from advice_cache import canonical_profile
+from eligibility import (
+    COMPILED_RULES, SCHEME_RULES, action_plan_markdown, assess, compile_rules, eligibility_markdown,
+    portfolio_markdown
+)
+
+
+def profile(age_band, income=8000, **fields):
+    return dict({'age_band': str(age_band), 'job': 'Farmer', 'income': income, 'location': 'Pune',
+                 'family_size': '2-3', 'health_condition': 'Good', 'financial_goal': 'Family Security',
+                 'lang': 'en'}, **fields)
+
+
+def status(assessment, key):
+    return next(scheme['status'] for scheme in assessment['schemes'] if scheme['key'] == key)
+
+
+def line(assessment, key):
+    """The scheme's line in the eligibility markdown"""
+    name = next(scheme['name'] for scheme in assessment['schemes'] if scheme['key'] == key)
+    return next(text for text in eligibility_markdown(assessment).splitlines() if f"**{name}:**" in text)
+
+
+@pytest.mark.parametrize('key,age,expected', [
+    ('pmjjby', 17, 'not_eligible'), ('pmjjby', 18, 'eligible'), ('pmjjby', 50, 'eligible'), ('pmjjby', 51, 'not_eligible'),
+    ('apy', 17, 'not_eligible'), ('apy', 18, 'eligible'), ('apy', 40, 'eligible'), ('apy', 41, 'not_eligible'),
+    ('pmsby', 17, 'not_eligible'), ('pmsby', 18, 'eligible'), ('pmsby', 70, 'eligible'), ('pmsby', 71, 'not_eligible'),
+    ('term', 65, 'eligible'), ('term', 66, 'not_eligible'),
+])
+def test_age_limits_at_exact_ages(key, age, expected):
+    assessment = assess(profile(age, income=20000))
+    assert status(assessment, key) == expected
+    if expected == 'eligible':
+        assert line(assessment, key).endswith("✅ Eligible")
+    else:
+        assert "❌ Not eligible — Open to ages" in line(assessment, key)
+        assert key not in [scheme['key'] for scheme in assessment['recommended']]
+
+
+@pytest.mark.parametrize('age,pmjjby,apy,pmsby', [
+    (50, 'eligible', 'not_eligible', 'eligible'),
+    (51, 'not_eligible', 'not_eligible', 'eligible'),
+    (18, 'eligible', 'eligible', 'eligible'),
+    (40, 'eligible', 'eligible', 'eligible'),
+    (41, 'eligible', 'not_eligible', 'eligible'),
+    # Everyone over 60 shares a band, so PMSBY's limit of 70 falls inside it
+    (70, 'not_eligible', 'not_eligible', 'check'),
+    (71, 'not_eligible', 'not_eligible', 'check'),
+])
+def test_age_limits_through_the_cached_age_bands(age, pmjjby, apy, pmsby):
+    assessment = assess(canonical_profile(age, 'Farmer', 8000, 'Pune', '2-3', 'Good', 'Family Security', 'en'))
+    assert (status(assessment, 'pmjjby'), status(assessment, 'apy'), status(assessment, 'pmsby')) == (pmjjby, apy, pmsby)
+    if pmsby == 'check':
+        assert line(assessment, 'pmsby').endswith("🟡 Depends on exact age — Open to ages 18-70")
+
+
+@pytest.mark.parametrize('income,pmjay,topup', [
+    (15000, 'likely', 'not_suggested'),
+    (15001, 'not_eligible', 'eligible'),
+])
+def test_pmjay_income_cutoff(income, pmjay, topup):
+    assessment = assess(profile('26-35', income=income))
+    assert status(assessment, 'pmjay') == pmjay
+    assert status(assessment, 'health_topup') == topup
+    if pmjay == 'likely':
+        assert line(assessment, 'pmjay').endswith("🟡 Likely eligible — Income under about ₹1.8 lakh/year")
+        assert "PMJAY - Ayushman Bharat" in portfolio_markdown(assessment)
+    else:
+        assert line(assessment, 'pmjay').endswith("❌ Not eligible — For households under about ₹1.8 lakh/year")
+        assert "PMJAY" not in portfolio_markdown(assessment)
+        assert line(assessment, 'health_topup').endswith("✅ Eligible")
+
+
+@pytest.mark.parametrize('income,pmjay', [(15000, 'likely'), (15001, 'not_eligible')])
+def test_pmjay_income_cutoff_through_the_cached_income_brackets(income, pmjay):
+    assessment = assess(canonical_profile(30, 'Farmer', income, 'Pune', '2-3', 'Good', 'Health Coverage', 'en'))
+    assert status(assessment, 'pmjay') == pmjay
+
+
+def test_recommendations_are_open_schemes_by_score():
+    assessment = assess(profile('26-35', family_size='1', financial_goal='Retirement Planning'))
+    recommended = assessment['recommended']
+    assert [scheme['key'] for scheme in recommended] == ['apy', 'pmsby', 'pmjay']
+    assert all(scheme['status'] in ('eligible', 'likely', 'check') for scheme in recommended)
+    assert action_plan_markdown(assessment).splitlines()[1:] == [
+        "1. **This Week:** Apply for Atal Pension Yojana (APY) (Any bank)",
+        "2. **Next Week:** Apply for PMSBY (Any bank branch with Aadhaar)",
+        "3. **This Month:** Apply for PMJAY (pmjay.gov.in or call 14555)",
+    ]
+    assert "₹82-₹902 per month (age dependent)" in portfolio_markdown(assessment)
+
+
+def test_compiled_rules_fill_in_open_bounds():
+    compiled = dict((rule['key'], bounds) for rule, *bounds in compile_rules(SCHEME_RULES))
+    assert compiled['pmjay'][:4] == [0, 120, 0, 15000]
+    assert compiled['health_topup'][:4] == [0, 120, 15001, float('inf')]
+    assert len(COMPILED_RULES) == len(SCHEME_RULES)
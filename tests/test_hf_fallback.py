@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+import hf_fallback
+from benchmarks.mock_servers import MockServer, QuietHandler
+from hf_fallback import CircuitBreaker, backoff_delay, get_breaker, query_model, query_models_hedged
+
+FAST, SLOW, BROKEN = 'stub/fast', 'stub/slow', 'stub/broken'
+
+
+class StubHandler(QuietHandler):
+    """Inference API stub: each model answers from its own script of (status, delay, headers) replies"""
+
+    def do_POST(self):
+        model = self.path.split('/models/', 1)[1]
+        prompt = self.read_json()['inputs']
+        with self.settings['lock']:
+            self.stats['requests'] += 1
+            self.settings['calls'][model] += 1
+            script = self.settings['replies'][model]
+            status, delay, headers = script.pop(0) if len(script) > 1 else script[0]
+        time.sleep(delay)
+        if status == 200:
+            self.send_json(200, [{'generated_text': f"{prompt} answer from {model}"}])
+        else:
+            self.send_json(status, {'error': 'stub failure'}, headers)
+
+
+class StubHuggingFace(MockServer):
+    handler = StubHandler
+
+    def __init__(self, replies):
+        super().__init__(replies=replies, calls=Counter(), lock=threading.Lock())
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """stub({model: replies}) starts a stub and returns its per-model request counts; breakers are per test"""
+    servers = []
+    monkeypatch.setattr(hf_fallback, '_breakers', {})
+    monkeypatch.setattr(hf_fallback, 'backoff_delay', lambda attempt: 0.01)
+
+    def serve(replies):
+        server = StubHuggingFace(replies).start()
+        servers.append(server)
+        monkeypatch.setattr(hf_fallback, 'API_BASE', server.url + '/models')
+        return server.httpd.RequestHandlerClass.settings['calls']
+
+    yield serve
+    for server in servers:
+        server.stop()
+
+
+def ok(delay=0.0):
+    return [(200, delay, None)]
+
+
+def failing(status=500):
+    return [(status, 0.0, None)]
+
+
+def test_hedge_wins_over_a_slow_model(stub):
+    calls = stub({SLOW: ok(1), FAST: ok()})
+    started = time.monotonic()
+    text = query_models_hedged("PMSBY claim", models=[SLOW, FAST], hedge_delay=0.1, budget=5)
+    assert text == "answer from stub/fast"
+    assert time.monotonic() - started < 1.0
+    assert calls[SLOW] == calls[FAST] == 1
+
+
+def test_a_failed_model_starts_the_next_one_at_once(stub):
+    calls = stub({BROKEN: failing(400), FAST: ok()})
+    started = time.monotonic()
+    assert query_models_hedged("PMSBY claim", models=[BROKEN, FAST], hedge_delay=10, budget=5) == "answer from stub/fast"
+    assert time.monotonic() - started < 1.0
+    assert calls[BROKEN] == 1
+
+
+def test_hedge_delay_zero_fires_every_model(stub):
+    calls = stub({SLOW: ok(0.3), FAST: ok(0.3)})
+    assert query_models_hedged("PMSBY claim", models=[SLOW, FAST], hedge_delay=0, budget=5)
+    assert calls[SLOW] == calls[FAST] == 1
+
+
+def test_latency_budget_gives_up(stub):
+    stub({SLOW: ok(1)})
+    started = time.monotonic()
+    assert query_models_hedged("PMSBY claim", models=[SLOW], hedge_delay=0.1, budget=0.3) is None
+    assert time.monotonic() - started < 1.0
+
+
+def test_async_hedge_wins_and_cancels_the_loser(stub):
+    stub({SLOW: ok(1), FAST: ok()})
+
+    async def race():
+        started = time.monotonic()
+        text = await hf_fallback.query_models_hedged_async("PMSBY claim", models=[SLOW, FAST], hedge_delay=0.1, budget=5)
+        return text, time.monotonic() - started
+
+    text, elapsed = asyncio.run(race())
+    assert text == "answer from stub/fast"
+    assert elapsed < 1.0
+
+
+def test_retries_back_off_until_exhausted(stub):
+    calls = stub({BROKEN: failing(500)})
+    assert query_model(BROKEN, "PMSBY claim", max_retries=3) is None
+    assert calls[BROKEN] == 3
+    assert get_breaker(BROKEN).failures == 1
+
+
+def test_retry_after_is_honoured_and_a_retry_can_succeed(stub):
+    calls = stub({BROKEN: [(503, 0.0, {'Retry-After': '0.2'}), (200, 0.0, None)]})
+    started = time.monotonic()
+    assert query_model(BROKEN, "PMSBY claim", max_retries=3) == "answer from stub/broken"
+    assert time.monotonic() - started >= 0.2
+    assert calls[BROKEN] == 2
+
+
+def test_client_errors_are_not_retried(stub):
+    calls = stub({BROKEN: failing(404)})
+    assert query_model(BROKEN, "PMSBY claim", max_retries=3) is None
+    assert calls[BROKEN] == 1
+
+
+def test_backoff_is_jittered_and_capped():
+    for attempt in range(8):
+        delays = [backoff_delay(attempt, base=0.5, cap=4.0) for _ in range(200)]
+        assert all(0 <= delay <= min(4.0, 0.5 * 2 ** attempt) for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_breaker_opens_after_repeated_failures_and_half_opens_after_the_cooldown():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.25)
+    assert breaker.allow()
+    # A failed trial request opens it again for another cool-down
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.25)
+    breaker.record_success()
+    assert breaker.allow() and breaker.failures == 0
+
+
+def test_open_breaker_skips_the_model(stub, monkeypatch):
+    calls = stub({BROKEN: failing(500), FAST: ok()})
+    monkeypatch.setitem(hf_fallback._breakers, BROKEN, CircuitBreaker(threshold=1, cooldown=60))
+    assert query_models_hedged("PMSBY claim", models=[BROKEN], max_retries=1, budget=2) is None
+    assert calls[BROKEN] == 1
+
+    assert query_models_hedged("PMSBY claim", models=[BROKEN, FAST], hedge_delay=10, budget=2) == "answer from stub/fast"
+    assert calls[BROKEN] == 1
+
+
+def test_half_open_breaker_lets_a_trial_request_through(stub, monkeypatch):
+    calls = stub({BROKEN: [(500, 0.0, None), (200, 0.0, None)]})
+    breaker = CircuitBreaker(threshold=1, cooldown=0.2)
+    monkeypatch.setitem(hf_fallback._breakers, BROKEN, breaker)
+    assert query_models_hedged("PMSBY claim", models=[BROKEN], max_retries=1, budget=2) is None
+    assert not breaker.allow()
+
+    time.sleep(0.25)
+    assert query_models_hedged("PMSBY claim", models=[BROKEN], max_retries=1, budget=2) == "answer from stub/broken"
+    assert calls[BROKEN] == 2
+    assert breaker.opened_at is None
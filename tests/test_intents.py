@@ -0,0 +1,47 @@
+import pytest
+
+from intents import get_classifier
+
+
+@pytest.mark.parametrize('question', [
+    "What documents needed for PMSBY?",
+    "How to apply for PMJAY?",
+    "PMJJBY claim process",
+    "What is the age limit for PMJJBY?",
+    "premium of PMSBY",
+    "पीएमएसबीवाई के लिए दस्तावेज",
+    "आयुष्मान कार्ड कैसे बनवाएं",
+])
+def test_scheme_with_a_topic_goes_to_the_model(question):
+    assert get_classifier().route(question) is None
+
+
+@pytest.mark.parametrize('question, intent', [
+    ("What is PMJAY?", 'pmjay'),
+    ("Tell me about Atal Pension Yojana", 'apy'),
+    ("Hi, what is PMSBY?", 'pmsby'),
+    ("आयुष्मान भारत क्या है", 'pmjay'),
+])
+def test_general_scheme_question_is_answered_directly(question, intent):
+    classifier = get_classifier()
+    assert classifier.route(question) == classifier.by_name[intent]['answer']['en']
+
+
+@pytest.mark.parametrize('question, intent', [
+    ("How do I file a claim?", 'claim'),
+    ("My claim was rejected", 'claim_rejected'),
+    ("How do I apply and register?", 'apply'),
+])
+def test_clear_topic_question_is_answered_directly(question, intent):
+    classifier = get_classifier()
+    assert classifier.route(question) == classifier.by_name[intent]['answer']['en']
+
+
+def test_hindi_answer():
+    classifier = get_classifier()
+    assert classifier.route("What is PMJAY?", 'hi') == classifier.by_name['pmjay']['answer']['hi']
+
+
+def test_substrings_do_not_match():
+    # "file" must not match inside "profile"
+    assert get_classifier().classify("update my profile")[0] is None
@@ -0,0 +1,305 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.mock_servers import MockOllama, generate_words
+from llm_gateway import AsyncLLMGateway, GatewayBusy, GatewayTimeout, GenerationCancelled, LLMGateway
+
+OPTIONS = {'num_predict': 20}
+OWNER = ('session-1', 'chat')
+
+
+def answer(prompt, count=20):
+    """What MockOllama streams for a prompt"""
+    return ''.join(word + ' ' for word in generate_words(prompt, count))
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.005)
+
+
+async def async_wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.005)
+
+
+def in_thread(target, *args):
+    """Run target in a thread; the returned dict gets its 'result' or 'error'"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = target(*args)
+        except Exception as e:
+            outcome['error'] = e
+    outcome['thread'] = threading.Thread(target=run, daemon=True)
+    outcome['thread'].start()
+    return outcome
+
+
+@pytest.fixture
+def ollama_server():
+    with MockOllama(latency=0.05, token_rate=400) as server:
+        yield server
+
+
+@pytest.fixture
+def slow_server():
+    """About half a second per answer, so tests can act while a generation is running"""
+    with MockOllama(latency=0.05, token_rate=40) as server:
+        yield server
+
+
+def test_full_queue_raises_busy(slow_server):
+    gateway = LLMGateway(host=slow_server.url, max_in_flight=1, max_queue=1, coalesce=False)
+    running = in_thread(gateway.chat, "question 1", OPTIONS)
+    wait_until(lambda: gateway.stats()['in_flight'] == 1)
+    queued = in_thread(gateway.chat, "question 2", OPTIONS)
+    wait_until(lambda: gateway.stats()['queued'] == 1)
+
+    with pytest.raises(GatewayBusy):
+        gateway.chat("question 3", OPTIONS)
+
+    running['thread'].join()
+    queued['thread'].join()
+    assert running['result'] == answer("question 1")
+    assert queued['result'] == answer("question 2")
+    assert gateway.stats() == {'in_flight': 0, 'queued': 0, 'shared': 0, 'coalesced': 0}
+
+
+def test_slots_are_granted_in_arrival_order(ollama_server):
+    gateway = LLMGateway(host=ollama_server.url, max_in_flight=1, max_queue=8, coalesce=False)
+    finished = []
+
+    def ask(prompt):
+        gateway.chat(prompt, OPTIONS)
+        finished.append(prompt)
+
+    callers = [in_thread(ask, "question 0")]
+    wait_until(lambda: gateway.stats()['in_flight'] == 1)
+    for i in range(1, 5):
+        callers.append(in_thread(ask, f"question {i}"))
+        wait_until(lambda: gateway.stats()['queued'] == i or len(finished) > 0)
+    for caller in callers:
+        caller['thread'].join()
+    assert finished == [f"question {i}" for i in range(5)]
+
+
+def test_deadline_raises_timeout_and_frees_the_slot(slow_server):
+    gateway = LLMGateway(host=slow_server.url, max_in_flight=1, coalesce=False)
+    with pytest.raises(GatewayTimeout):
+        gateway.chat("question", OPTIONS, timeout=0.3)
+    assert gateway.stats()['in_flight'] == 0
+
+
+def test_queue_wait_is_bounded(slow_server):
+    gateway = LLMGateway(host=slow_server.url, max_in_flight=1, queue_timeout=0.1, coalesce=False)
+    running = in_thread(gateway.chat, "question 1", OPTIONS)
+    wait_until(lambda: gateway.stats()['in_flight'] == 1)
+    with pytest.raises(GatewayBusy):
+        gateway.chat("question 2", OPTIONS)
+    running['thread'].join()
+
+
+def test_async_full_queue_raises_busy(slow_server):
+    gateway = AsyncLLMGateway(host=slow_server.url, max_in_flight=1, max_queue=1, coalesce=False)
+
+    async def scenario():
+        running = asyncio.ensure_future(gateway.chat("question 1", OPTIONS))
+        await async_wait_until(lambda: gateway.stats()['in_flight'] == 1)
+        queued = asyncio.ensure_future(gateway.chat("question 2", OPTIONS))
+        await async_wait_until(lambda: gateway.stats()['queued'] == 1)
+        with pytest.raises(GatewayBusy):
+            await gateway.chat("question 3", OPTIONS)
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (answer("question 1"), answer("question 2"))
+    assert gateway.stats() == {'in_flight': 0, 'queued': 0, 'shared': 0, 'coalesced': 0}
+
+
+def test_async_queue_limit_holds_for_a_burst(ollama_server):
+    gateway = AsyncLLMGateway(host=ollama_server.url, max_in_flight=1, max_queue=1, coalesce=False)
+
+    async def burst():
+        calls = [gateway.chat(f"question {i}", OPTIONS) for i in range(6)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, str) for result in results) == 2
+    assert sum(isinstance(result, GatewayBusy) for result in results) == 4
+    assert ollama_server.stats['requests'] == 2
+
+
+def test_async_slots_are_granted_in_arrival_order(ollama_server):
+    gateway = AsyncLLMGateway(host=ollama_server.url, max_in_flight=1, max_queue=8, coalesce=False)
+    finished = []
+
+    async def ask(prompt):
+        await gateway.chat(prompt, OPTIONS)
+        finished.append(prompt)
+
+    async def scenario():
+        callers = [asyncio.ensure_future(ask("question 0"))]
+        await async_wait_until(lambda: gateway.stats()['in_flight'] == 1)
+        for i in range(1, 5):
+            callers.append(asyncio.ensure_future(ask(f"question {i}")))
+            await async_wait_until(lambda: gateway.stats()['queued'] == i or len(finished) > 0)
+        await asyncio.gather(*callers)
+
+    asyncio.run(scenario())
+    assert finished == [f"question {i}" for i in range(5)]
+
+
+def test_async_deadline_raises_timeout_and_frees_the_slot(slow_server):
+    gateway = AsyncLLMGateway(host=slow_server.url, max_in_flight=1, coalesce=False)
+    with pytest.raises(GatewayTimeout):
+        asyncio.run(gateway.chat("question", OPTIONS, timeout=0.3))
+    assert gateway.stats()['in_flight'] == 0
+
+
+def test_superseded_owner_is_cancelled_and_frees_its_slot(slow_server):
+    gateway = LLMGateway(host=slow_server.url, max_in_flight=1, coalesce=False)
+    first = gateway.stream("question 1", OPTIONS, owner=OWNER)
+    next(first)
+    newer = in_thread(gateway.chat, "question 2", OPTIONS, None, OWNER)
+    wait_until(lambda: gateway.stats()['queued'] == 1)
+
+    with pytest.raises(GenerationCancelled):
+        list(first)
+    newer['thread'].join()
+    assert newer['result'] == answer("question 2")
+    assert gateway.stats()['in_flight'] == 0
+
+
+def test_cancel_stops_a_queued_request(slow_server):
+    gateway = LLMGateway(host=slow_server.url, max_in_flight=1, coalesce=False)
+    running = in_thread(gateway.chat, "question 1", OPTIONS)
+    wait_until(lambda: gateway.stats()['in_flight'] == 1)
+    queued = in_thread(gateway.chat, "question 2", OPTIONS, None, OWNER)
+    wait_until(lambda: gateway.stats()['queued'] == 1)
+
+    gateway.cancel(OWNER[0])
+    queued['thread'].join(timeout=0.2)
+    assert isinstance(queued.get('error'), GenerationCancelled)
+    assert gateway.stats()['queued'] == 0
+    running['thread'].join()
+    assert slow_server.stats['requests'] == 1
+
+
+def test_async_superseded_owner_is_cancelled_and_frees_its_slot(slow_server):
+    gateway = AsyncLLMGateway(host=slow_server.url, max_in_flight=1, coalesce=False)
+
+    async def scenario():
+        first = gateway.stream("question 1", OPTIONS, owner=OWNER)
+        await first.__anext__()
+        newer = asyncio.ensure_future(gateway.chat("question 2", OPTIONS, owner=OWNER))
+        await async_wait_until(lambda: gateway.stats()['queued'] == 1)
+        with pytest.raises(GenerationCancelled):
+            async for token in first:
+                pass
+        return await newer
+
+    assert asyncio.run(scenario()) == answer("question 2")
+    assert gateway.stats()['in_flight'] == 0
+
+
+def test_async_cancelled_queued_request_never_reaches_ollama(slow_server):
+    gateway = AsyncLLMGateway(host=slow_server.url, max_in_flight=1, coalesce=False)
+
+    async def scenario():
+        running = asyncio.ensure_future(gateway.chat("question 1", OPTIONS))
+        await async_wait_until(lambda: gateway.stats()['in_flight'] == 1)
+        queued = asyncio.ensure_future(gateway.chat("question 2", OPTIONS, owner=OWNER))
+        await async_wait_until(lambda: gateway.stats()['queued'] == 1)
+        gateway.cancel(OWNER[0])
+        with pytest.raises(GenerationCancelled):
+            await queued
+        await running
+
+    asyncio.run(scenario())
+    assert slow_server.stats['requests'] == 1
+    assert gateway.stats()['in_flight'] == 0
+
+
+def test_identical_prompts_share_one_generation(slow_server):
+    gateway = LLMGateway(host=slow_server.url)
+    first = gateway.stream("question", OPTIONS)
+    early = [next(first) for _ in range(3)]
+
+    # The late caller replays the three tokens already produced, then follows the live stream
+    late = gateway.chat("question", OPTIONS)
+    assert late == answer("question")
+    assert ''.join(early + list(first)) == late
+    assert slow_server.stats['requests'] == 1
+    assert gateway.stats()['coalesced'] == 1
+
+
+def test_generation_stops_only_after_the_last_follower_leaves(slow_server):
+    gateway = LLMGateway(host=slow_server.url)
+    first = gateway.stream("question", OPTIONS)
+    second = gateway.stream("question", OPTIONS)
+
+    head = next(first)
+    assert next(second) == head
+    first.close()
+    assert head + ''.join(second) == answer("question")
+
+    third = gateway.stream("question again", OPTIONS)
+    fourth = gateway.stream("question again", OPTIONS)
+    next(third)
+    next(fourth)
+    third.close()
+    fourth.close()
+    started = time.monotonic()
+    wait_until(lambda: gateway.stats() == {'in_flight': 0, 'queued': 0, 'shared': 0, 'coalesced': 2})
+    assert time.monotonic() - started < 0.3
+    assert slow_server.stats['requests'] == 2
+
+
+def test_async_identical_prompts_share_one_generation(slow_server):
+    gateway = AsyncLLMGateway(host=slow_server.url)
+
+    async def scenario():
+        first = gateway.stream("question", OPTIONS)
+        early = [await first.__anext__() for _ in range(3)]
+        late = await gateway.chat("question", OPTIONS)
+        rest = [token async for token in first]
+        return ''.join(early + rest), late
+
+    whole, late = asyncio.run(scenario())
+    assert late == whole == answer("question")
+    assert slow_server.stats['requests'] == 1
+    assert gateway.stats()['coalesced'] == 1
+
+
+def test_async_generation_stops_only_after_the_last_follower_leaves(slow_server):
+    gateway = AsyncLLMGateway(host=slow_server.url)
+
+    async def scenario():
+        first = gateway.stream("question", OPTIONS)
+        second = gateway.stream("question", OPTIONS)
+        head = await first.__anext__()
+        assert await second.__anext__() == head
+        await first.aclose()
+        rest = ''.join([token async for token in second])
+        assert head + rest == answer("question")
+
+        third = gateway.stream("question again", OPTIONS)
+        fourth = gateway.stream("question again", OPTIONS)
+        await third.__anext__()
+        await fourth.__anext__()
+        await third.aclose()
+        await fourth.aclose()
+        started = time.monotonic()
+        await async_wait_until(lambda: gateway.stats() == {'in_flight': 0, 'queued': 0, 'shared': 0, 'coalesced': 2})
+        assert time.monotonic() - started < 0.3
+
+    asyncio.run(scenario())
+    assert slow_server.stats['requests'] == 2
@@ -0,0 +1,57 @@
+import http.client
+import threading
+import time
+
+import pytest
+
+from benchmarks.mock_servers import MockOllama
+from model_lifecycle import ModelMonitor
+
+LOADED = {'models': [{'name': 'phi3:mini', 'model': 'phi3:mini'}]}
+
+
+def wait_for_state(monitor, state, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while monitor.state != state:
+        assert time.monotonic() < deadline, f"state stayed {monitor.state}, wanted {state}"
+        time.sleep(0.005)
+
+
+def test_probe_reports_a_loaded_model():
+    with MockOllama() as server:
+        server.httpd.RequestHandlerClass.settings['loaded'].set()
+        monitor = ModelMonitor(host=server.url, preload=False)
+        assert monitor.check() == 'ready'
+
+
+@pytest.mark.parametrize('failure', [
+    http.client.IncompleteRead(b'{"mod'),
+    KeyError('models'),
+    AttributeError("'list' object has no attribute 'get'"),
+])
+def test_unexpected_probe_errors_mark_the_model_offline_and_keep_polling(monkeypatch, failure):
+    monitor = ModelMonitor(host='127.0.0.1:9', interval=0.01, preload=False)
+    replies = {'ok': True}
+    lock = threading.Lock()
+
+    def request(path, payload=None, timeout=None):
+        with lock:
+            if not replies['ok']:
+                raise failure
+        return LOADED
+
+    monkeypatch.setattr(monitor, 'request', request)
+    monitor.start()
+    wait_for_state(monitor, 'ready')
+
+    with lock:
+        replies['ok'] = False
+    wait_for_state(monitor, 'offline')
+    assert type(failure).__name__ in monitor.error
+    assert not monitor.usable()
+
+    with lock:
+        replies['ok'] = True
+    wait_for_state(monitor, 'ready')
+    assert monitor._thread.is_alive()
+    monitor.interval = 3600  # let the daemon thread idle for the rest of the run
@@ -0,0 +1,121 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from premium_engine import (
+    APY_CONTRIBUTIONS, APY_MAX_AGE, APY_MIN_AGE, APY_PENSIONS, BUNDLE_OPTIONS, FAMILY_MULTIPLIERS,
+    HEALTH_COVER_PER_RUPEE, PMJAY, SCHEMES, TERM_AGE_LOADING, TERM_COVER_PER_RUPEE, TERM_MAX_AGE, evaluate,
+    optimize_plan, plan_bundles, pmjay_eligible, product_choices, quote
+)
+
+AGES = [17, 18, 25, 30, 31, 40, 41, 50, 51, 65, 66, 70, 71]
+FAMILY_SIZES = ['1', '2-3', '4-5', '6+']
+
+
+def scalar_quote(age, family_size, pmsby, pmjjby, apy_pension, health_monthly, term_monthly):
+    """One bundle for one person, priced straight from the tables without NumPy"""
+    eligible, apy_monthly = True, 0
+    if apy_pension:
+        if APY_MIN_AGE <= age <= APY_MAX_AGE:
+            apy_monthly = int(APY_CONTRIBUTIONS[age - APY_MIN_AGE][list(APY_PENSIONS).index(apy_pension)])
+        else:
+            eligible = False
+    if term_monthly and age > TERM_MAX_AGE:
+        eligible = False
+    loading = next((loading for limit, loading in TERM_AGE_LOADING if age <= limit), TERM_AGE_LOADING[-1][1])
+
+    annual = 12 * (apy_monthly + health_monthly + term_monthly)
+    coverage = (health_monthly * HEALTH_COVER_PER_RUPEE / FAMILY_MULTIPLIERS[family_size]
+                + term_monthly * TERM_COVER_PER_RUPEE / loading)
+    for name, taken in (('pmsby', pmsby), ('pmjjby', pmjjby)):
+        if taken:
+            scheme = SCHEMES[name]
+            eligible = eligible and scheme['min_age'] <= age <= scheme['max_age']
+            annual += scheme['annual']
+            coverage += scheme['cover']
+    return annual, math.floor(coverage), apy_monthly, eligible
+
+
+def test_evaluate_matches_scalar_pricing():
+    bundles = plan_bundles()
+    # Unsorted and repeated profiles exercise the per-pair pricing and its scatter back
+    rng = np.random.default_rng(3)
+    ages = rng.choice(AGES, 60)
+    family_sizes = rng.choice(FAMILY_SIZES, 60)
+    result = evaluate(ages, family_sizes, bundles)
+    assert result['annual'].shape == (60, len(bundles['pmsby']))
+
+    for row, (age, family_size) in enumerate(zip(ages, family_sizes)):
+        for column in range(len(bundles['pmsby'])):
+            bundle = [int(bundles[name][column]) for name in
+                      ('pmsby', 'pmjjby', 'apy_pension', 'health_monthly', 'term_monthly')]
+            expected = scalar_quote(int(age), str(family_size), *bundle)
+            got = (result['annual'][row, column], result['coverage'][row, column],
+                   result['apy_monthly'][row, column], bool(result['eligible'][row, column]))
+            assert got == expected, (age, family_size, bundle)
+
+
+def test_quote_at_the_age_limits():
+    assert quote(50, pmjjby=True)['eligible']
+    assert not quote(51, pmjjby=True)['eligible']
+    assert quote(70, pmsby=True)['eligible']
+    assert not quote(71, pmsby=True)['eligible']
+    assert quote(40, apy_pension=5000)['apy_monthly'] == 1454
+    assert not quote(41, apy_pension=5000)['eligible']
+    assert quote(18, pmsby=True, pmjjby=True, apy_pension=1000) == {
+        'annual': 20 + 436 + 12 * 42, 'monthly': (20 + 436 + 12 * 42) // 12,
+        'coverage': 400000, 'apy_monthly': 42, 'eligible': True,
+    }
+
+
+def exhaustive_plan(age, family_size, budget, apy_pension):
+    """Best (coverage, -cost) over every combination of product_choices within the budget, or None"""
+    choices = product_choices(age, family_size, apy_pension)
+    best = None
+    for combination in itertools.product(*[range(len(values)) for _, values, _, _ in choices]):
+        cost = sum(costs[i] for (_, _, costs, _), i in zip(choices, combination))
+        cover = sum(covers[i] for (_, _, _, covers), i in zip(choices, combination))
+        if cost <= budget and (best is None or (cover, -cost) > best):
+            best = (cover, -cost)
+    return best
+
+
+PLAN_CASES = [
+    (age, family_size, income, budget, apy_pension)
+    for age in (18, 35, 45, 50, 51, 60, 66, 71)
+    for family_size in ('1', '6+')
+    for income, budget in ((5000, None), (15000, None), (50000, None), (10000, 0), (10000, 400), (10000, 12000))
+    for apy_pension in (0, 5000)
+]
+
+
+@pytest.mark.parametrize('age,family_size,income,budget,apy_pension', PLAN_CASES)
+def test_optimize_plan_matches_exhaustive_search(age, family_size, income, budget, apy_pension):
+    plan = optimize_plan(age, family_size, income, budget, apy_pension=apy_pension)
+    budget = plan['budget']
+    best = exhaustive_plan(age, family_size, budget, apy_pension)
+    pmjay_cover = PMJAY['cover'] if pmjay_eligible(income) else 0
+
+    assert plan['feasible'] == (best is not None)
+    if best is None:
+        assert plan['annual'] == 0 and plan['coverage'] == pmjay_cover
+        return
+    assert plan['coverage'] - pmjay_cover == int(best[0])
+    assert plan['annual'] == int(-best[1]) <= budget
+
+    # The chosen products really cost and cover what the plan says
+    priced = quote(age, family_size, plan['pmsby'], plan['pmjjby'], plan['apy_pension'],
+                   plan['health_monthly'], plan['term_monthly'])
+    assert priced['eligible']
+    assert priced['annual'] == plan['annual']
+
+
+def test_infeasible_plan_has_the_same_keys():
+    feasible = optimize_plan(35, '1', 10000, budget=20000, apy_pension=5000)
+    infeasible = optimize_plan(35, '1', 10000, budget=1000, apy_pension=5000)
+    assert feasible['feasible'] and not infeasible['feasible']
+    assert infeasible.keys() == feasible.keys()
+    assert infeasible == dict({name: 0 for name in BUNDLE_OPTIONS}, annual=0, coverage=PMJAY['cover'],
+                              coverage_per_rupee=0.0, budget=1000, feasible=False, pmjay=True)
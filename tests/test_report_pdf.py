@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+import report_pdf
+from report_pdf import MissingFontError, covers_devanagari, find_fonts, render_report
+
+USER_DATA = {'age': 32, 'job': 'Farmer', 'income': 7500, 'location': 'Pune', 'family_size': '4',
+             'financial_goal': 'Health Security'}
+HINDI_ADVICE = "## सुझाव\n\n- **PMSBY**: ₹20/वर्ष में ₹2 लाख दुर्घटना बीमा\n- PMJAY: ₹5 लाख मुफ्त इलाज"
+
+
+def face_name(path):
+    from reportlab.pdfbase.ttfonts import TTFontFile
+
+    name = TTFontFile(path).name
+    return name if isinstance(name, bytes) else name.encode()
+
+
+@pytest.fixture
+def fonts(monkeypatch):
+    """Use the fonts returned by the given finder for one test"""
+    def use(finder):
+        monkeypatch.setattr(report_pdf, 'find_fonts', finder)
+        monkeypatch.setattr(report_pdf, '_styles', None)
+        monkeypatch.setattr(report_pdf, '_reports', type(report_pdf._reports)())
+    return use
+
+
+def test_english_report_renders_in_full():
+    advice = "## Plan\n\n" + "\n".join(f"- Step {n}: keep paying the premium" for n in range(200))
+    pdf = render_report(USER_DATA, advice, 'en')
+    assert pdf.startswith(b'%PDF')
+    assert render_report(USER_DATA, advice, 'en') is pdf
+
+
+@pytest.mark.skipif(find_fonts() is None, reason="no Devanagari font installed; see README prerequisites")
+def test_hindi_report_embeds_a_devanagari_font():
+    font = find_fonts()[0]
+    assert covers_devanagari(font)
+    pdf = render_report(USER_DATA, HINDI_ADVICE, 'hi')
+    assert b'/FontFile2' in pdf
+    assert re.search(rb'/BaseFont /[A-Z]{6}\+' + re.escape(face_name(font)), pdf)
+
+
+def test_hindi_report_without_a_devanagari_font_fails(fonts, monkeypatch):
+    monkeypatch.setattr(report_pdf, 'PDF_FONT', '')
+    fonts(lambda: None)
+    with pytest.raises(MissingFontError, match='fonts-noto-core') as error:
+        render_report(USER_DATA, HINDI_ADVICE, 'hi')
+    assert report_pdf.FONTS_DIR in str(error.value)
+    assert 'ADVISOR_PDF_FONT' in str(error.value)
+
+
+def test_missing_font_error_names_a_configured_latin_font(fonts, monkeypatch):
+    import os
+    import reportlab
+
+    vera = os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+    monkeypatch.setattr(report_pdf, 'PDF_FONT', vera)
+    fonts(lambda: (vera, vera))
+    with pytest.raises(MissingFontError, match=f'ADVISOR_PDF_FONT is {re.escape(vera)}'):
+        render_report(USER_DATA, HINDI_ADVICE, 'hi')
+
+
+def test_latin_only_fonts_are_not_picked_for_hindi(monkeypatch):
+    import os
+    import reportlab
+
+    vera = os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+    assert not covers_devanagari(vera)
+    monkeypatch.setattr(report_pdf, 'PDF_FONT', '')
+    monkeypatch.setattr(report_pdf, 'FONT_CANDIDATES', [(vera, vera)])
+    assert find_fonts() is None
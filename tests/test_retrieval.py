@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import pytest
+
+import retrieval
+from retrieval import KNOWLEDGE_DIR, PROMPT_RESERVE, TOKENS_PER_WORD, build_arrays, open_index, prompt_context
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """Index built under tmp_path and used by prompt_context for one test"""
+    index = open_index(str(tmp_path / 'index'))
+    monkeypatch.setattr(retrieval, '_index', index)
+    return index
+
+
+@pytest.mark.parametrize('query,best', [
+    ("accident cover for 20 rupees", "PMSBY"),
+    ("life insurance premium 436", "PMJJBY"),
+    ("free hospital treatment for poor families", "PMJAY"),
+    ("hospital refused cashless treatment", "PMJAY, Cashless treatment"),
+    ("monthly pension after 60", "Atal Pension Yojana"),
+    ("पेंशन योजना", "Atal Pension Yojana"),
+])
+def test_bm25_ranks_the_right_scheme_first(index, query, best):
+    hits = index.search(query)
+    assert hits[0][1].startswith(best)
+    assert [score for score, _ in hits] == sorted((score for score, _ in hits), reverse=True)
+
+
+def test_unknown_words_find_nothing(index):
+    assert index.search("zzzz qqqq") == []
+
+
+def test_memory_mapped_index_matches_the_built_one(index):
+    arrays = build_arrays(retrieval.source_snippets())
+    in_memory = retrieval.RetrievalIndex(arrays['terms'], arrays['docs'], arrays['weights'], arrays['offsets'],
+                                         arrays['text'])
+    for query in ("documents for pmjjby claim", "apy contribution at age 30"):
+        assert index.search(query, 5) == in_memory.search(query, 5)
+
+
+def test_changed_sources_rebuild_the_index(tmp_path):
+    knowledge = tmp_path / 'knowledge'
+    shutil.copytree(KNOWLEDGE_DIR, knowledge)
+    path = str(tmp_path / 'index')
+    before = open_index(path, str(knowledge))
+    assert not before.search("zebra sanctuary")
+
+    with open(knowledge / 'pmsby.md', 'a', encoding='utf-8') as f:
+        f.write("\n## Zebra sanctuary\n\nPMSBY does not cover zebra sanctuary visits.\n")
+    after = open_index(path, str(knowledge))
+    assert after.search("zebra sanctuary")[0][1].startswith("PMSBY, Zebra sanctuary")
+    assert len(os.listdir(path)) == 1
+
+
+@pytest.mark.parametrize('options', [
+    {'num_ctx': 1024, 'num_predict': 100},
+    {'num_ctx': 512, 'num_predict': 150},
+    {'num_ctx': 512, 'num_predict': 250},
+])
+def test_prompt_context_stays_within_its_token_budget(index, options):
+    query = "What documents do I need to claim PMJJBY after my husband died?"
+    budget = (options['num_ctx'] - options['num_predict'] - PROMPT_RESERVE) / TOKENS_PER_WORD - len(query.split())
+    context = prompt_context(query, options, k=10)
+    words = sum(len(line[2:].split()) for line in context.splitlines())
+    assert words <= budget
+    assert all(line.startswith("- ") for line in context.splitlines())
+
+
+def test_prompt_context_uses_the_room_it_has(index):
+    query = "hospital refused cashless treatment"
+    roomy = prompt_context(query, {'num_ctx': 1024, 'num_predict': 100})
+    assert roomy.startswith("- PMJAY, Cashless treatment")
+    # A tight budget skips the best snippet for a shorter one that fits, and an exhausted one adds nothing
+    tight = prompt_context(query, {'num_ctx': 400, 'num_predict': 200})
+    assert tight and not tight.startswith("- PMJAY, Cashless treatment")
+    assert len(tight.split()) - 1 <= 50 / TOKENS_PER_WORD - len(query.split())
+    assert prompt_context(query, {'num_ctx': 300, 'num_predict': 200}) == ''
@@ -0,0 +1,56 @@
+from conftest import final_event
+from semantic_cache import SemanticCache
+
+QUESTION = "Is my mother covered if she lives with my brother?"
+
+
+def test_paraphrase_hits():
+    cache = SemanticCache()
+    cache.put("How do I apply for PMJAY?", "Visit a CSC")
+    assert cache.get("how to apply for pm-jay") == "Visit a CSC"
+
+
+def test_schemes_never_share_an_answer():
+    cache = SemanticCache()
+    cache.put("Documents for PMSBY", "Aadhaar and bank account")
+    assert cache.get("Documents for PMJJBY") is None
+
+
+def test_languages_never_share_an_answer():
+    cache = SemanticCache()
+    cache.put(QUESTION, "English answer", 'en')
+    assert cache.get(QUESTION, 'hi') is None
+    cache.put(QUESTION, "हिंदी उत्तर", 'hi')
+    assert cache.get(QUESTION, 'en') == "English answer"
+    assert cache.get(QUESTION, 'hi') == "हिंदी उत्तर"
+
+
+def test_service_answers_each_language_from_its_own_entry(service, gateway):
+    first = final_event(service.chat({'question': QUESTION, 'lang': 'en'}))
+    assert first['tier'] == 'phi3'
+
+    gateway.answer = "हिंदी उत्तर"
+    second = final_event(service.chat({'question': QUESTION, 'lang': 'hi'}))
+    assert second['tier'] == 'phi3'
+    assert second['text'].strip() == "हिंदी उत्तर"
+
+    again = final_event(service.chat({'question': QUESTION, 'lang': 'hi'}))
+    assert again['tier'] == 'cache'
+    assert again['text'] == second['text']
+    assert len(gateway.prompts) == 2
+
+
+def test_numbers_never_share_an_answer():
+    cache = SemanticCache()
+    cache.put("Can a 25 year old apply for PMJJBY?", "Yes, open to 18-50")
+    assert cache.get("Can a 55 year old apply for PMJJBY?") is None
+    assert cache.get("can a 25 year old apply for pmjjby") == "Yes, open to 18-50"
+
+    cache.put("Premium for APY pension of 1000 per month", "About 42 a month at 18")
+    assert cache.get("Premium for APY pension of 5000 per month") is None
+
+
+def test_devanagari_digits_match_ascii_digits():
+    cache = SemanticCache()
+    cache.put("Can a 25 year old apply for PMJJBY?", "Yes, open to 18-50")
+    assert cache.get("Can a २५ year old apply for PMJJBY?") == "Yes, open to 18-50"
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+import re
+
+import pytest
+from starlette.testclient import TestClient
+
+from conftest import ROOT, final_event
+from service import create_app
+
+
+@pytest.fixture
+def client(service):
+    with TestClient(create_app(service)) as client:
+        yield client
+
+
+def readme_advice_body():
+    with open(os.path.join(ROOT, 'README.md'), encoding='utf-8') as f:
+        readme = f.read()
+    return json.loads(re.search(r"curl -s localhost:\d+/advice -d '(.*?)'", readme, re.S).group(1))
+
+
+def test_readme_advice_example_works(client):
+    response = client.post('/advice', json=readme_advice_body())
+    assert response.status_code == 200
+    assert response.json()['tier'] == 'phi3'
+
+
+def test_unknown_option_label_is_rejected(client):
+    body = dict(readme_advice_body(), family_size="3-4 members")
+    response = client.post('/advice', json=body)
+    assert response.status_code == 400
+    assert 'family_size' in response.json()['error']
+
+
+def test_hindi_option_labels_are_accepted(client):
+    from advisor import TRANSLATED_OPTIONS
+
+    hindi = TRANSLATED_OPTIONS['hi']
+    body = dict(readme_advice_body(), lang='hi', job=hindi['occupations'][0], family_size=hindi['family_sizes'][1],
+                health_condition=hindi['health_status'][1], financial_goal=hindi['financial_goals'][1])
+    assert client.post('/advice', json=body).status_code == 200
+
+
+def test_advice_cache_runs_off_the_event_loop(service):
+    threads = []
+    get, put = service.advice_cache.get, service.advice_cache.put
+
+    def off_loop(method):
+        def call(*args):
+            try:
+                asyncio.get_running_loop()
+                threads.append('event loop')
+            except RuntimeError:
+                threads.append('worker')
+            return method(*args)
+        return call
+
+    service.advice_cache.get, service.advice_cache.put = off_loop(get), off_loop(put)
+    assert final_event(service.advice(readme_advice_body()))['tier'] == 'phi3'
+    assert final_event(service.advice(readme_advice_body()))['tier'] == 'cache'
+    assert threads == ['worker'] * 3
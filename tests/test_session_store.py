@@ -0,0 +1,46 @@
+import pytest
+
+from session_store import (
+    MemorySessionStore, SQLiteSessionStore, issue_token, new_session_id, redeem_token, revoke_token
+)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'))
+
+
+def test_token_resumes_its_session_once(store):
+    session_id = new_session_id()
+    token = issue_token(store, session_id)
+    assert session_id not in token
+    assert redeem_token(store, token) == session_id
+    assert redeem_token(store, token) is None
+
+
+def test_revoked_and_expired_tokens_do_not_resume(store):
+    session_id = new_session_id()
+    revoked = issue_token(store, session_id)
+    revoke_token(store, revoked)
+    assert redeem_token(store, revoked) is None
+
+    expired = issue_token(store, session_id)
+    assert redeem_token(store, expired, ttl=-1) is None
+
+
+@pytest.mark.parametrize('token', ['', 'x' * 32 + '/', 'abc'])
+def test_malformed_tokens_and_bare_session_ids_do_not_resume(store, token):
+    session_id = new_session_id()
+    store.put(session_id, {'user_data': {'income': 7500}})
+    assert redeem_token(store, token) is None
+    assert redeem_token(store, session_id) is None
+
+
+def test_state_round_trips(store):
+    session_id = new_session_id()
+    store.put(session_id, {'chat_history': [{'question': "PMJAY?", 'answer': "₹5 lakh"}]})
+    assert store.get(session_id)['chat_history'][0]['answer'] == "₹5 lakh"
+    store.delete(session_id)
+    assert store.get(session_id) is None
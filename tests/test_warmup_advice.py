@@ -0,0 +1,71 @@
+import json
+
+import llm_gateway
+import warmup_advice
+from advice_cache import AdviceCache, canonical_profile
+from conftest import BlockingFakeGateway
+from warmup_advice import grid_profiles, load_profiles, unique, warm_up
+
+PROFILES = [
+    {'age': 32, 'job': 'Farmer', 'income': 8000, 'location': 'Pune', 'family_size': '2-3',
+     'health_condition': 'Good', 'financial_goal': 'Family Security'},
+    {'age': 34, 'job': 'Farmer', 'income': "₹5,000-10,000", 'location': 'Pune', 'family_size': '2-3',
+     'health_condition': 'Good', 'financial_goal': 'Family Security'},
+    {'age': 45, 'job': 'Driver', 'income': 20000, 'location': 'Patna', 'family_size': '4-5',
+     'health_condition': 'Fair', 'financial_goal': 'Health Coverage', 'lang': 'hi'},
+]
+
+
+def test_profiles_file_is_bucketed_and_deduplicated(tmp_path):
+    path = tmp_path / 'profiles.jsonl'
+    path.write_text(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in PROFILES), encoding='utf-8')
+    profiles = list(unique(load_profiles(str(path))))
+    assert len(profiles) == 2
+    assert profiles[0] == canonical_profile(32, 'Farmer', 7500, 'Pune', '2-3', 'Good', 'Family Security', 'en')
+    assert profiles[1]['lang'] == 'hi'
+
+
+def test_grid_covers_every_option_combination():
+    profiles = list(grid_profiles([30], ['Pune'], ['en', 'hi']))
+    assert len(profiles) == 2 * 11 * 6 * 4 * 5 * 6
+    assert len(list(unique(profiles))) == len(profiles)
+
+
+def test_warm_up_caches_advice_and_skips_it_next_time(tmp_path):
+    cache = AdviceCache(str(tmp_path / 'advice.sqlite3'))
+    profiles = list(grid_profiles([30], ['Pune'], ['en']))[:5]
+    gateway = BlockingFakeGateway()
+
+    summary = warm_up(profiles, cache, gateway, log=lambda message: None)
+    assert (summary['generated'], summary['failed'], summary['skipped']) == (5, 0, 0)
+    assert len(gateway.prompts) == 5
+    assert all("phi3 explains the plan" in cache.get(profile) for profile in profiles)
+
+    again = warm_up(profiles, cache, gateway, log=lambda message: None)
+    assert (again['generated'], again['skipped']) == (0, 5)
+    assert len(gateway.prompts) == 5
+
+
+def test_failed_generations_are_counted_and_not_cached(tmp_path):
+    cache = AdviceCache(str(tmp_path / 'advice.sqlite3'))
+    profiles = list(grid_profiles([30], ['Pune'], ['en']))[:3]
+    logged = []
+    summary = warm_up(profiles, cache, BlockingFakeGateway(error=llm_gateway.GatewayTimeout("too slow")),
+                      log=logged.append)
+    assert (summary['generated'], summary['failed']) == (0, 3)
+    assert sum(message.startswith("Failed") for message in logged) == 3
+    assert not any(cache.contains(profile) for profile in profiles)
+
+
+def test_cli_warms_a_profiles_file(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'profiles.json'
+    path.write_text(json.dumps(PROFILES, ensure_ascii=False), encoding='utf-8')
+    cache = AdviceCache(str(tmp_path / 'advice.sqlite3'))
+    gateway = BlockingFakeGateway()
+    monkeypatch.setattr(warmup_advice, 'AdviceCache', lambda: cache)
+    monkeypatch.setattr(llm_gateway, 'LLMGateway', lambda **settings: gateway)
+
+    assert warmup_advice.main(['--profiles', str(path)]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert (summary['requested'], summary['generated']) == (2, 2)
+    assert len(gateway.prompts) == 2
@@ -0,0 +1,134 @@
+"""Pre-generate advice for common profiles so daytime requests are served from the cache
+
+Examples:
+    python warmup_advice.py --from-traffic 200
+    python warmup_advice.py --profiles profiles.jsonl --workers 2
+    python warmup_advice.py --grid --ages 30 --locations Maharashtra "Uttar Pradesh" --limit 500
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from advice_cache import AdviceCache, canonical_profile, profile_key
+from advisor import (
+    TRANSLATED_OPTIONS, INCOME_MAP, ADVICE_OPTIONS, profile_advice_prompt, format_advice
+)
+
+
+def grid_profiles(ages, locations, langs):
+    """Every combination of the form's options for the given ages, places and languages"""
+    options = TRANSLATED_OPTIONS['en']
+    for lang, age, location, job, income, family_size, health, goal in itertools.product(
+        langs, ages, locations,
+        options['occupations'], INCOME_MAP.values(), options['family_sizes'],
+        options['health_status'], options['financial_goals']
+    ):
+        yield canonical_profile(age, job, income, location, family_size, health, goal, lang)
+
+
+def load_profiles(path):
+    """Profiles from a JSON list or JSONL file of form fields (English option labels)"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read().strip()
+    rows = json.loads(text) if text.startswith('[') else [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for row in rows:
+        if 'age_band' in row:
+            yield row
+            continue
+        income = row.get('income', 10000)
+        if isinstance(income, str):
+            income = INCOME_MAP.get(income, 10000)
+        yield canonical_profile(
+            row.get('age', 30), row['job'], income, row.get('location', 'India'),
+            row['family_size'], row['health_condition'], row['financial_goal'], row.get('lang', 'en')
+        )
+
+
+def unique(profiles):
+    seen = set()
+    for profile in profiles:
+        key = profile_key(profile)
+        if key not in seen:
+            seen.add(key)
+            yield profile
+
+
+def generate_advice(profile, cache, gateway):
+    """Generate, cache and return the advice report for one profile"""
+    advice = format_advice(gateway.chat(profile_advice_prompt(profile), ADVICE_OPTIONS), profile)
+    cache.put(profile, advice)
+    return advice
+
+
+def warm_up(profiles, cache, gateway, workers=2, force=False, log=print):
+    """Generate and cache advice for every profile not already cached"""
+    todo = [profile for profile in profiles if force or not cache.contains(profile)]
+    summary = {'requested': len(profiles), 'generated': 0, 'failed': 0, 'skipped': len(profiles) - len(todo)}
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_advice, profile, cache, gateway): profile for profile in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                future.result()
+                summary['generated'] += 1
+            except Exception as e:
+                summary['failed'] += 1
+                log(f"Failed {profile_key(futures[future])}: {e}")
+            if done % 10 == 0 or done == len(todo):
+                log(f"{done}/{len(todo)} done in {time.monotonic() - started:.0f}s")
+
+    summary['seconds'] = round(time.monotonic() - started, 1)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from-traffic', type=int, metavar='N', help="warm the N most-requested profiles")
+    parser.add_argument('--profiles', metavar='FILE', help="JSON or JSONL list of profiles to warm")
+    parser.add_argument('--grid', action='store_true', help="warm every option combination")
+    parser.add_argument('--ages', type=int, nargs='+', default=[30], help="ages used for --grid")
+    parser.add_argument('--locations', nargs='+', default=['India'], help="places used for --grid")
+    parser.add_argument('--langs', nargs='+', default=['en', 'hi'], help="languages used for --grid")
+    parser.add_argument('--limit', type=int, help="stop after this many profiles")
+    parser.add_argument('--workers', type=int, default=2, help="concurrent generations against Ollama")
+    parser.add_argument('--timeout', type=float, default=300, help="per-generation deadline in seconds")
+    parser.add_argument('--force', action='store_true', help="regenerate profiles that are already cached")
+    parser.add_argument('--dry-run', action='store_true', help="only list the profiles that would be warmed")
+    args = parser.parse_args(argv)
+
+    cache = AdviceCache()
+    sources = []
+    if args.from_traffic:
+        sources.append(cache.top_profiles(args.from_traffic))
+    if args.profiles:
+        sources.append(load_profiles(args.profiles))
+    if args.grid:
+        sources.append(grid_profiles(args.ages, args.locations, args.langs))
+    if not sources:
+        parser.error("choose at least one of --from-traffic, --profiles or --grid")
+
+    profiles = list(itertools.islice(unique(itertools.chain(*sources)), args.limit))
+
+    if args.dry_run:
+        for profile in profiles:
+            print(profile_key(profile))
+        print(f"{len(profiles)} profiles, {sum(not cache.contains(p) for p in profiles)} not cached", file=sys.stderr)
+        return 0
+
+    from llm_gateway import LLMGateway
+
+    gateway = LLMGateway(max_in_flight=args.workers, max_queue=len(profiles),
+                         queue_timeout=args.timeout, request_timeout=args.timeout)
+    summary = warm_up(profiles, cache, gateway, workers=args.workers, force=args.force,
+                      log=lambda message: print(message, file=sys.stderr))
+    print(json.dumps(summary))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())